@@ -1,12 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter.messagebox import askyesno
-from os.path import join as path_join
-from os import listdir as os_listdir
-from os import unlink as os_unlink
-import json
 
 import DOC as doc
+from catalog import catalog_get_names
+from validate import validate_doc
+from validate import validate_print
 
 from EndpointsFrame import EndpointsFrame
 from EndpointRequest import EndpointRequestFrame
@@ -19,6 +18,7 @@ from widgets import Tablist
 from widgets import ScrollFrame
 from ResponseFrame import ResponseFrame
 from ExportWindow import ExportWindow
+from reqengine import reqengine_submit
 
 from codegen import codegen
 
@@ -121,6 +121,25 @@ class ApiDoc(tk.Frame):
 				self.on_save_doc()
 		ow = OpenApiDocWindow(self)
 
+	def on_doc_read(self, p, res, err):
+		"""
+		Called when apidoc at path p has been read in the
+		background (see DOC_read).
+		"""
+		if err:
+			print("! Failed to load apidoc " + p)
+			print("  " + str(err))
+			self.msg("Failed to load apidoc "+p+" !",1)
+			return
+		doc.DOC_set(res, p)
+		if self.epRequestFrame:
+			self.close_endpoint_request_frame()
+
+		self.msg("Loaded apidoc "+p)
+		self.tabs.block_all(False)
+		self.reload_gui()
+		self.open_tab('info')
+
 	def on_save_doc(self):
 		"""
 		Store apidoc at ~/.okapi/apidoc/<name>.json
@@ -134,12 +153,33 @@ class ApiDoc(tk.Frame):
 		elif not doc.DOC['version']:
 			self.msg("Please set an API version!", 1)
 			return
+
+		# Check changed sections (everything if not stored yet)
+		if doc.DOC_storage_path == None:
+			diags = validate_doc()
+		else:	diags = validate_doc(sections=doc.DOC_dirty)
 		try:
 			p = doc.DOC_save_json(self.basedir)
-			self.msg("Stored apidoc at " + p)
+			if diags:
+				validate_print(diags)
+				self.msg("Stored apidoc at " + p + ", found " +\
+					str(len(diags)) + " problem(s) (see console)", 1)
+			else:	self.msg("Stored apidoc at " + p)
 		except Exception as e:
 			self.msg("Failed to save apidoc, "+str(e), 1)
 
+	def on_validate_doc(self):
+		"""
+		Validate whole apidoc and print diagnostics.
+		"""
+		for frame in self.frames.values():
+			frame.save_to_DOC()
+		diags = validate_doc()
+		validate_print(diags)
+		if diags:
+			self.msg("Found " + str(len(diags)) + " problem(s) (see console)", 1)
+		else:	self.msg("No problems found")
+
 	def on_delete_doc(self):
 		if not doc.DOC['name']:
 			return
@@ -148,7 +188,7 @@ class ApiDoc(tk.Frame):
 			"for API '"+doc.DOC['name']+"'?\n"\
 			"This cannot be undone!")
 		if not yes: return
-		os_unlink(doc.DOC_get_storage_path(self.basedir))
+		doc.DOC_delete_json(self.basedir)
 		doc.DOC_new()
 		self.open_tab('welcome')
 
@@ -160,12 +200,23 @@ class ApiDoc(tk.Frame):
 		w = ExportWindow(self, doc.DOC, gentype)
 		opts = w.show()
 
-		if opts:
-			if codegen.gen_code(doc.DOC, opts):
+		if not opts:
+			self.msg("Export cancelled", 1)
+			return
+
+		def on_done(job, res, err):
+			if res:
 				self.msg("Created " + gentype.value \
 					+ " at " + w.createpath, 0)
-			else:	self.msg("Failed to export!", 1)
-		else:	self.msg("Export cancelled", 1)
+			else:
+				self.msg("Failed to export!", 1)
+				if err: print(err)
+		# Generate in the background from a snapshot (DOC is
+		# used on the Tk thread only), result is shown by
+		# on_done on the Tk thread (see uidispatch.py).
+		snapshot = doc.DOC_snapshot()
+		reqengine_submit(lambda job: codegen.gen_code(snapshot, opts),
+				on_done=on_done)
 
 
 	def open_tab(self, title):
@@ -278,37 +329,17 @@ class OpenApiDocWindow(tk.Toplevel):
 		if api_name:
 			self.destroy()
 			p = self._api_name_to_path(api_name)
-			if not doc.DOC_load(p):
-				self.parent.msg("Failed to load apidoc "+p+" !",1)
-			else:
-				if self.parent.epRequestFrame:
-					self.parent.close_endpoint_request_frame()
-
-				self.parent.msg("Loaded apidoc "+p)
-				self.parent.tabs.block_all(False)
-				self.parent.reload_gui()
-				self.parent.open_tab('info')
+			self.parent.msg("Loading apidoc "+p+" ...")
+			reqengine_submit(lambda job: doc.DOC_read(p),
+				on_done=lambda job,res,err:
+					self.parent.on_doc_read(p, res, err))
 
 	def _get_api_names(self):
 		# Get list of all stored apidoc names.
-		names = []
-		p = path_join(self.parent.basedir, "apidoc")
-		for file in os_listdir(p):
-			filepath = path_join(p, file)
-			try:
-				f = open(filepath, "r")
-				doc = json.load(f)
-				names.append(doc['name'])
-				f.close()
-			except Exception as e:
-				print("! Failed to read apiname from '"+filepath+"'")
-				continue
-
-		return sorted(names)
+		return catalog_get_names(self.parent.basedir)
 
 
 	def _api_name_to_path(self, api_name):
 		# Get path to file where api with given name is stored
-		name = api_name.lower().replace(' ', '_')
-		return path_join(path_join(self.parent.basedir, 'apidoc'),
-				name + '.json')
+		return doc.DOC_get_storage_path(self.parent.basedir,
+				{'name':api_name})
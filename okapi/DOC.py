@@ -1,12 +1,51 @@
 import re
 import json
+import copy
+import weakref
+from collections import OrderedDict
 from os.path import join as path_join
 from os.path import isfile as path_isfile
+from os.path import getsize as path_getsize
 from urllib.parse import quote_plus
 
+from catalog import catalog_set_entry
+from catalog import catalog_scan
+from journal import journal_load
+from journal import journal_read
+from journal import journal_apply
+from journal import journal_append
+from journal import journal_write_full
+from journal import journal_delete
+from journal import journal_compact_async
+from journal import JOURNAL_COMPACT_SIZE
+from sqlitestore import sqlite_store_save
+from sqlitestore import sqlite_store_save_sections
+from sqlitestore import sqlite_import_json
+from sqlitestore import sqlite_export_json
+from sqlitestore import SqliteSource
+from docindex import DocIndex
+from routes import RouteTrie
+from uritemplate import uritemplate_get
+from schema import DocDict
+from schema import TypedDict
+from schema import Endpoint
+from schema import schema_tag
+from schema import schema_doc_from_dict
+from schema import schema_json_default
+from schema import schema_to_dict
+from schema import schema_set_touch_handler
+
 """
 
-Apis are stored at ~/.okapi/apidoc/{api-name} by default.
+Apis are stored at ~/.okapi/apidoc/{api-name}.json by default.
+Large apidocs can be stored in a sqlite database {api-name}.db
+instead (see sqlitestore.py and DOC_convert_storage()).
+Big apidocs are loaded lazily, endpoints are read from the file
+or database when accessed (see DOC_load() and LazyDocDict).
+
+Endpoints, parameters, responses, models and attributes are stored
+as slotted objects which can be accessed like dictionaries, all
+other objects as DocDict and lists as DocList (see schema.py).
 
 The API doc ist stored in a global dictionary named DOC.
 It has the following format ([!] required, [ ] optional):
@@ -20,6 +59,12 @@ It has the following format ([!] required, [ ] optional):
     'type' : <str>, ?			# [!] Authentication type (basic,bearer,...) TODO
     'params' : {} ?			# [!] Parameters for authentication TODO
   },
+  'settings' : {			# [ ] Request settings (see httpretry.py)
+    'connect_timeout' : <float>,	# [ ] Seconds
+    'read_timeout' : <float>,		# [ ] Seconds
+    'retries' : <int>,			# [ ] Max. retries of failed requests
+    'backoff' : <float>			# [ ] Delay (sec) of the first retry
+  },
   'models' : {				# [!] Model definitions
     <NAME> : {
       'info' : <string>,		# [ ] Model description
@@ -77,7 +122,7 @@ PARAMETER_EXAMPLES = {
 	'boolean' : False,
 	'object'  : {} }
 
-PARAMETER_SOURCES = ['query', 'body', 'path']
+PARAMETER_SOURCES = ['path', 'query', 'header', 'form-data', 'body']
 
 RESPONSE_CONTENT_TYPES = [
 	'application/json',
@@ -92,19 +137,133 @@ RESPONSE_CONTENT_TYPES = [
 	'text/plain'
 ]
 
+class LazyDocDict(TypedDict):
+	"""
+	TypedDict with the endpoints of one HTTP method of a lazily
+	loaded apidoc (see DOC_load()). Endpoints not loaded yet are
+	stored as _UNLOADED and read from the source (DocIndex or
+	SqliteSource) when accessed.
+	"""
+	__slots__ = ('_src',)
+
+	def __init__(self, src):
+		TypedDict.__init__(self, Endpoint)
+		self._src = src
+
+	def __getitem__(self, key):
+		v = dict.__getitem__(self, key)
+		if v is _UNLOADED:
+			return _DOC_lazy_load(self, key)
+		k = (self._sec[1], key)
+		if k in _lazy_loaded:
+			_lazy_loaded.move_to_end(k)
+		return v
+
+	def get(self, key, default=None):
+		return self[key] if key in self else default
+
+	def setdefault(self, key, default=None):
+		if key not in self:
+			self[key] = default
+		return self[key]
+
+	def pop(self, key, *default):
+		if key in self:
+			self[key]
+		return DocDict.pop(self, key, *default)
+
+	def popitem(self):
+		key = next(reversed(dict.keys(self)))
+		return key, self.pop(key)
+
+	def items(self):
+		for key in list(dict.keys(self)):
+			yield key, self[key]
+
+	def values(self):
+		for key in list(dict.keys(self)):
+			yield self[key]
+
+	def copy(self):
+		return {k:v for k,v in self.items()}
+
+class _Unloaded:
+	def __repr__(self):
+		return "<not loaded>"
+
+_NOVALUE = object()
+_UNLOADED = _Unloaded()
+
 # The dictionary where the current apidoc is
 # stored.
-DOC = {}
+DOC = schema_doc_from_dict({})
+
+# Revision of DOC. Incremented on every change.
+DOC_revision = 0
+
+# Revision of DOC at last load/save.
+DOC_saved_revision = 0
+
+# Sections of DOC changed since last load/save:
+#   ('doc', <KEY>)		Top level key like 'name' or 'info'
+#   ('endpoints',)		All endpoints (replaced)
+#   ('method', <METHOD>)	All endpoints of a HTTP method
+#   ('endpoint', <METHOD>, <URI>)
+#   ('models',)			All models (replaced)
+#   ('model', <NAME>)
+DOC_dirty = set()
 
-# Hash of last status to detect changes.
-DOC_last_hash = None
+# Path of the file DOC was loaded from/stored at.
+DOC_storage_path = None
+
+# Apidoc json files bigger than this (bytes) are loaded lazily.
+DOC_LAZY_MIN_SIZE = 4*1024*1024
+
+# Max. size of lazily loaded endpoints kept in memory, approximated
+# by their size in the apidoc file/database (bytes of json). Least
+# recently used, unchanged endpoints are dropped and read again
+# when accessed.
+DOC_LAZY_MAX_SIZE = 32*1024*1024
+
+# Lazily loaded endpoints {(method,uri):(LazyDocDict, size)} (LRU
+# order)
+_lazy_loaded = OrderedDict()
+
+# Total size of _lazy_loaded
+_lazy_size = 0
+
+# Dropped endpoints (still referenced somewhere else)
+_lazy_dropped = weakref.WeakValueDictionary()
+
+# Endpoints changed since load, these are never dropped.
+_lazy_pinned = set()
+
+# Cached model examples {(name, zero):(example, uses)} (see
+# DOC_model_to_dict). Examples with a cut reference cycle are cached
+# in _model_roots only, as they depend on where the expansion started.
+_model_examples = {}
+_model_roots = {}
+
+# RouteTrie of DOC's endpoints (see DOC_match_endpoint), built
+# on first use.
+_routes = None
+
+# Sections referencing a type {type:set(section)} (see
+# DOC_model_referrers), built on first use.
+_model_refs = None
+
+# Types referenced by a section {section:set(type)}
+_section_refs = {}
+
+# Sections changed since _model_refs has been updated
+_refs_stale = set()
 
 def DOC_new():
 	"""
 	Create a new, empty apidoc dictionary at 'DOC'.
 	"""
-	global DOC
-	DOC = dict({
+	global DOC, DOC_storage_path, _routes
+	DOC = schema_doc_from_dict({
 		'name'    : '',
 		'version' : '',
 		'address' : '',
@@ -117,41 +276,170 @@ def DOC_new():
 		'models'    : {},
 		'endpoints' : {}
 	})
+	_DOC_lazy_reset()
+	_DOC_model_changed()
+	_DOC_refs_reset()
+	_routes = None
+	DOC_storage_path = None
 	DOC_set_unchanged()
 
 
 def DOC_load(filepath):
-	""" Load DOC """
-	global DOC
+	"""
+	Load DOC from given file and replay its journal.
+	If filepath ends with '.db', DOC is loaded from the
+	sqlite database at filepath.
+	Databases and json files bigger than DOC_LAZY_MIN_SIZE are
+	loaded lazily: Everything but the endpoints is loaded at
+	once, endpoints are read when accessed (see LazyDocDict).
+	"""
 	try:
-		f = open(filepath, "r")
-		DOC = json.load(f)
-		DOC_set_unchanged()
+		DOC_set(DOC_read(filepath), filepath)
 		return True
 	except Exception as e:
 		print("! Failed to load apidoc " + filepath)
 		print("  "+str(e))
 		return False
 
+def DOC_read(filepath):
+	"""
+	Read apidoc from file without changing DOC, e.g. in a
+	background thread (see DOC_load). Raises an exception
+	on failure.
+	"""
+	if filepath.endswith(".db"):
+		doc = _DOC_load_lazy(SqliteSource(filepath))
+	elif path_getsize(filepath) > DOC_LAZY_MIN_SIZE:
+		doc = _DOC_load_lazy(DocIndex(filepath))
+		journal_apply(doc, journal_read(filepath))
+	else:	doc = journal_load(filepath)
+	return schema_doc_from_dict(doc)
+
+def DOC_set(doc, filepath):
+	"""
+	Make apidoc read with DOC_read() the current DOC.
+	"""
+	global DOC, DOC_storage_path, _routes
+	DOC = doc
+	_DOC_lazy_reset()
+	_DOC_model_changed()
+	_DOC_refs_reset()
+	_routes = None
+	DOC_storage_path = filepath
+	DOC_set_unchanged()
+
+def _DOC_load_lazy(src):
+	# Create apidoc with endpoints read from given source
+	# (DocIndex or SqliteSource) when accessed.
+	doc = src.load_head()
+	doc['endpoints'] = {}
+	for method,uris in src.get_endpoint_keys().items():
+		d = LazyDocDict(src)
+		dict.update(d, dict.fromkeys(uris, _UNLOADED))
+		doc['endpoints'][method] = d
+	return doc
+
+def _DOC_lazy_load(d, uri):
+	# Read endpoint of lazily loaded apidoc from its source
+	# and drop least recently used endpoints while they take
+	# more than DOC_LAZY_MAX_SIZE.
+	global _lazy_size
+	method = d._sec[1]
+	v = _lazy_dropped.pop((method, uri), None)
+	if v is None:
+		v = Endpoint.from_dict(d._src.get_endpoint(method, uri))
+		schema_tag(v, ('endpoint', method, uri))
+	dict.__setitem__(d, uri, v)
+	n = d._src.get_endpoint_size(method, uri)
+	_lazy_loaded[(method, uri)] = (d, n)
+	_lazy_size += n
+
+	while _lazy_size > DOC_LAZY_MAX_SIZE and len(_lazy_loaded) > 1:
+		(m,u),(x,n) = _lazy_loaded.popitem(last=False)
+		_lazy_size -= n
+		ep = dict.get(x, u, _UNLOADED)
+		if ep is _UNLOADED or ('endpoint',m,u) in _lazy_pinned:
+			continue
+		_lazy_dropped[(m,u)] = ep
+		dict.__setitem__(x, u, _UNLOADED)
+	return v
+
+def _DOC_lazy_restore(method, uri):
+	# Put dropped endpoint back into DOC, it has been changed
+	# while referenced somewhere else.
+	ep = _lazy_dropped.pop((method, uri), None)
+	d = dict.get(DOC['endpoints'], method)
+	if ep is not None and isinstance(d, LazyDocDict) and \
+			dict.get(d, uri) is _UNLOADED:
+		dict.__setitem__(d, uri, ep)
+
+def _DOC_lazy_reset():
+	# Forget lazily loaded endpoints of previous DOC.
+	global _lazy_size
+	_lazy_loaded.clear()
+	_lazy_size = 0
+	_lazy_dropped.clear()
+	_lazy_pinned.clear()
+
 def DOC_hash():
-	""" Get hash of DOC """
+	"""
+	Get hash of DOC.
+	NOTE: This serializes the whole document, use
+	      DOC_has_changed() to detect changes.
+	"""
 	global DOC
-	return hash(json.dumps(DOC, sort_keys=True))
+	return hash(json.dumps(DOC, sort_keys=True,
+			default=schema_json_default))
+
+def DOC_touch(section=None):
+	"""
+	Mark DOC as changed.
+	Args:
+	  section: Changed section (see DOC_dirty) or None
+	"""
+	global DOC_revision, _routes
+	DOC_revision += 1
+	if section:
+		DOC_dirty.add(section)
+		if section[0] in ('endpoints', 'method'):
+			# Endpoints replaced, rebuild routes
+			_routes = None
+		elif section[0] == 'model':
+			_DOC_model_changed(section[1])
+		elif section[0] == 'models':
+			_DOC_model_changed()
+		if section[0] in ('model', 'endpoint'):
+			_refs_stale.add(section)
+		elif section[0] in ('models', 'endpoints', 'method'):
+			_DOC_refs_reset()
+		if section[0] == 'endpoint' and section not in _lazy_pinned:
+			_lazy_pinned.add(section)
+			_DOC_lazy_restore(section[1], section[2])
+
+schema_set_touch_handler(DOC_touch)
+
+def DOC_snapshot():
+	"""
+	Get copy of DOC as plain dictionaries, for use outside of
+	the Tk thread (e.g. by workers, see reqengine.py). Lazily
+	loaded endpoints are loaded here.
+	"""
+	return schema_to_dict(DOC)
 
 def DOC_has_changed():
 	""" Has DOC changed ? """
-	global DOC_last_hash
-	return DOC_last_hash != DOC_hash()
+	return DOC_revision != DOC_saved_revision
 
 def DOC_set_unchanged():
 	""" Set DOC to not changed """
-	global DOC_last_hash
-	DOC_last_hash = DOC_hash()
+	global DOC_saved_revision
+	DOC_saved_revision = DOC_revision
+	DOC_dirty.clear()
 
 def DOC_print():
 	""" Print DOC formatted. """
 	global DOC
-	print(json.dumps(DOC, indent=4))
+	print(json.dumps(DOC, indent=4, default=schema_json_default))
 
 def DOC_get_storage_filename(doc=None):
 	""" Get filename for storing apidoc """
@@ -165,9 +453,14 @@ def DOC_get_storage_path(basedir, doc=None):
 	"""
 	Get storage path.
 	The path will be: <basedir>/apidoc/DOC['name'].json
+	or <basedir>/apidoc/DOC['name'].db if the apidoc is
+	stored in a sqlite database.
 	"""
-	return path_join(path_join(basedir, "apidoc"),
-			DOC_get_storage_filename(doc) + ".json")
+	p = path_join(path_join(basedir, "apidoc"),
+			DOC_get_storage_filename(doc))
+	if path_isfile(p + ".db"):
+		return p + ".db"
+	return p + ".json"
 
 def DOC_is_storage_path(basedir, doc=None):
 	""" Does path for current DOC exists ? """
@@ -177,17 +470,98 @@ def DOC_save_json(basedir):
 	"""
 	Store DOC as json file.
 	The path will be <basedir>/apidoc/DOC['name'].json
+	If DOC was loaded from/stored at this path before, only
+	the changed sections are appended to the file's journal.
+	Otherwise the whole file is written (atomically).
 	Return:
 	  Path of stored file
 	"""
-	global DOC
+	global DOC, DOC_storage_path
 	p = DOC_get_storage_path(basedir)
-	f = open(p, "w")
-	json.dump(DOC, f, indent=2)
-	f.close()
+
+	if p.endswith(".db"):
+		if p == DOC_storage_path:
+			sqlite_store_save_sections(p, DOC, DOC_dirty)
+		else:	sqlite_store_save(p, DOC)
+		DOC_storage_path = p
+	elif p == DOC_storage_path and path_isfile(p):
+		entries = DOC_get_journal_entries()
+		if entries and journal_append(p, entries) > JOURNAL_COMPACT_SIZE:
+			journal_compact_async(p)
+	else:
+		journal_write_full(p, DOC)
+		DOC_storage_path = p
+
 	DOC_set_unchanged()
+	catalog_set_entry(basedir, p, DOC)
 	return p
 
+def DOC_delete_json(basedir):
+	"""
+	Delete stored json file (and journal) of DOC.
+	"""
+	global DOC_storage_path
+	p = DOC_get_storage_path(basedir)
+	journal_delete(p)
+	if p == DOC_storage_path:
+		DOC_storage_path = None
+
+def DOC_convert_storage(basedir, name, to_sqlite=True):
+	"""
+	Convert stored apidoc from json to sqlite or vice versa.
+	Args:
+	  basedir:   Base directory
+	  name:      Api name
+	  to_sqlite: Convert to sqlite (True) or json (False)?
+	Return:
+	  Path of the converted apidoc
+	"""
+	global DOC_storage_path
+	src = DOC_get_storage_path(basedir, {'name':name})
+	dst = src.rsplit(".", 1)[0] + (".db" if to_sqlite else ".json")
+	if src == dst:
+		return dst
+	if not path_isfile(src):
+		raise FileNotFoundError("No such file: " + src)
+
+	if to_sqlite:
+		sqlite_import_json(src, dst)
+	else:	sqlite_export_json(src, dst)
+	journal_delete(src)
+	if src == DOC_storage_path:
+		DOC_storage_path = dst
+	catalog_scan(basedir)
+	return dst
+
+def DOC_get_journal_entries():
+	"""
+	Get journal entries for all sections changed since the
+	last load/save (see DOC_dirty and journal.py).
+	"""
+	def section_path(sec):
+		if sec[0] == 'doc': return [sec[1]]
+		elif sec[0] in ('endpoints', 'models'): return [sec[0]]
+		elif sec[0] == 'method': return ['endpoints', sec[1]]
+		elif sec[0] == 'endpoint': return ['endpoints', sec[1], sec[2]]
+		elif sec[0] == 'model': return ['models', sec[1]]
+
+	entries = []
+	done = set()
+	paths = sorted([section_path(s) for s in DOC_dirty], key=len)
+	for path in paths:
+		# Skip sections already contained in a previous one
+		if any([tuple(path[:i]) in done for i in range(1, len(path))]):
+			continue
+		done.add(tuple(path))
+
+		d = DOC
+		for key in path:
+			d = d.get(key, _NOVALUE) if isinstance(d, dict) else _NOVALUE
+		if d is _NOVALUE:
+			entries.append({'op':'del', 'path':path})
+		else:	entries.append({'op':'set', 'path':path, 'value':d})
+	return entries
+
 
 def DOC_is_endpoint(method, uri):
 	"""
@@ -207,7 +581,10 @@ def DOC_add_endpoint(method, uri, ep_dict):
 	global DOC
 	if method not in DOC['endpoints']:
 		DOC['endpoints'][method] = {}
-	DOC['endpoints'][method][uri] = ep_dict.copy()
+	DOC['endpoints'][method][uri] = schema_to_dict(ep_dict)
+	DOC_touch(('endpoint', method, uri))
+	if _routes != None:
+		_routes.add(method, uri)
 
 def DOC_get_endpoint(method, uri, return_new_EP=False):
 	"""
@@ -235,19 +612,132 @@ def DOC_delete_endpoint(method, uri):
 		del DOC['endpoints'][method][uri]
 		if not DOC['endpoints'][method]:
 			del DOC['endpoints'][method]
+		DOC_touch(('endpoint', method, uri))
+		if _routes != None:
+			_routes.remove(method, uri)
+		return True
+	return False
+
+def DOC_match_endpoint(method, url):
+	"""
+	Find endpoint matching a concrete url.
+	Args:
+	  method: HTTP method
+	  url:    Url (e.g. 'http://host/users/42/orders')
+	Return:
+	  Tuple (uri, pathitems) or None if no endpoint matches.
+	  For the example above ('/users/{userId}/orders',
+	  {'userId':'42'}).
+	"""
+	global _routes
+	if _routes == None:
+		_routes = RouteTrie(DOC['endpoints'])
+	return _routes.match(method, url, DOC['address'])
+
+def DOC_model_referrers(name):
+	"""
+	Get sections referencing a model (by attribute type or
+	response model), e.g. to check them when the model has
+	been deleted. The index is built on first use and updated
+	with the sections changed since (see DOC_touch).
+	Return:
+	  Set of sections ('model', <NAME>) and
+	  ('endpoint', <METHOD>, <URI>)
+	"""
+	global _model_refs
+	if _model_refs == None:
+		_model_refs = {}
+		_section_refs.clear()
+		_refs_stale.clear()
+		for mname in DOC['models'].keys():
+			_DOC_refs_update(('model', mname))
+		for method,x in DOC['endpoints'].items():
+			for uri in x.keys():
+				_DOC_refs_update(('endpoint', method, uri))
+	while _refs_stale:
+		_DOC_refs_update(_refs_stale.pop())
+	return set(_model_refs.get(name, ()))
+
+def _DOC_refs_reset():
+	global _model_refs
+	_model_refs = None
+	_section_refs.clear()
+	_refs_stale.clear()
+
+def _DOC_refs_update(section):
+	# Index types referenced by section (again)
+	for name in _section_refs.pop(section, ()):
+		_model_refs[name].discard(section)
+		if not _model_refs[name]:
+			del _model_refs[name]
+	names = set()
+	if section[0] == 'model':
+		model = DOC['models'].get(section[1])
+		for attr in ((model or {}).get('attributes') or {}).values():
+			names.add(attr.get('type'))
+	else:
+		ep = DOC['endpoints'].get(section[1], {}).get(section[2])
+		for r in ((ep or {}).get('response') or {}).values():
+			names.add(r.get('model'))
+	names.discard(None)
+	names.discard('')
+	if names:
+		_section_refs[section] = names
+		for name in names:
+			_model_refs.setdefault(name, set()).add(section)
+
+def DOC_add_model(name, model_dict):
+	"""
+	Add model to DOC (or replace existing one).
+	"""
+	global DOC
+	DOC['models'][name] = model_dict
+	DOC_touch(('model', name))
+
+def DOC_delete_model(name):
+	"""
+	Delete model from DOC by name.
+	"""
+	global DOC
+	if name in DOC['models']:
+		del DOC['models'][name]
+		DOC_touch(('model', name))
 		return True
 	return False
 
 def DOC_model_to_dict(model_name, zero=False):
 	"""
-	Returns model as example dictionary.
+	Returns model as example dictionary (a copy, which may be
+	modified). Examples are cached until the model or one of
+	the models it contains is changed. Attributes closing a
+	reference cycle are set to {'$ref': '#/models/<NAME>'}.
 	Args:
 	  model_name: Name of model
-	  zero:       Set model attributes to 0?
+	  zero:       Set model attributes to 0 (the default value
+		      of their type) instead of their example?
 	"""
 	global DOC
 	if model_name not in DOC['models']:
 		return {}
+	key = (model_name, zero)
+	x = _model_examples.get(key) or _model_roots.get(key)
+	if x == None:
+		res,uses,cut = _DOC_model_example(model_name, zero, [])
+		if cut:
+			_model_roots[key] = (res, uses)
+		x = (res, uses)
+	return copy.deepcopy(x[0])
+
+def _DOC_model_example(model_name, zero, stack):
+	# Create example of model and cache it unless a cycle was
+	# cut below it (the expansion then depends on the models
+	# above it). stack holds the models currently expanded.
+	# Returns tuple (example, uses, cut), where uses is the
+	# set of models the example depends on and cut is True
+	# if a reference cycle was cut below model_name.
+	x = _model_examples.get((model_name, zero))
+	if x != None:
+		return x + (False,)
 
 	realtype = {
 		'string'  : lambda x: str(x),
@@ -257,17 +747,40 @@ def DOC_model_to_dict(model_name, zero=False):
 		'object'  : lambda x: json.loads(x)
 	}
 	res = {}
+	uses = {model_name}
+	cut = False
+	stack.append(model_name)
 	for name,attr in DOC['models'][model_name]['attributes'].items():
 		typ = attr['type']
-		if typ in DOC['models']:
+		uses.add(typ)
+		if typ in stack:
+			# Reference cycle
+			res[name] = {'$ref' : '#/models/' + typ}
+			cut = True
+		elif typ in DOC['models']:
 			# Attribute is model
-			res[name] = DOC_model_to_dict(typ)
-		elif 'example' in attr and attr['example']:
+			res[name],u,c = _DOC_model_example(typ, zero, stack)
+			uses |= u
+			cut = cut or c
+		elif not zero and 'example' in attr and attr['example']:
 			# Attribute has an example set
 			res[name] = realtype[typ](attr['example'])
 		else:	res[name] = PARAMETER_EXAMPLES[typ]
-
-	return res
+	stack.pop()
+
+	if not cut:
+		_model_examples[(model_name, zero)] = (res, uses)
+	return res,uses,cut
+
+def _DOC_model_changed(model_name=None):
+	# Drop cached examples using the given model (or all
+	# examples if model_name is None).
+	for cache in (_model_examples, _model_roots):
+		if model_name == None:
+			cache.clear()
+			continue
+		for key in [k for k,x in cache.items() if model_name in x[1]]:
+			del cache[key]
 
 def DOC_max_endpoint_method_len():
 #	global DOC
@@ -410,8 +923,7 @@ def set_url_path_item(url, pathitem, value):
 	Return:
 	  Url with replaced pathitems (eg. '/users/123456')
 	"""
-	pattern = r"\{" + pathitem + r"\}"
-	return re.sub(pattern, value, url)
+	return uritemplate_get(url).expand({pathitem:value}, False)
 
 def remove_url_path_items(path):
 	"""
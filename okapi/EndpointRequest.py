@@ -12,6 +12,8 @@ from widgets import ToolTip
 from style import SmallTableHeader
 from style import EntryLabel
 from ResponseFrame import ResponseFrame
+from LoadTestWindow import LoadTestWindow
+from uritemplate import uritemplate_get
 import DOC as doc
 
 """
@@ -59,6 +61,7 @@ class EndpointRequestFrame(tk.Frame):
 	def set_endpoint(self, method, uri):
 		self.method  = method
 		self.uri     = uri
+		self.template = uritemplate_get(uri)
 		self.entries = []
 		self.ep_dict = doc.DOC_get_endpoint(method, uri)
 
@@ -108,6 +111,7 @@ class EndpointRequestFrame(tk.Frame):
 		# Buttons
 		btns = {" cancel " : self._close,
 			" clear "  : self._clear_entries_text,
+			" load test " : self._open_load_test,
 			" send "   : self._send_request}
 		bf = ButtonFrame(self, btns, style='label', bg=_BG_BOT, border_fg='#bababa',
                                 btn_fg='#eee', btn_fg_hover='#ddd', btn_font="Arial 10",
@@ -117,7 +121,8 @@ class EndpointRequestFrame(tk.Frame):
                                 btn_border_fg='#aaa', btn_border_hover_fg='#a0a0a0',
                                 btn_pady=3, btn_padx=(0,5))
 		bf.grid(row=4, column=0, sticky='nswe')
-		bf.set_tooltip(2, "Send request [Ctrl+S]")
+		bf.set_tooltip(2, "Send request repeatedly")
+		bf.set_tooltip(3, "Send request [Ctrl+S]")
 
 	def _bind_shortcuts(self, bind=True):
 		if bind:
@@ -151,12 +156,14 @@ class EndpointRequestFrame(tk.Frame):
 			res[v['source']][k] = v
 		return res
 
-	def _send_request(self, ev=None):
-		# Gather all parameters and send request
-		hdrs  = doc.DOC['headers']
+	def _get_request(self):
+		# Gather all parameters.
+		# Returns tuple (address, body, headers) or None if
+		# a parameter is missing or invalid.
+		hdrs  = dict(doc.DOC.get('headers') or {})
 		body  = ""
 		query = ""
-		uri   = self.uri
+		pathitems = {}
 
 		for e in self.entries:
 			val = e.get()
@@ -166,17 +173,16 @@ class EndpointRequestFrame(tk.Frame):
 				e.scroll_to()
 				e.entry.set_border(nseconds=5)
 				print("Missing required value")
-				return
+				return None
 			elif val and not e.validate():
 				# Value has invalid type
 				e.scroll_to()
 				e.entry.set_border(color='red', nseconds=5)
 				self.A.msg("Parameter '"+e.key+"' format!", 1)
-				return
+				return None
 			elif val:
 				if e.source == "path":
-					uri = doc.set_url_path_item(uri, e.key, val)
-					print("URI:", uri)
+					pathitems[e.key] = val
 				elif e.source == "header":
 					hdrs[e.key] = val
 				elif e.source == "query":
@@ -190,25 +196,40 @@ class EndpointRequestFrame(tk.Frame):
 					if body: body += "&"
 					body += e.key + "=" + val
 
-		print("= Send request =")
-		address = doc.DOC['address'] + uri
-		print(self.method, address, end="")
+		address = doc.DOC['address'] + self.template.expand(pathitems)
 		if query:
 			address += "?" + query
-			print("?"+query)
-		else:	print()
+		return address, body if body else None, hdrs if hdrs else None
 
+	def _send_request(self, ev=None):
+		# Gather all parameters and send request
+		req = self._get_request()
+		if not req:
+			return
+		address,body,hdrs = req
+		print("= Send request =")
+		print(self.method, address)
 		if body:
 			print("Body:\n"+body+"\n")
-
 		if hdrs:
 			print("Header:", hdrs)
 
-		self.respFrame.request(self.method, address,
-				body if body else None,
-				hdrs if hdrs else None,
+		self.respFrame.request(self.method, address, body, hdrs,
 				None) # TODO: auth
 
+	def _open_load_test(self):
+		# Open window to send the request repeatedly
+		req = self._get_request()
+		if req:
+			LoadTestWindow(self, self.method, *req)
+
+	def get_path_items(self):
+		"""
+		Get dictionary with all valid path item values.
+		"""
+		return {e.key:e.get() for e in self.entries
+			if e.source == 'path' and e.get() and e.validate()}
+
 	def _clear_entries_text(self, ev=None):
 		# Clear content of all entries
 		for e in self.entries:
@@ -275,9 +296,8 @@ class _ParamWidget:
 
 	def _set_pathitem(self, ev):
 		if self.validate():
-			self.parent.lUri['text'] = doc.set_url_path_item(
-					self.parent.uri,
-					self.key, self.get())
+			self.parent.lUri['text'] = self.parent.template.expand(
+					self.parent.get_path_items())
 
 	def scroll_to(self):
 		"""
@@ -312,8 +332,10 @@ class _ParamWidget:
 					options=self.param_dict['values'])
 		elif self.param_dict['type'] == 'object':
 			self.entry = MultiEntry(scrl, 'text')
+			self.entry.highlight_json()
 		elif self.param_dict['type'] in doc.DOC['models']:
 			self.entry = MultiEntry(scrl, 'text', height=5, width=20)
+			self.entry.highlight_json()
 		else:	self.entry = MultiEntry(scrl, 'entry')
 
 		if self.source == 'path':
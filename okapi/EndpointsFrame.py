@@ -15,6 +15,7 @@ from widgets import PopupMenu
 
 from EndpointEditWindow import EndpointEditWindow
 from EndpointRequest import EndpointRequestFrame
+from SmokeTestWindow import SmokeTestWindow
 
 from style import TableHeader
 from style import InfoLabel
@@ -97,13 +98,19 @@ class EndpointsFrame(tk.Frame):
 		win = EndpointEditWindow(self, method, uri)
 		win.attributes('-topmost', 'true')
 
+	def _run_all(self):
+		# Send one request per endpoint
+		if doc.DOC['endpoints']:
+			SmokeTestWindow(self)
+
 	def _setup_gui(self):
 		# Endpoints are ordered by ("method" or "url")
 		self.order_type = "method"
 		self.grid_columnconfigure(0, weight=1)
 		self.grid_rowconfigure(1, weight=1)
 		self.scroll = None
-		btns = {" Add ":self._edit_endpoint}
+		btns = {" Add ":self._edit_endpoint,
+			" Run all ":self._run_all}
 		self.btnframe = ButtonFrame(self, btns, style='label', bg='#ddd', border_fg='#aaa',
 				btn_fg='#444', btn_fg_hover='#777', btn_font="Arial 8 bold",
 				btn_bg='#e3e3e3', btn_bg_hover='#efefef',
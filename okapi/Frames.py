@@ -11,6 +11,8 @@ from widgets import ToolTip
 from widgets import ButtonFrame
 from style import EntryLabel
 from utils import parse_key_value_text_to_dict
+from httpretry import HTTPRETRY_SETTINGS
+from httpretry import httpretry_parse_settings
 
 A8b="Arial 8 bold"
 A10b="Arial 10 bold"
@@ -51,6 +53,7 @@ class InfoEditFrame(tk.Frame):
 		self.vName    = tk.StringVar(self)
 		self.vVersion = tk.StringVar(self)
 		self.vAddr    = tk.StringVar(self)
+		self.vSettings = {k:tk.StringVar(self) for k in HTTPRETRY_SETTINGS}
 		self.txtInfo  = ScrollTextFrame(self)
 		self._setup_gui()
 		self.load_from_DOC()
@@ -63,6 +66,9 @@ class InfoEditFrame(tk.Frame):
 			self.vVersion.set(doc.DOC['version'])
 		if 'address' in doc.DOC:
 			self.vAddr.set(doc.DOC['address'])
+		settings = doc.DOC.get('settings') or {}
+		for k,v in self.vSettings.items():
+			v.set(str(settings[k]) if settings.get(k) != None else "")
 
 		state = 'readonly' if doc.DOC['name'] else 'normal'
 		self.eName.configure(state=state)
@@ -73,10 +79,11 @@ class InfoEditFrame(tk.Frame):
 		doc.DOC['version'] = self.vVersion.get()
 		doc.DOC['info'] = self.txtInfo.get_text()
 		doc.DOC['address'] = self.vAddr.get()
+		self._on_set_settings()
 
 	def _setup_gui(self):
 		self.grid_columnconfigure(2, weight=1)
-		self.grid_rowconfigure(4, weight=1)
+		self.grid_rowconfigure(5, weight=1)
 
 		# Api Name (r=1)
 		EntryLabel(self, "Api name").do_grid(1, 0, pady=(5,0))
@@ -100,9 +107,23 @@ class InfoEditFrame(tk.Frame):
 		self.eAddr.bind("<FocusOut>", self._on_set_address)
 		self.eAddr.bind("<Return>", self._on_set_address, add='+')
 
-		# Description (r=4)
-		EntryLabel(self, "Description").do_grid(4, 0, sticky='nwe', pady=(4,0))
-		self.txtInfo.grid(row=4, column=1, sticky='nswe',
+		# Request settings (r=4)
+		EntryLabel(self, "Requests").do_grid(4, 0)
+		f = tk.Frame(self)
+		f.grid(row=4, column=1, sticky='nswe', columnspan=2, padx=2)
+		for i,k in enumerate(HTTPRETRY_SETTINGS):
+			LeftLabel(f, text=HTTPRETRY_SETTINGS[k], font="Arial 8")\
+				.grid(row=0, column=2*i, sticky='nswe', padx=(0,2))
+			e = tk.Entry(f, textvariable=self.vSettings[k], width=6)
+			e.grid(row=0, column=2*i+1, sticky='nswe', padx=(0,8))
+			e.bind("<FocusOut>", self._on_set_settings)
+			e.bind("<Return>", self._on_set_settings, add='+')
+		ToolTip(f, "Timeouts (sec) and retries of requests,\n"
+				"empty values use the defaults")
+
+		# Description (r=5)
+		EntryLabel(self, "Description").do_grid(5, 0, sticky='nwe', pady=(4,0))
+		self.txtInfo.grid(row=5, column=1, sticky='nswe',
 				columnspan=2, padx=3, pady=(0,3))
 
 	def _on_set_address(self, ev=None):
@@ -116,6 +137,16 @@ class InfoEditFrame(tk.Frame):
 		self.vAddr.set(a)
 		doc.DOC['address'] = self.vAddr.get()
 
+	def _on_set_settings(self, ev=None):
+		# Called if a request setting changed
+		settings,invalid = httpretry_parse_settings(
+				{k:v.get() for k,v in self.vSettings.items()})
+		for k in invalid:
+			self.A.msg("Invalid value '" + self.vSettings[k].get() + "'", 1)
+			self.vSettings[k].set("")
+		if settings != (doc.DOC.get('settings') or {}):
+			doc.DOC['settings'] = settings
+
 	def _on_set_version(self, ev=None):
 		# Called if version changed
 		v = self.vVersion.get()
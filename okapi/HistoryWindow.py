@@ -0,0 +1,171 @@
+import time
+import json
+import tkinter as tk
+
+from widgets import LeftLabel
+from widgets import ButtonFrame
+from widgets import ScrollTextFrame
+from history import history_get
+from httpclient import httpclient_format_size
+
+"""
+|-----------------------------------------------|
+| Url [http://host/users     ]     1234 entries	|
+|-----------------------------------------------|
+| 12:01:33 200 GET /users/{id}  |  200 OK	|
+| 12:01:30 404 GET /users/{id}  |  Headers	|
+| ...				|  Timing	|
+|				|		|
+|				|  Body		|
+|-----------------------------------------------|
+| [CLOSE] [CLEAR HISTORY]			|
+|-----------------------------------------------|
+The list is loaded in pages of PAGE_SIZE entries while scrolling,
+an entry is read from the log when selected. The list can be filtered
+by url prefix.
+"""
+
+_BG = "#d0d0d0"
+
+# Entries loaded per page
+PAGE_SIZE = 200
+
+# Larger bodies are shown truncated
+BODY_SHOW_SIZE = 2*1024*1024
+
+class HistoryWindow(tk.Toplevel):
+	"""
+	Window to browse the request history.
+	"""
+	def __init__(self, parent):
+		super().__init__(parent, background=_BG)
+		self.entries = []	# Loaded entries (see History.query)
+		self.complete = False	# All entries of filter loaded
+		self._setup_gui()
+		self._reload()
+
+	def _setup_gui(self):
+		self.geometry('900x560')
+		self.title("History")
+		self.grid_columnconfigure(0, weight=1)
+		self.grid_columnconfigure(1, weight=2)
+		self.grid_rowconfigure(1, weight=1)
+
+		f = tk.Frame(self, background=_BG)
+		f.grid_columnconfigure(1, weight=1)
+		f.grid(row=0, column=0, columnspan=2, sticky='nswe')
+		LeftLabel(f, text="Url", font="monospace 9 bold",
+				fg="#333", bg=_BG)\
+			.grid(row=0, column=0, sticky='nswe', padx=(3,10))
+		self.vFilter = tk.StringVar(self, "")
+		e = tk.Entry(f, textvariable=self.vFilter, highlightthickness=0)
+		e.grid(row=0, column=1, sticky='nswe', pady=2)
+		e.bind("<Return>", lambda ev: self._reload())
+		self.lCount = LeftLabel(f, font="monospace 9", fg="#333", bg=_BG)
+		self.lCount.grid(row=0, column=2, sticky='nswe', padx=10)
+
+		fl = tk.Frame(self)
+		fl.grid_columnconfigure(0, weight=1)
+		fl.grid_rowconfigure(0, weight=1)
+		fl.grid(row=1, column=0, sticky='nswe')
+		self.scroll = tk.Scrollbar(fl, orient='vertical')
+		self.scroll.grid(row=0, column=1, sticky='ns')
+		self.lEntries = tk.Listbox(fl, font="monospace 9", bg='#292929',
+				fg='#eee', highlightthickness=0,
+				selectmode=tk.SINGLE, activestyle='none',
+				exportselection=False,
+				yscrollcommand=self._on_scroll)
+		self.lEntries.grid(row=0, column=0, sticky='nswe')
+		self.scroll.configure(command=self.lEntries.yview)
+		self.lEntries.bind("<<ListboxSelect>>", self._on_select)
+
+		self.tEntry = ScrollTextFrame(self, disabled=True,
+				font="monospace 9", bg='#292929', fg='#eee')
+		self.tEntry.tag_config('head', foreground='#5cd65c')
+		self.tEntry.grid(row=1, column=1, sticky='nswe')
+
+		btns = {" close " : self.destroy,
+			" clear history " : self._clear}
+		ButtonFrame(self, btns, style='label', bg="#bfbfbf",
+				btn_fg='#eee', btn_fg_hover='#ddd',
+				btn_font="Arial 10", btn_bg="#606060",
+				btn_bg_hover="#808080", btn_pady=3,
+				btn_padx=(0,5))\
+			.grid(row=2, column=0, columnspan=2, sticky='nswe')
+
+	def _reload(self):
+		self.entries = []
+		self.complete = False
+		self.lEntries.delete(0, tk.END)
+		self.tEntry.clear_text()
+		self._load_page()
+
+	def _load_page(self):
+		# Append next page of entries to the list
+		hist = history_get()
+		if self.complete or not hist:
+			return
+		filt = self.vFilter.get().strip()
+		page = hist.query(url=filt if filt else None,
+				limit=PAGE_SIZE, offset=len(self.entries))
+		self.complete = len(page) < PAGE_SIZE
+		for e in page:
+			self.lEntries.insert(tk.END, "{} {:>3} {:<6} {}".format(
+				time.strftime("%m-%d %H:%M:%S",
+					time.localtime(e['time'])),
+				e['status'] if e['status'] else "-",
+				e['method'], e['endpoint'] if e['endpoint']
+						else e['url']))
+		self.entries.extend(page)
+		self.lCount['text'] = "{}{} entries".format(len(self.entries),
+				"" if self.complete else "+")
+
+	def _on_scroll(self, first, last):
+		self.scroll.set(first, last)
+		if float(last) >= 1.0 and not self.complete:
+			self.after_idle(self._load_page)
+
+	def _on_select(self, ev=None):
+		sel = self.lEntries.curselection()
+		hist = history_get()
+		if not sel or not hist:
+			return
+		res = hist.load(self.entries[sel[0]]['id'])
+		self.tEntry.clear_text()
+		if not res:
+			self.tEntry.add_text("Entry has been deleted")
+			return
+		meta,body = res
+		self.tEntry.add_text("{} {}\n{} {}\n\n".format(meta['method'],
+			meta['url'], meta['status'], meta['reason']), 'head')
+		self.tEntry.add_text("".join("{}: {}\n".format(k, v)
+			for k,v in meta['headers'].items()) + "\n")
+		if meta['timing']:
+			self.tEntry.add_text("  ".join("{} {:.1f}ms".format(p,
+				1000*v) for p,v in meta['timing'].items() if v)
+				+ "\n\n")
+		self.tEntry.add_text(_body_text(meta, body))
+
+	def _clear(self):
+		hist = history_get()
+		if hist:
+			hist.clear()
+		self._reload()
+
+
+def _body_text(meta, body):
+	# Get body as (pretty printed) string
+	text = body[:BODY_SHOW_SIZE].decode("utf-8", errors="replace")
+	if meta['truncated'] or len(body) > BODY_SHOW_SIZE:
+		return text + "\n... ({} total)".format(
+				httpclient_format_size(meta['size']))
+	ctype = ""
+	for k,v in meta['headers'].items():
+		if k.lower() == 'content-type':
+			ctype = v
+	if 'json' in ctype:
+		try:
+			return json.dumps(json.loads(text), indent=2)
+		except ValueError:
+			pass
+	return text
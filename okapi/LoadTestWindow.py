@@ -0,0 +1,157 @@
+import tkinter as tk
+
+from widgets import LeftLabel
+from widgets import ButtonFrame
+from widgets import ScrollTextFrame
+from httpclient import httpclient_format_size
+from loadtest import LoadTest
+from loadtest import LOADTEST_MAX_CONCURRENCY
+
+"""
+|-----------------------------------------------|
+| GET http://localhost/users/123		|
+|-----------------------------------------------|
+| Requests     [1000    ]			|
+| Concurrency  [10      ]			|
+| Rate (req/s) [0       ]  (0 = unlimited)	|
+|-----------------------------------------------|
+| 1000/1000 requests  4.2 sec  238.1 req/s	|
+| p50 0.041  p90 0.049  p99 0.054  max 0.067	|
+| 200  ....  980				|
+| 503  ....   20				|
+| ...						|
+|-----------------------------------------------|
+| [CLOSE] [STOP] [START]			|
+|-----------------------------------------------|
+"""
+
+_BG = "#d0d0d0"
+
+# Interval (ms) of updating the statistics
+UPDATE_MS = 250
+
+class LoadTestWindow(tk.Toplevel):
+	"""
+	Window to run a load test of a filled-in endpoint request.
+	"""
+	def __init__(self, parent, method, url, data=None, headers=None):
+		super().__init__(parent, background=_BG)
+		self.method  = method
+		self.url     = url
+		self.data    = data
+		self.headers = headers
+		self.test    = None
+		self._setup_gui()
+		self.protocol("WM_DELETE_WINDOW", self._close)
+
+	def _setup_gui(self):
+		self.geometry('460x420')
+		self.title("Load test")
+		self.grid_columnconfigure(1, weight=1)
+		self.grid_rowconfigure(5, weight=1)
+
+		LeftLabel(self, text=" " + self.method + " " + self.url,
+				font="monospace 10", fg='#eee', bg="#575757")\
+			.grid(row=0, column=0, columnspan=3, sticky='nswe')
+
+		self.vars = {}
+		opts = (('count', "Requests", 100, ""),
+			('concurrency', "Concurrency", 10,
+				"(max. " + str(LOADTEST_MAX_CONCURRENCY) + ")"),
+			('rps', "Rate (req/s)", 0, "(0 = unlimited)"))
+		for y,(key,text,default,info) in enumerate(opts):
+			LeftLabel(self, text=text, font="monospace 9 bold",
+					fg="#333", bg=_BG)\
+				.grid(row=y+1, column=0, sticky='nswe', padx=(3,10))
+			v = tk.StringVar(self, str(default))
+			tk.Entry(self, textvariable=v, width=10,
+					highlightthickness=0)\
+				.grid(row=y+1, column=1, sticky='nsw', pady=1)
+			LeftLabel(self, text=info, font="monospace 8",
+					fg="#555", bg=_BG)\
+				.grid(row=y+1, column=2, sticky='nswe', padx=3)
+			self.vars[key] = v
+
+		self.tStats = ScrollTextFrame(self, disabled=True,
+				font="monospace 9", bg='#292929', fg='#eee')
+		self.tStats.tag_config('bar', foreground='#5cd65c')
+		self.tStats.tag_config('error', foreground='#ff3333')
+		self.tStats.grid(row=5, column=0, columnspan=3, sticky='nswe',
+				pady=(5,0))
+
+		btns = {" close " : self._close,
+			" stop "  : self._stop,
+			" start " : self._start}
+		ButtonFrame(self, btns, style='label', bg="#bfbfbf",
+				btn_fg='#eee', btn_fg_hover='#ddd',
+				btn_font="Arial 10", btn_bg="#606060",
+				btn_bg_hover="#808080", btn_pady=3,
+				btn_padx=(0,5))\
+			.grid(row=6, column=0, columnspan=3, sticky='nswe')
+
+	def _get_options(self):
+		# Get count, concurrency and rps (None if invalid).
+		try:
+			count = int(self.vars['count'].get())
+			conc  = int(self.vars['concurrency'].get())
+			rps   = float(self.vars['rps'].get() or 0)
+		except ValueError:
+			return None
+		if count < 1 or conc < 1 or rps < 0:
+			return None
+		return count,conc,rps
+
+	def _start(self):
+		if self.test and self.test.is_running():
+			return
+		opts = self._get_options()
+		if not opts:
+			self.tStats.set_text("Invalid options")
+			return
+		count,conc,rps = opts
+		self.test = LoadTest(self.method, self.url, self.data,
+				self.headers, count, conc, rps)
+		self.test.start()
+		self._update()
+
+	def _stop(self):
+		if self.test:
+			self.test.stop()
+
+	def _close(self):
+		self._stop()
+		self.destroy()
+
+	def _update(self):
+		# Show statistics, repeat while test is running.
+		if not self.test or not self.winfo_exists():
+			return
+		self._show_stats(self.test.stats.snapshot())
+		if self.test.is_running():
+			self.after(UPDATE_MS, self._update)
+
+	def _show_stats(self, s):
+		t = self.tStats
+		t.clear_text()
+		t.add_text("{}/{} requests  {:.2f} sec  {:.1f} req/s  {}\n".format(
+			s['done'], self.test.count, s['elapsed'],
+			s['throughput'], httpclient_format_size(s['bytes'])))
+		t.add_text("p50 {:.4f}  p90 {:.4f}  p99 {:.4f}  max {:.4f} sec\n".format(
+			s['p50'], s['p90'], s['p99'], s['max']))
+		if s['done']:
+			t.add_text("errors {} ({:.1f}%)\n".format(s['errors'],
+				100 * s['errors'] / s['done']),
+				'error' if s['errors'] else None)
+
+		# Responses by status code
+		t.add_text("\nStatus\n")
+		for code,n in sorted(s['status'].items(), key=lambda x: str(x[0])):
+			tag = 'error' if type(code) != int or code >= 400 else None
+			t.add_text("  {:<16} {}\n".format(str(code), n), tag)
+
+		# Latency histogram
+		t.add_text("\nLatency (sec)\n")
+		nmax = max([n for _,n in s['histogram']], default=0)
+		for upper,n in s['histogram']:
+			t.add_text("  <{:<9.4f} {:>7} ".format(upper, n))
+			t.add_text("#" * max(1, int(30 * n / nmax)) + "\n", 'bar')
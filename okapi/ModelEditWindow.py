@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk
-import json
 #from tkinter.messagebox import askyesno
 
 from widgets import ButtonLabel
@@ -89,12 +88,12 @@ class ModelEditWindow(tk.Toplevel):
 			elif not self.mod_dict['attributes']:
 				self.msg("No attributes set !", 1)
 			else:
-				doc.DOC['models'][self.model_name] = self.mod_dict
+				doc.DOC_add_model(self.model_name, self.mod_dict)
 				self.parent.load_from_DOC()
 				self.destroy()
 				print("\nStoring Model: " + self.model_name)
-				print(json.dumps(doc.DOC, indent=4),
-					end="\n===============\n")
+				doc.DOC_print()
+				print("===============")
 
 		else:	self.destroy()
 
@@ -107,7 +107,7 @@ class ModelListItem(tk.Frame):
 				message='Do you really want to delete model ' \
 						+ self.model_name + '?')
 		if yes:
-			del doc.DOC['models'][self.model_name]
+			doc.DOC_delete_model(self.model_name)
 			print(". deleted model: " + self.model_name)
 			self.parent.A.msg("Deleted '"+self.model_name+"'")
 			self.parent.load_from_DOC()
@@ -13,6 +13,14 @@ from ApiDoc import ApiDoc
 from DOC import DOC as doc
 from widgets import Tablist
 from codegen import codegen
+from httpclient import httpclient_close
+from uidispatch import uidispatch_attach
+from reqengine import reqengine_shutdown
+from httpcache import httpcache_open
+from httpcache import httpcache_close
+from history import history_open
+from history import history_close
+from HistoryWindow import HistoryWindow
 
 OKAPI_VERSION = "0.1"
 OKAPI_RELEASE = "okapi v" + OKAPI_VERSION + " (2024)"
@@ -23,6 +31,8 @@ class OkAPI:
 		~/.okapi/uris.txt
 		~/.okapi/user_agents.txt
 		~/.okapi/apidoc/<api-name>.json
+		~/.okapi/cache/
+		~/.okapi/history/
 	"""
 
 	def __init__(self, basedir=None):
@@ -45,8 +55,14 @@ class OkAPI:
 		Start okapi
 		"""
 		self._load_files()
+		httpcache_open(self.basedir)
+		history_open(self.basedir)
 		self._setup_gui()
 		self.root.mainloop()
+		reqengine_shutdown()
+		httpclient_close()
+		httpcache_close()
+		history_close()
 
 
 	def _load_files(self):
@@ -69,6 +85,7 @@ class OkAPI:
 		self.root = tk.Tk()
 		self.root.geometry('640x400')
 		self.root.title(OKAPI_RELEASE)
+		uidispatch_attach(self.root)
 		self.root.grid_columnconfigure(0, weight=1)
 		self.root.grid_rowconfigure(0, weight=1)
 
@@ -128,6 +145,8 @@ class OkAPI:
 			self.fApiDoc.on_delete_doc()
 		elif cmd == "save":
 			self.fApiDoc.on_save_doc()
+		elif cmd == "validate":
+			self.fApiDoc.on_validate_doc()
 		self.vMenuReqOpen.set(0)
 		self._open_request_view()
 
@@ -149,6 +168,9 @@ class OkAPI:
 		mFile.add_command(label='Open', command=lambda:self._exec_apidoc_command("open"))
 		mFile.add_command(label='Save', command=lambda:self._exec_apidoc_command("save"))
 		mFile.add_command(label='Delete', command=lambda:self._exec_apidoc_command("delete"))
+		mFile.add_command(label='Validate', command=lambda:self._exec_apidoc_command("validate"))
+		mFile.add_separator()
+		mFile.add_command(label='History', command=lambda:HistoryWindow(self.root))
 		mFile.add_separator()
 		mFile.add_command(label='Exit',	command=self.root.destroy)
 		mFile.entryconfig("Delete", foreground='#e00')
@@ -4,6 +4,7 @@ from tkinter import ttk
 from widgets import ToolTip
 from ResponseFrame import ResponseFrame
 from RequestOptionsFrame import RequestOptionsFrame
+import DOC as doc
 
 """
 |---------------------------------------|
@@ -100,11 +101,18 @@ class RequestFrame(tk.Frame):
 		   not uri.startswith("https://"):
 			uri = "http://" + uri
 
+		# Show documented endpoint matching the url
+		match = doc.DOC_match_endpoint(self.vMethod.get(), uri)
+		if match:
+			items = ", ".join([k+"="+v for k,v in match[1].items()])
+			self.O.msg("Endpoint: " + self.vMethod.get() + " " +\
+				match[0] + (" ("+items+")" if items else ""), 2)
+
 		body,hdrs,auth = self.fOpts.get()
 
 		# TODO: body, header, auth
 		self.fResp.request(self.vMethod.get(), uri, body,
-					hdrs, auth)
+					hdrs, auth, self.fOpts.get_settings())
 
 
 
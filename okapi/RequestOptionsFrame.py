@@ -5,7 +5,10 @@ from tkinter import ttk
 from widgets import LeftLabel
 from widgets import ToolTip
 from widgets import ScrollTextFrame
+from widgets import JsonEditStyler
 from widgets import Tablist
+from httpretry import HTTPRETRY_SETTINGS
+from httpretry import httpretry_parse_settings
 
 TAB_FONT="Arial 10"
 BTN_FONT="Monospace 7 bold"
@@ -40,6 +43,13 @@ class RequestOptionsFrame(tk.Frame):
 		# TODO auth
 		return body,headers,None
 
+	def get_settings(self):
+		"""
+		Get timeouts/retries of the request (see httpretry.py),
+		values not set use the apidoc's settings.
+		"""
+		return self.frames['timeout'].get()
+
 
 	def _setup_gui(self):
 		self.grid_columnconfigure(0, weight=1)
@@ -48,14 +58,16 @@ class RequestOptionsFrame(tk.Frame):
 			'body' : (' Body ', lambda:self._open_frame('body')),
 			'hdrs' : (' Header ', lambda:self._open_frame('hdrs')),
 			'uagent' : (' Useragent ', lambda:self._open_frame('uagent')),
-			'auth' : (' Authenticate ', lambda:self._open_frame('auth'))
+			'auth' : (' Authenticate ', lambda:self._open_frame('auth')),
+			'timeout' : (' Timeout ', lambda:self._open_frame('timeout'))
 		}
 		self.tabs = Tablist(self, tab_btns, bg_hover='#ccc', bg='#bbb')
 		self.frames = {
 			'body' : RequestBodyFrame(self, self.okapi),
 			'hdrs' : RequestHeadersFrame(self, self.okapi),
 			'uagent' : RequestUseragentFrame(self, self.okapi),
-			'auth' : RequestAuthFrame(self, self.okapi)
+			'auth' : RequestAuthFrame(self, self.okapi),
+			'timeout' : RequestTimeoutFrame(self, self.okapi)
 		}
 		self.frames['hdrs'].set({"DNT":"1"})
 		self.current_frame = None
@@ -88,6 +100,7 @@ class RequestBodyFrame(tk.Frame):
 		self.txtBody = ScrollTextFrame(self, height=4, font='monospace 9')
 		self.txtBody.grid(row=0, column=0,
 				sticky='nswe', rowspan=3, padx=2, pady=2)
+		self.styler = JsonEditStyler(self.txtBody.text)
 
 		self.btnLoad = tk.Button(self, text="load",
 				font=BTN_FONT, command=self._on_load,
@@ -102,6 +115,7 @@ class RequestBodyFrame(tk.Frame):
 
 	def set(self, text):
 		self.txtBody.set_text(text)
+		self.styler.update()
 
 	def get(self):
 		return self.txtBody.get_text()
@@ -111,6 +125,7 @@ class RequestBodyFrame(tk.Frame):
 
 	def _on_clear(self):
 		self.txtBody.clear_text()
+		self.styler.update()
 
 
 
@@ -210,6 +225,39 @@ class RequestUseragentFrame(tk.Frame):
 	def cbUAgent_on_select(self, event):
 		pass
 
+class RequestTimeoutFrame(tk.Frame):
+	"""
+	Tab where timeouts and retries of the request can be set.
+	"""
+	def __init__(self, parent, okapi):
+		super().__init__(parent)
+		self.okapi = okapi
+		self.vSettings = {k:tk.StringVar(self) for k in HTTPRETRY_SETTINGS}
+		self._setup_gui()
+
+	def get(self):
+		"""
+		Get settings dictionary, invalid values are reset.
+		"""
+		settings,invalid = httpretry_parse_settings(
+				{k:v.get() for k,v in self.vSettings.items()})
+		for k in invalid:
+			self.okapi.msg("Invalid " + HTTPRETRY_SETTINGS[k].lower()
+					+ " value, using default", 1)
+			self.vSettings[k].set("")
+		return settings
+
+	def _setup_gui(self):
+		self.configure(pady=3)
+		for i,(k,label) in enumerate(HTTPRETRY_SETTINGS.items()):
+			tk.Label(self, text=label, font='monospace 8 bold')\
+				.grid(row=0, column=2*i, padx=(3,2))
+			tk.Entry(self, textvariable=self.vSettings[k], width=6)\
+				.grid(row=0, column=2*i+1, sticky='w', padx=(0,6))
+		ToolTip(self, "Timeouts (sec) and retries of this request,\n"
+				"empty values use the apidoc's settings")
+
+
 class RequestAuthFrame(tk.Frame):
 	"""
 	Tab where authentication information can be added
@@ -1,12 +1,28 @@
 import tkinter as tk
 from tkinter.ttk import Progressbar
-import threading
 import requests
+from requests.structures import CaseInsensitiveDict
+import time
 from urllib.parse import urlparse
 
 from widgets import ScrollTextFrame
+from widgets import VirtualTextFrame
 from widgets import LeftLabel
 from widgets import TextStyler
+from widgets import ButtonLabel
+from httpclient import httpclient_request
+from httpclient import httpclient_receive
+from httpclient import httpclient_format_size
+from httpclient import httpclient_read_file
+from httpclient import HTTP_CHUNK_SIZE
+from httpcache import httpcache_get
+from httptiming import TIMING_PHASES
+from httptiming import httptiming_total
+from history import history_get
+from httpretry import httpretry_policy
+from reqengine import reqengine_submit
+from reqengine import RequestCancelled
+from bodyformat import BodyFormatter
 
 import DOC as doc
 
@@ -24,32 +40,106 @@ import DOC as doc
 |     <fozi>hello wolrd</fozi>		|	|		|
 |     <fazi>god bless you</fazi>	|	|		|
 |---------------------------------------|	|---------------|
+
+The body is received in chunks (see httpclient_receive) and formatted
+(decoded, pretty printed and highlighted) by the worker while it
+arrives (see bodyformat.py). The formatted pieces are appended to the
+body frame on the Tk thread, a few per frame. Formatting of a
+response is cancelled with its request (e.g. by a newer request).
+The body frame keeps the text in python and shows the visible part
+only (see widgets.VirtualTextFrame), so large bodies stay scrollable.
+Responses with ETag/Last-Modified are cached (see httpcache.py), a
+'304 Not Modified' is shown with the cached response.
+Every received response is added to the history (see history.py).
+Timeouts and retries of requests are set by a RetryPolicy (see
+httpretry.py), 'cancel' aborts the request while it's running.
 """
 
+# Larger bodies are shown truncated
+BODY_RENDER_SIZE = 16*1024*1024
+
+# Max. seconds until the response headers have been received
+# (connect, first byte and retries), the body is only limited by the
+# read timeout of the RetryPolicy (per read).
+RESPONSE_TIMEOUT = 600
+
 class ResponseFrame(tk.Frame):
 
 	def __init__(self, parent, msg_func):
 		super().__init__(parent)
 		self.parent = parent
 		self.msg = msg_func
+		self.body = None	# Last received httpclient.ResponseBody
+		self.job = None		# Running request (reqengine.Job)
 		self._setup_gui()
 
 
-	def request(self, method, url, data=None, headers=None, auth=None):
+	def request(self, method, url, data=None, headers=None, auth=None,
+			options=None):
 		"""
 		Called when 'send' button has been pressed.
 		Collects all data needed for a request (from gui)
-		and starts the request thread.
+		and submits it to the request engine. A request still
+		running is cancelled.
+		Args:
+		  options: Timeouts/retries overriding the apidoc's
+			   settings (see httpretry.py)
 		"""
+		self.cancel()
 		self.clear()
-		thread = _HTTPSendRecvThread(self, self.msg, method,
-				url, data, headers, auth)
-		thread.start()
+		self.pbar.grid(row=3, column=0, sticky='we')
+		self.bCancel.grid(row=3, column=1, sticky='nswe')
+		self.pbar.start()
+		policy = httpretry_policy(doc.DOC.get('settings'), options)
+		# Match the endpoint here, DOC isn't used by workers
+		m = doc.DOC_match_endpoint(method, url)
+		meta = {'time' : time.time(), 'api' : doc.DOC.get('name'),
+			'method' : method, 'url' : url,
+			'endpoint' : m[0] if m else None,
+			'request_headers' : dict(headers) if headers else {},
+			'request_body' : data if isinstance(data, str) else None}
+		self.job = reqengine_submit(_send_recv, self, method, url,
+				data, headers, auth, meta, policy,
+				timeout=RESPONSE_TIMEOUT, on_done=self._on_done,
+				on_discard=_discard)
+
+	def cancel(self):
+		"""
+		Cancel running request (if any).
+		"""
+		if self.job:
+			self.job.cancel()
+			self._stop_progress()
+
+	def _on_cancel(self):
+		if self.job:
+			self.cancel()
+			self.msg("Request cancelled", 1)
+
+	def _on_done(self, job, res, err):
+		if job is not self.job:
+			# Result of cancelled request
+			if res: res[1].close()
+			return
+		self._stop_progress()
+		if isinstance(err, RequestCancelled):
+			self.msg("Request cancelled", 1)
+		elif err:
+			self.msg(str(err), 1)
+			print("Failed to request", end="\n > ")
+			print(err)
+		else:	self.set_body(*res)
+
+	def _stop_progress(self):
+		self.job = None
+		self.pbar.stop()
+		self.pbar.grid_remove()
+		self.bCancel.grid_remove()
 
 	def set_response(self, resp, method, url):
 		"""
-		Display request header, response header and response body
-		in according text fields.
+		Display request header and response header in according
+		text fields (the body is set with set_body()).
 		Args:
 		  resp: The response (requests.Response)
 		"""
@@ -59,7 +149,37 @@ class ResponseFrame(tk.Frame):
 		self.fStatus.set_method_and_url(method, url)
 		self.fStatus.grid(row=1, column=0, sticky='nswe')
 		self.fHeaders.set_headers(resp)
-		self.fBody.set_body(resp)
+
+	def set_progress(self, body):
+		"""
+		Show bytes received and throughput of body that is
+		still being received.
+		Args:
+		  body: The body received so far (httpclient.ResponseBody)
+		"""
+		self.fTitle.set_progress(body)
+
+	def append_body(self, styled):
+		"""
+		Append formatted piece of the body (see bodyformat.py).
+		Args:
+		  styled: StyledText
+		"""
+		self.fBody.append_styled(styled)
+
+	def set_body(self, resp, body):
+		"""
+		Display completely received body.
+		Args:
+		  resp: The response (requests.Response)
+		  body: The body (httpclient.ResponseBody)
+		"""
+		if self.body:
+			self.body.close()
+		self.body = body
+		self.fTitle.set_progress(body)
+		self.fStatus.set_timing(getattr(resp, 'timing', None))
+		self.fBody.set_body(body)
 
 	def clear(self, ev=None):
 		self.fTitle.clear()
@@ -76,6 +196,13 @@ class ResponseFrame(tk.Frame):
 		self.fStatus   = _StatusFrame(self)
 		self.fBody     = _BodyFrame(self)
 		self.fHeaders  = _HeaderFrame(self)
+		self.pbar      = Progressbar(self, orient='horizontal',
+					mode='indeterminate', length=200)
+		self.bCancel   = ButtonLabel(self, text=" cancel ",
+					on_click=self._on_cancel, font="Arial 8",
+					hover_font="Arial 8", bg="#606060",
+					fg="#eee", hover_bg="#808080",
+					hover_fg="#ddd", anchor='center')
 
 		self.fTitle.grid(row=0, column=0, sticky='nswe')
 		self.fBody.grid(row=2, column=0, sticky='nswe')
@@ -110,8 +237,16 @@ class _TitleFrame(tk.Frame):
 		t = resp.elapsed.total_seconds()
 		self.lTime['text'] = "(" + str(t) + " sec)"
 
+	def set_progress(self, body):
+		s = httpclient_format_size(body.size) + "  " +\
+			httpclient_format_size(int(body.throughput())) + "/s"
+		if body.complete:
+			s += "  in {:.3f} sec".format(body.duration)
+		self.lProgress['text'] = s
+
 	def clear(self):
 		self.lTime['text'] = ""
+		self.lProgress['text'] = ""
 
 	def _setup_gui(self):
 		self.grid_columnconfigure(10, weight=1)
@@ -124,6 +259,10 @@ class _TitleFrame(tk.Frame):
 		self.lTime = tk.Label(self, font="Verdana 8",
 			fg="#f0f0f0", bg="#666")
 		self.lTime.grid(row=0, column=1, sticky='nswe', padx=5)
+		# Received bytes and throughput
+		self.lProgress = tk.Label(self, font="Verdana 8",
+			fg="#f0f0f0", bg="#666")
+		self.lProgress.grid(row=0, column=11, sticky='nswe', padx=5)
 
 
 class _StatusFrame(tk.Frame):
@@ -134,6 +273,11 @@ class _StatusFrame(tk.Frame):
 	|-------------------------------------------------|
 	| 200 | Ok | application/json | (3023 byte) | ... |
 	|-------------------------------------------------|
+	| dns       2.1 ms  ==                            |
+	| connect   0.4 ms    =                           |
+	| ttfb     40.2 ms     ================           |
+	| transfer  9.8 ms                     ====       |
+	|-------------------------------------------------|
 	"""
 	BG = "#d2d2d2"
 	def __init__(self, parent):
@@ -153,6 +297,21 @@ class _StatusFrame(tk.Frame):
 		if 'content-length' in resp.headers:
 			self.lLength['text'] = "("+resp.headers['content-length']+")"
 
+		self.set_timing(getattr(resp, 'timing', None))
+
+		if getattr(resp, 'cache_hit', False):
+			self.lCache['text'] = "cached (304)"
+
+		info = getattr(resp, 'pool_info', None)
+		if info:
+			# Connection reuse of the session pool
+			self.lConn['text'] = ("reused" if info['reused'] else "new") +\
+				" connection  (" + str(info['connections']) +\
+				" for " + str(info['requests']) + " requests)"
+
+	def set_timing(self, timing):
+		self.cTiming.set(timing)
+
 	def clear(self):
 		self.lMethod['text'] = ""
 		self.lUri['text']    = ""
@@ -160,12 +319,15 @@ class _StatusFrame(tk.Frame):
 		self.lReason['text'] = ""
 		self.lLength['text'] = ""
 		self.lType['text']   = ""
+		self.lConn['text']   = ""
+		self.lCache['text']  = ""
+		self.set_timing(None)
 
 	def _setup_gui(self):
 		# Request info (method + url)
 		self.fReqInfo = tk.Frame(self, background="#aaa")
 		self.fReqInfo.grid(row=0, column=0, sticky='nswe',
-				columnspan=5, padx=1)
+				columnspan=7, padx=1)
 		self.lMethod = LeftLabel(self.fReqInfo, font="Verdana 9 bold",
 					fg="#222", bg="#aaa")
 		self.lMethod.grid(row=0, column=0, sticky='nswe', padx=(3,0))
@@ -190,24 +352,75 @@ class _StatusFrame(tk.Frame):
 		self.lType = LeftLabel(self, font="monospace 8",
 			fg="#004d00", bg=self.BG)
 		self.lType.grid(row=1, column=4, sticky='nswe', padx=3)
-
-class _BodyFrame(ScrollTextFrame):
+		# Connection reuse
+		self.lConn = LeftLabel(self, font="monospace 8",
+			fg="#555", bg=self.BG)
+		self.lConn.grid(row=1, column=5, sticky='nswe', padx=3)
+		# Response served from cache
+		self.lCache = LeftLabel(self, font="monospace 8 bold",
+			fg="#0050a0", bg=self.BG)
+		self.lCache.grid(row=1, column=6, sticky='nswe', padx=3)
+		# Timing waterfall
+		self.cTiming = _TimingWaterfall(self, self.BG)
+		self.cTiming.grid(row=2, column=0, columnspan=7, sticky='nswe')
+
+class _TimingWaterfall(tk.Canvas):
+	"""
+	Timing breakdown of a request (see httptiming.py), one row
+	per phase, each bar starting where the previous ended.
+	"""
+	ROW = 12
+	LABEL_WIDTH = 130
+	COLORS = {'dns':'#009999', 'connect':'#e68a00', 'tls':'#9933cc',
+		'send':'#666', 'ttfb':'#2eb82e', 'transfer':'#0066ff'}
+
+	def __init__(self, parent, bg):
+		super().__init__(parent, height=0, background=bg,
+				highlightthickness=0)
+		self.timing = None
+		self.bind("<Configure>", lambda e: self._draw())
+
+	def set(self, timing):
+		self.timing = timing
+		phases = [p for p in TIMING_PHASES if timing and p in timing]
+		self.configure(height=len(phases)*self.ROW + (2 if phases else 0))
+		self._draw()
+
+	def _draw(self):
+		self.delete('all')
+		if not self.timing:
+			return
+		total = httptiming_total(self.timing)
+		width = max(self.winfo_width() - self.LABEL_WIDTH - 5, 10)
+		x = 0.0
+		y = 1
+		for p in TIMING_PHASES:
+			if p not in self.timing:
+				continue
+			t = self.timing[p]
+			self.create_text(3, y, anchor='nw', font="monospace 7",
+				fill='#333', text="{:<8} {:>9.1f} ms".format(p, 1000*t))
+			x0 = self.LABEL_WIDTH + (x / total * width if total else 0)
+			x1 = x0 + max(1, t / total * width if total else 0)
+			self.create_rectangle(x0, y+2, x1, y+self.ROW-2, width=0,
+				fill=self.COLORS[p])
+			x += t
+			y += self.ROW
+
+
+class _BodyFrame(VirtualTextFrame):
 	"""
 	Frame where the response body is shown.
 	"""
 	def __init__(self, parent):
-		super().__init__(parent, disabled=True, bg='#292929', fg='#eee')
+		super().__init__(parent, bg='#292929', fg='#eee')
 		self.styler = TextStyler(self)
 
-	def set_body(self, resp:requests.Response):
-		if 'content-type' in resp.headers:
-			ctype = resp.headers['content-type']
-
-			if 'json' in ctype:
-				self.styler.set_json(resp.json())
-			elif 'xml' in ctype:
-				self.styler.set_xml(resp.json())
-			else:	self.text_text(resp.content)
+	def set_body(self, body):
+		# The body has been appended while formatting
+		if body.size > BODY_RENDER_SIZE:
+			self.add_text("\n\n... (truncated, " +\
+				httpclient_format_size(body.size) + " received)")
 
 	def clear(self):
 		self.clear_text()
@@ -273,52 +486,115 @@ class _HeaderFrame(tk.Frame):
 		self.tReq.grid(row=4, column=0, sticky='nswe')
 
 
-class _HTTPSendRecvThread(threading.Thread):
-	"""
-	Thread for sending the request and
-	receiving the response.
-	"""
-	def __init__(self, parent, msg_func, method, url,
-			data, hdrs, auth):
-		super().__init__()
-		self.parent = parent
-		self.msg    = msg_func
-		self.method = method
-		self.url    = url
-		self.data   = data
-		self.hdrs   = hdrs
-		self.auth   = auth
-
-		self.pbar = Progressbar(self.parent, orient='horizontal',
-			mode='indeterminate', length=200)
-		self.pbar.grid(row=3, column=0, sticky='we', columnspan=2)
-
-	def run(self):
-		print(". starting request ...")
-		print(self.method, " ", self.url)
-
-		self.pbar.start()
+def _formatter(resp):
+	# Formatter of the body of resp (see bodyformat.py)
+	return BodyFormatter(resp.headers.get('content-type'),
+			resp.encoding, BODY_RENDER_SIZE)
+
+def _post_body(job, frame, fmt, final=False):
+	# Post pieces formatted so far, the Tk thread inserts
+	# them one by one within its time budget per frame.
+	for piece in fmt.take(final):
+		job.post(frame.append_body, piece)
+
+def _discard(res):
+	# Close response received after the request has been
+	# cancelled (see reqengine.py).
+	resp,body = res
+	resp.close()
+	body.close()
+
+def _add_history(meta, resp, body):
+	# Add request and response to the history
+	hist = history_get()
+	if not hist:
+		return
+	meta = dict(meta)
+	meta['status'] = resp.status_code
+	meta['reason'] = resp.reason
+	meta['headers'] = dict(resp.headers)
+	meta['timing'] = getattr(resp, 'timing', {})
+	try:
+		hist.add(meta, body)
+	except Exception as e:
+		print("! Failed to add request to history")
+		print("  " + str(e))
+
+def _send(job, frame, method, url, data, hdrs, auth, policy):
+	# Send request, retry as long as the policy allows.
+	attempt = 0
+	while True:
+		job.check()
+		resp = err = None
 		try:
-			resp = requests.request(
-				self.method,
-				self.url,
-				data=self.data,
-				headers=self.hdrs,
-				auth=self.auth,
-				timeout=5)
-			self.parent.set_response(resp, self.method, self.url)
-
+			resp = httpclient_request(method, url, data=data,
+				headers=hdrs, auth=auth, timeout=policy.timeout(),
+				stream=True, job=job)
+			delay = policy.delay(method, attempt, resp=resp)
 		except requests.exceptions.RequestException as e:
-			self.msg(str(e), 1)
-			print("Failed to request '" + self.url + "'", end="\n > ")
-			print(e)
-
-		self.pbar.grid_remove()
-
-
-
-
-
-
-
-
+			job.check()
+			err = e
+			delay = policy.delay(method, attempt, error=e)
+		if delay == None:
+			if err:
+				raise err
+			return resp
+		if resp != None:
+			resp.close()
+		attempt += 1
+		reason = str(resp.status_code) if resp != None else type(err).__name__
+		print(". retry {}/{} in {:.2f} sec ({})".format(attempt,
+			policy.retries, delay, reason))
+		job.post(frame.msg, "Retry {}/{} in {:.1f} sec ({})".format(
+			attempt, policy.retries, delay, reason), 2,
+			key=(frame, 'msg'))
+		if job.cancelled.wait(delay):
+			raise RequestCancelled()
+
+def _send_recv(job, frame, method, url, data, hdrs, auth, meta, policy):
+	# Send request and receive the response (in a worker
+	# thread of the request engine).
+	print(". starting request ...")
+	print(method, " ", url)
+	cache = httpcache_get()
+	entry = cache.lookup(method, url, hdrs) if cache else None
+	resp = _send(job, frame, method, url, data,
+			cache.conditional_headers(entry, hdrs) if entry else hdrs,
+			auth, policy)
+	job.end_timeout()
+
+	resp.cache_hit = entry != None and resp.status_code == 304
+	if resp.cache_hit:
+		# Not modified, show cached response
+		resp.close()
+		cache.touch(entry, dict(resp.headers))
+		resp.status_code = entry.status
+		resp.reason = entry.reason
+		resp.headers = CaseInsensitiveDict(entry.headers)
+		job.post(frame.set_response, resp, method, url)
+		body = httpclient_read_file(entry.path)
+		fmt = _formatter(resp)
+		for off in range(0, min(body.size, BODY_RENDER_SIZE),
+				HTTP_CHUNK_SIZE):
+			job.check()
+			fmt.feed(body.read(HTTP_CHUNK_SIZE, off))
+			_post_body(job, frame, fmt)
+		_post_body(job, frame, fmt, True)
+		_add_history(meta, resp, body)
+		return resp,body
+
+	job.post(frame.set_response, resp, method, url)
+
+	fmt = _formatter(resp)
+	def on_progress(body):
+		# Show body formatted so far, coalesce progress updates
+		_post_body(job, frame, fmt)
+		job.post(frame.set_progress, body, key=(frame, 'progress'))
+
+	body = httpclient_receive(resp, on_progress, job=job,
+			on_chunk=fmt.feed)
+	_post_body(job, frame, fmt, True)
+	if cache and cache.is_cacheable(method, resp):
+		cache.store(method, url, hdrs, resp, body)
+	_add_history(meta, resp, body)
+	return resp,body
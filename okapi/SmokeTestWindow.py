@@ -0,0 +1,118 @@
+import tkinter as tk
+
+from widgets import LeftLabel
+from widgets import ButtonFrame
+from widgets import ScrollTextFrame
+from smoketest import SmokeTest
+from smoketest import SMOKETEST_WORKERS
+from smoketest import smoketest_format
+import DOC as doc
+
+"""
+|-----------------------------------------------|
+| Workers [16   ]   120/500 endpoints  1.3 sec	|
+|-----------------------------------------------|
+| 200      0.012  GET /users			|
+| 404?     0.008  GET /users/{userId}		|
+| ERR      5.001  POST /upload			|
+|       ConnectTimeout: ...			|
+|-----------------------------------------------|
+| [CLOSE] [STOP] [RUN ALL]			|
+|-----------------------------------------------|
+ Status with '?' isn't documented in the endpoint's responses.
+"""
+
+_BG = "#d0d0d0"
+
+# Interval (ms) of showing new results
+UPDATE_MS = 200
+
+class SmokeTestWindow(tk.Toplevel):
+	"""
+	Window to send one request per endpoint of the apidoc.
+	"""
+	def __init__(self, parent):
+		super().__init__(parent, background=_BG)
+		self.test = None
+		self.nshown = 0		# Number of results shown
+		self._setup_gui()
+		self.protocol("WM_DELETE_WINDOW", self._close)
+
+	def _setup_gui(self):
+		self.geometry('560x460')
+		self.title("Smoke test - " + doc.DOC['name'])
+		self.grid_columnconfigure(0, weight=1)
+		self.grid_rowconfigure(1, weight=1)
+
+		f = tk.Frame(self, background=_BG)
+		f.grid_columnconfigure(2, weight=1)
+		f.grid(row=0, column=0, sticky='nswe')
+		LeftLabel(f, text="Workers", font="monospace 9 bold",
+				fg="#333", bg=_BG)\
+			.grid(row=0, column=0, sticky='nswe', padx=(3,10))
+		self.vWorkers = tk.StringVar(self, str(SMOKETEST_WORKERS))
+		tk.Entry(f, textvariable=self.vWorkers, width=6,
+				highlightthickness=0)\
+			.grid(row=0, column=1, sticky='nsw', pady=2)
+		self.lSummary = LeftLabel(f, font="monospace 9", fg="#333", bg=_BG)
+		self.lSummary.grid(row=0, column=2, sticky='nswe', padx=10)
+
+		self.tResults = ScrollTextFrame(self, disabled=True,
+				font="monospace 9", bg='#292929', fg='#eee')
+		self.tResults.tag_config('ok', foreground='#5cd65c')
+		self.tResults.tag_config('undocumented', foreground='#ffcc00')
+		self.tResults.tag_config('error', foreground='#ff3333')
+		self.tResults.grid(row=1, column=0, sticky='nswe')
+
+		btns = {" close "   : self._close,
+			" stop "    : self._stop,
+			" run all " : self._run}
+		ButtonFrame(self, btns, style='label', bg="#bfbfbf",
+				btn_fg='#eee', btn_fg_hover='#ddd',
+				btn_font="Arial 10", btn_bg="#606060",
+				btn_bg_hover="#808080", btn_pady=3,
+				btn_padx=(0,5))\
+			.grid(row=2, column=0, sticky='nswe')
+
+	def _run(self):
+		if self.test and self.test.is_running():
+			return
+		try:
+			workers = int(self.vWorkers.get())
+		except ValueError:
+			workers = SMOKETEST_WORKERS
+		self.tResults.clear_text()
+		self.nshown = 0
+		self.test = SmokeTest(workers=workers)
+		self.test.run()
+		self._update()
+
+	def _stop(self):
+		if self.test:
+			self.test.stop()
+
+	def _close(self):
+		self._stop()
+		self.destroy()
+
+	def _update(self):
+		# Append new results, repeat while test is running.
+		if not self.test or not self.winfo_exists():
+			return
+		running = self.test.is_running()
+		for r in self.test.get_results(self.nshown):
+			if r['error']:
+				tag = 'error'
+			elif r['documented']:
+				tag = 'ok'
+			else:	tag = 'undocumented'
+			self.tResults.add_text(smoketest_format(r) + "\n", tag)
+			self.nshown += 1
+
+		s = self.test.summary()
+		self.lSummary['text'] = "{}/{} endpoints  {:.2f} sec  {} ok  "\
+			"{} undoc.  {} errors".format(s['done'], s['total'],
+				s['elapsed'], s['ok'], s['undocumented'],
+				s['errors'])
+		if running:
+			self.after(UPDATE_MS, self._update)
@@ -0,0 +1,145 @@
+import codecs
+
+from jsonlex import JsonHighlighter
+from xmllex import XmlHighlighter
+from styledtext import StyledText
+
+"""
+Formatting of response bodies for display.
+
+A body is formatted chunk by chunk in stages:
+  1. Detect the type of the body ('json', 'xml' or 'text') from the
+     content type or, if that isn't conclusive, from the first bytes.
+  2. Decode the bytes (incrementally, multi-byte characters may be
+     split between chunks).
+  3. Pretty print and tokenize (see jsonlex.py and xmllex.py).
+  4. Compute the tag ranges (see styledtext.py).
+All stages run on the thread feeding the chunks (a worker of the
+request engine), the result is split into pieces of
+BODYFORMAT_PIECE_SIZE characters. The Tk thread only inserts the
+pieces, one call per piece, so that the insertion of a large body
+is spread over several frames (see uidispatch.py) and the gui stays
+responsive.
+Example:
+	fmt = BodyFormatter(resp.headers.get('content-type'), resp.encoding)
+	for chunk in chunks:
+		fmt.feed(chunk)
+		for piece in fmt.take():
+			job.post(frame.append_body, piece)
+	for piece in fmt.take(True):
+		job.post(frame.append_body, piece)
+"""
+
+# Characters inserted into the text area per call
+BODYFORMAT_PIECE_SIZE = 16*1024
+
+# Content types, whose bodies are sniffed
+_GENERIC_TYPES = ('', 'text/plain', 'application/octet-stream')
+
+
+def bodyformat_detect(content_type, head):
+	"""
+	Detect type of a body.
+	Args:
+	  content_type: Value of Content-Type header
+	  head:         First bytes of the body
+	Return:
+	  'json', 'xml' or 'text'
+	"""
+	ct = (content_type or '').split(';')[0].strip().lower()
+	if 'json' in ct:
+		return 'json'
+	if 'xml' in ct:
+		return 'xml'
+	if ct in _GENERIC_TYPES:
+		c = head.lstrip()[:1]
+		if c in (b'{', b'['):
+			return 'json'
+		if c == b'<':
+			return 'xml'
+	return 'text'
+
+def bodyformat_indent(head):
+	"""
+	Get indent for pretty printing a body starting with
+	head, None if it already has line breaks (isn't minified).
+	"""
+	return None if b"\n" in head.strip() else 2
+
+
+class _TextFormatter:
+	# Decodes text without highlighting
+	def __init__(self, encoding):
+		self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+	def feed(self, data, out, final=False):
+		out.add(self.decoder.decode(data, final))
+		return out
+
+	def close(self, out):
+		return self.feed(b"", out, True)
+
+
+class BodyFormatter:
+	"""
+	Formats a body chunk by chunk (see above).
+	"""
+	def __init__(self, content_type=None, encoding=None, max_size=None,
+			piece_size=BODYFORMAT_PIECE_SIZE):
+		"""
+		Args:
+		  content_type: Value of Content-Type header
+		  encoding:     Charset of the body (default utf-8)
+		  max_size:     Bytes formatted, the rest is skipped
+		  piece_size:   Max. characters per piece
+		"""
+		self.content_type = content_type
+		self.encoding = encoding or 'utf-8'
+		self.max_size = max_size
+		self.piece_size = piece_size
+		self.kind = None	# Detected type of the body
+		self.fmt = None		# Formatter of the kind
+		self.size = 0		# Bytes formatted
+		self.truncated = False
+		self.out = StyledText()
+
+	def _start(self, head):
+		# Detect type and create formatter
+		try:
+			codecs.lookup(self.encoding)
+		except LookupError:
+			self.encoding = 'utf-8'
+		self.kind = bodyformat_detect(self.content_type, head)
+		if self.kind == 'json':
+			self.fmt = JsonHighlighter(self.encoding,
+					bodyformat_indent(head))
+		elif self.kind == 'xml':
+			self.fmt = XmlHighlighter(self.encoding)
+		else:	self.fmt = _TextFormatter(self.encoding)
+
+	def feed(self, chunk):
+		"""
+		Format next chunk (bytes) of the body.
+		"""
+		if self.fmt == None:
+			self._start(chunk)
+		if self.max_size != None and self.size + len(chunk) > self.max_size:
+			chunk = chunk[:max(0, self.max_size - self.size)]
+			self.truncated = True
+		if chunk:
+			self.fmt.feed(chunk, self.out)
+			self.size += len(chunk)
+
+	def take(self, final=False):
+		"""
+		Get the text formatted since the last call.
+		Args:
+		  final: The whole body has been fed
+		Return:
+		  List of StyledText pieces
+		"""
+		if final and self.fmt:
+			self.fmt.close(self.out)
+		out = self.out
+		self.out = StyledText()
+		return out.split(self.piece_size)
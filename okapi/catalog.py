@@ -0,0 +1,178 @@
+import os
+import json
+from os.path import join as path_join
+
+from journal import journal_load
+from journal import journal_get_size
+from sqlitestore import sqlite_store_info
+
+"""
+Catalog of all apidocs stored at <basedir>/apidoc (json files and
+sqlite databases).
+
+Listing the stored apidocs would require to parse every single
+file, so some informations about each file are kept in an index
+at <basedir>/catalog.json:
+{
+  <FILENAME> : {			# Filename in <basedir>/apidoc
+    'name' : <str>,			# Api name
+    'version' : <str>,			# Api version
+    'n_endpoints' : <int>,		# Number of endpoints
+    'n_models' : <int>,			# Number of models
+    'size' : <int>,			# Filesize in bytes
+    'mtime' : <float>,			# Last modification time
+    'jsize' : <int>			# Size of journal (see journal.py)
+  },
+  ...
+}
+An entry is invalidated by comparing size and mtime with the
+file stat (and the size of its journal), so only files changed
+since the last scan are parsed.
+"""
+
+CATALOG_FILENAME = "catalog.json"
+
+def catalog_get_path(basedir):
+	""" Get path of catalog file """
+	return path_join(basedir, CATALOG_FILENAME)
+
+def catalog_load(basedir):
+	"""
+	Load catalog from <basedir>/catalog.json.
+	Returns empty dict if not exists or invalid.
+	"""
+	try:
+		f = open(catalog_get_path(basedir), "r")
+		cat = json.load(f)
+		f.close()
+		return cat if type(cat) == dict else {}
+	except FileNotFoundError:
+		return {}
+	except Exception as e:
+		print("! Failed to load catalog, " + str(e))
+		return {}
+
+def catalog_save(basedir, cat):
+	"""
+	Store catalog at <basedir>/catalog.json.
+	"""
+	p = catalog_get_path(basedir)
+	try:
+		f = open(p + ".tmp", "w")
+		json.dump(cat, f)
+		f.close()
+		os.replace(p + ".tmp", p)
+		return True
+	except Exception as e:
+		print("! Failed to store catalog " + p)
+		print("  " + str(e))
+		return False
+
+def catalog_make_entry(doc, st, jsize):
+	"""
+	Create catalog entry from apidoc dictionary, the
+	os.stat_result of the file it is stored at and the
+	size of its journal.
+	"""
+	return {
+		'name' : doc['name'],
+		'version' : doc.get('version', ''),
+		'n_endpoints' : sum([len(x) for x in doc['endpoints'].values()]),
+		'n_models' : len(doc['models']),
+		'size' : st.st_size,
+		'mtime' : st.st_mtime,
+		'jsize' : jsize
+	}
+
+def catalog_is_valid_entry(entry, st, jsize):
+	"""
+	Is catalog entry still valid for given os.stat_result
+	and journal size?
+	"""
+	return entry.get('size') == st.st_size and \
+		entry.get('mtime') == st.st_mtime and \
+		entry.get('jsize') == jsize
+
+def catalog_scan(basedir):
+	"""
+	Get catalog of all apidocs in <basedir>/apidoc.
+	Only files changed since the last scan are parsed, the
+	updated catalog is stored if anything has changed.
+	Return:
+	  Catalog dictionary (see above)
+	"""
+	cat = catalog_load(basedir)
+	new = {}
+	changed = False
+	p = path_join(basedir, "apidoc")
+	if not os.path.isdir(p):
+		return new
+
+	for file in os.listdir(p):
+		if not file.endswith(".json") and not file.endswith(".db"):
+			continue
+		filepath = path_join(p, file)
+		try:
+			st = os.stat(filepath)
+		except OSError:
+			continue
+
+		jsize = journal_get_size(filepath)
+		if file in cat and catalog_is_valid_entry(cat[file], st, jsize):
+			new[file] = cat[file]
+			continue
+		try:
+			if file.endswith(".db"):
+				new[file] = sqlite_store_info(filepath)
+				new[file].update({'size':st.st_size,
+					'mtime':st.st_mtime, 'jsize':jsize})
+			else:
+				doc = journal_load(filepath)
+				new[file] = catalog_make_entry(doc, st, jsize)
+			changed = True
+		except Exception as e:
+			print("! Failed to read apidoc '"+filepath+"'")
+			print("  " + str(e))
+
+	if changed or len(new) != len(cat):
+		catalog_save(basedir, new)
+	return new
+
+def catalog_set_entry(basedir, filepath, doc):
+	"""
+	Update catalog entry of given file from the apidoc
+	dictionary it was just written from. This saves parsing
+	the file at the next scan.
+	"""
+	try:
+		st = os.stat(filepath)
+	except OSError:
+		return False
+	cat = catalog_load(basedir)
+	cat[os.path.basename(filepath)] = catalog_make_entry(doc, st,
+			journal_get_size(filepath))
+	return catalog_save(basedir, cat)
+
+def catalog_get_names(basedir):
+	"""
+	Get sorted list with names of all stored apidocs.
+	"""
+	return sorted([e['name'] for e in catalog_scan(basedir).values()])
+
+def catalog_print(basedir):
+	"""
+	Print table with all stored apidocs.
+	"""
+	cat = catalog_scan(basedir)
+	entries = sorted(cat.values(), key=lambda e: e['name'])
+	nl = max([len(e['name']) for e in entries] + [4])
+	vl = max([len(e['version']) for e in entries] + [7])
+
+	print("Name".ljust(nl) + "  " + "Version".ljust(vl) +\
+		"  Endpoints  Models        Size")
+	for e in entries:
+		print(e['name'].ljust(nl) + "  " +\
+			e['version'].ljust(vl) + "  " +\
+			str(e['n_endpoints']).rjust(9) + "  " +\
+			str(e['n_models']).rjust(6) + "  " +\
+			str(e['size']).rjust(10))
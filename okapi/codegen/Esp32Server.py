@@ -1,9 +1,9 @@
-import re
 import os
 
 from . esp import EspCodeBase
 from . esp import esp_wifi_setup
 from . esp import esp_setup
+from uritemplate import uritemplate_get
 
 #
 # NOTE:
@@ -215,17 +215,15 @@ class Esp32ServerCode(EspCodeBase):
 		# Get endpoint path (might be a regex) and
 		# all the pathitems.
 		# Eg: "^\\/sensor\\/([0-9]+)\\/action\\/([a-zA-Z0-9]+)$"
-		pathitems = re.findall(r"\{(\w+)\}", path)
-		if not pathitems: return path,()
-		path = re.sub(r"\{\w+\}", "{}", path)
+		t = uritemplate_get(path)
+		if not t.items: return path,()
 		s = '^'
-		for x in path.split("/"):
-			if not x: continue
-			if x == "{}":
-				s += "\\\\/([a-zA-Z0-9]+)"
-			else:	s += "\\\\/"+x
+		for seg in t.segments():
+			s += "\\\\/"
+			for i,p in enumerate(seg):
+				s += "([a-zA-Z0-9]+)" if i % 2 else p
 		s += '$'
-		return s,pathitems
+		return s,t.items
 
 	def _make_init_path_items(self, pathitems, indent='\t'):
 		# Get pathitems initialization string
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+
+"""
+Sidecar offset index for lazy loading of large apidoc files.
+
+The index is stored at <name>.json.idx and holds the byte offset
+and length of every top level value and of every single endpoint
+in <name>.json:
+{
+  'size' : <int>,				# Size of <name>.json
+  'mtime' : <int>,				# mtime (ns) of <name>.json
+  'keys' : [[<KEY>, <OFFSET>, <LENGTH>], ...],	# Top level values
+  'endpoints' : {				# Endpoints
+    <METHOD> : [[<URI>, <OFFSET>, <LENGTH>], ...],
+    ...
+  }
+}
+An index not matching size and mtime of the apidoc file is rebuilt
+by scanning the file once (without keeping the parsed values).
+
+DocIndex keeps the apidoc file open, so endpoints can still be read
+after the file has been replaced (e.g. by journal compaction).
+"""
+
+INDEX_SUFFIX = ".idx"
+
+_decoder = json.JSONDecoder()
+_ws = re.compile(r"[ \t\n\r]*")
+
+def docindex_get_path(filepath):
+	""" Get path of index for given apidoc file """
+	return filepath + INDEX_SUFFIX
+
+def docindex_delete(filepath):
+	""" Delete index of given apidoc file (if exists) """
+	try:
+		os.unlink(docindex_get_path(filepath))
+	except FileNotFoundError:
+		pass
+
+def _skip(s, i):
+	# Skip whitespaces
+	return _ws.match(s, i).end()
+
+def _scan_key(s, i):
+	# Get key starting at s[i] and its end.
+	# The file is decoded as latin-1 (1 char = 1 byte), so
+	# non-ascii keys must be decoded again from utf-8.
+	key,end = _decoder.raw_decode(s, i)
+	if not key.isascii():
+		key = json.loads(s[i:end].encode("latin-1").decode("utf-8"))
+	return key,end
+
+def _scan_value(s, i):
+	# Get end of value starting at s[i]
+	return _decoder.raw_decode(s, i)[1]
+
+def _scan_object(s, i, on_member):
+	# Scan json object starting at s[i].
+	# on_member(key, start) is called for each member and
+	# must return the end of the member's value.
+	# Returns the end of the object.
+	i = _skip(s, i)
+	if s[i:i+1] != "{":
+		raise ValueError("Expected '{' at offset " + str(i))
+	i = _skip(s, i+1)
+	if s[i:i+1] == "}":
+		return i+1
+	while True:
+		key,i = _scan_key(s, i)
+		i = _skip(s, i)
+		if s[i:i+1] != ":":
+			raise ValueError("Expected ':' at offset " + str(i))
+		i = _skip(s, on_member(key, _skip(s, i+1)))
+		if s[i:i+1] == ",":
+			i = _skip(s, i+1)
+		elif s[i:i+1] == "}":
+			return i+1
+		else:	raise ValueError("Expected ',' or '}' at offset " + str(i))
+
+def docindex_build(fd):
+	"""
+	Build index by scanning the apidoc file with given fd.
+	Return:
+	  Index dictionary (see above)
+	"""
+	st = os.fstat(fd)
+	s = os.pread(fd, st.st_size, 0).decode("latin-1")
+	idx = {'size':st.st_size, 'mtime':st.st_mtime_ns,
+		'keys':[], 'endpoints':{}}
+
+	def on_uri(method, uri, i):
+		end = _scan_value(s, i)
+		idx['endpoints'][method].append([uri, i, end-i])
+		return end
+
+	def on_method(method, i):
+		idx['endpoints'][method] = []
+		return _scan_object(s, i, lambda u,j: on_uri(method, u, j))
+
+	def on_key(key, i):
+		if key == 'endpoints':
+			end = _scan_object(s, i, on_method)
+		else:	end = _scan_value(s, i)
+		idx['keys'].append([key, i, end-i])
+		return end
+
+	_scan_object(s, 0, on_key)
+	return idx
+
+def docindex_load(filepath, st):
+	"""
+	Load index of apidoc file with given os.stat_result.
+	Return:
+	  Index dictionary or None if not exists or outdated.
+	"""
+	try:
+		f = open(docindex_get_path(filepath), "r")
+		idx = json.load(f)
+		f.close()
+	except (OSError, ValueError):
+		return None
+	if idx.get('size') != st.st_size or idx.get('mtime') != st.st_mtime_ns:
+		return None
+	return idx
+
+def docindex_save(filepath, idx):
+	"""
+	Store index of given apidoc file (atomically).
+	"""
+	p = docindex_get_path(filepath)
+	try:
+		f = open(p + ".tmp", "w")
+		json.dump(idx, f)
+		f.close()
+		os.replace(p + ".tmp", p)
+		return True
+	except Exception as e:
+		print("! Failed to store index " + p)
+		print("  " + str(e))
+		return False
+
+
+class DocIndex:
+	"""
+	Source for lazy loading an apidoc json file.
+	Top level values and single endpoints are read from the
+	file using their offsets from the index.
+	"""
+	def __init__(self, filepath):
+		self.filepath = filepath
+		self.fd = None
+		self.fd = os.open(filepath, os.O_RDONLY)
+		try:
+			st = os.fstat(self.fd)
+			idx = docindex_load(filepath, st)
+			if not idx:
+				idx = docindex_build(self.fd)
+				docindex_save(filepath, idx)
+		except Exception:
+			self.close()
+			raise
+		self.keys = idx['keys']
+		self.endpoints = {m:{u:(off,n) for u,off,n in x}
+				for m,x in idx['endpoints'].items()}
+
+	def __del__(self):
+		self.close()
+
+	def close(self):
+		""" Close apidoc file """
+		if self.fd != None:
+			os.close(self.fd)
+			self.fd = None
+
+	def _read(self, off, n, dict_type):
+		return json.loads(os.pread(self.fd, n, off).decode("utf-8"),
+				object_hook=dict_type)
+
+	def load_head(self, dict_type=dict):
+		"""
+		Load all top level values except the endpoints.
+		"""
+		doc = dict_type()
+		for key,off,n in self.keys:
+			if key != 'endpoints':
+				doc[key] = self._read(off, n, dict_type)
+		return doc
+
+	def get_endpoint_keys(self):
+		"""
+		Get dictionary {<METHOD> : [<URI>, ...], ...}
+		"""
+		return {m:list(x.keys()) for m,x in self.endpoints.items()}
+
+	def get_endpoint(self, method, uri, dict_type=dict):
+		"""
+		Read single endpoint from apidoc file.
+		"""
+		off,n = self.endpoints[method][uri]
+		return self._read(off, n, dict_type)
+
+	def get_endpoint_size(self, method, uri):
+		"""
+		Get size of endpoint in the apidoc file (bytes).
+		"""
+		return self.endpoints[method][uri][1]
@@ -0,0 +1,301 @@
+import os
+import json
+import time
+import zlib
+import struct
+import sqlite3
+import threading
+
+"""
+Persistent history of sent requests and received responses.
+
+The history is stored at <basedir>/history/ as an append-only log
+split into segments (seg-<N>.log). Each record is:
+  <META_LEN:u32><BODY_LEN:u32><META:json><BODY:zlib>
+META is a dictionary:
+{
+  'time' : <float>,			# Unix time
+  'api' : <str>,			# Name of apidoc (if any)
+  'method' : <str>,
+  'url' : <str>,
+  'endpoint' : <str>,			# Matching endpoint URI (or None)
+  'request_headers' : {},
+  'request_body' : <str>,
+  'status' : <int>,
+  'reason' : <str>,
+  'headers' : {},			# Response headers
+  'timing' : {},			# See httptiming.py
+  'size' : <int>,			# Response body size
+  'truncated' : <bool>			# Only HISTORY_MAX_BODY bytes stored
+}
+and BODY is the zlib compressed response body.
+
+An index (<basedir>/history/index.db) allows finding entries by
+endpoint, url and time without reading the log:
+  entries (id, time, api, method, url, endpoint, status, size,
+	   segment, offset, length)
+
+Whole segments are deleted when the history exceeds HISTORY_MAX_SIZE
+or when all their entries are older than HISTORY_MAX_AGE (checked on
+open, when a segment is full and on every query). Queries never
+return entries older than HISTORY_MAX_AGE.
+"""
+
+# Max. size (bytes) of all segments
+HISTORY_MAX_SIZE = 256*1024*1024
+
+# Max. age (seconds) of entries
+HISTORY_MAX_AGE = 30*24*3600
+
+# A new segment is started when the current one exceeds this size
+HISTORY_SEGMENT_SIZE = 8*1024*1024
+
+# Max. stored bytes of a response body
+HISTORY_MAX_BODY = 16*1024*1024
+
+_HEAD = struct.Struct("<II")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+	id INTEGER PRIMARY KEY, time REAL, api TEXT, method TEXT,
+	url TEXT, endpoint TEXT, status INTEGER, size INTEGER,
+	segment INTEGER, offset INTEGER, length INTEGER);
+CREATE INDEX IF NOT EXISTS entries_time ON entries (time);
+CREATE INDEX IF NOT EXISTS entries_endpoint ON entries (method, endpoint);
+CREATE INDEX IF NOT EXISTS entries_url ON entries (url);
+CREATE INDEX IF NOT EXISTS entries_segment ON entries (segment);
+"""
+
+_COLUMNS = ('id', 'time', 'api', 'method', 'url', 'endpoint', 'status', 'size')
+
+
+def _compress(body, limit):
+	# Compress first limit bytes of body (httpclient.ResponseBody)
+	c = zlib.compressobj(6)
+	res = []
+	off = 0
+	while off < min(body.size, limit):
+		chunk = body.read(min(1024*1024, limit-off), off)
+		if not chunk:
+			break
+		res.append(c.compress(chunk))
+		off += len(chunk)
+	res.append(c.flush())
+	return b"".join(res)
+
+
+def _prefix_end(s):
+	# Get smallest string greater than all strings starting with
+	# s (None if there's none).
+	s = s.rstrip(chr(0x10ffff))
+	if not s:
+		return None
+	c = ord(s[-1]) + 1
+	if 0xd800 <= c < 0xe000:
+		c = 0xe000	# Skip surrogates
+	return s[:-1] + chr(c)
+
+
+class History:
+	"""
+	Segmented request/response log with index.
+	"""
+	def __init__(self, dirpath, max_size=HISTORY_MAX_SIZE,
+			max_age=HISTORY_MAX_AGE):
+		self.dir = dirpath
+		self.max_size = max_size
+		self.max_age = max_age
+		os.makedirs(dirpath, exist_ok=True)
+		self.con = sqlite3.connect(os.path.join(dirpath, "index.db"),
+				check_same_thread=False)
+		self.con.executescript(_SCHEMA)
+		self.lock = threading.Lock()
+		segs = self._segments()
+		self.segment = segs[-1] if segs else 0
+		self.fds = {}		# {segment:fd} opened for reading
+		self.retain()
+
+	def _seg_path(self, seg):
+		return os.path.join(self.dir, "seg-{:06d}.log".format(seg))
+
+	def _segments(self):
+		# Get numbers of existing segments (sorted)
+		res = []
+		for name in os.listdir(self.dir):
+			if name.startswith("seg-") and name.endswith(".log"):
+				res.append(int(name[4:-4]))
+		return sorted(res)
+
+	def add(self, meta, body):
+		"""
+		Append entry to the history.
+		Args:
+		  meta: Dictionary (see above), 'size' and 'truncated'
+			are set from body.
+		  body: Response body (httpclient.ResponseBody)
+		Return:
+		  Id of the entry
+		"""
+		meta = dict(meta)
+		meta['size'] = body.size
+		meta['truncated'] = body.size > HISTORY_MAX_BODY
+		mdata = json.dumps(meta).encode("utf-8")
+		bdata = _compress(body, HISTORY_MAX_BODY)
+		rec = _HEAD.pack(len(mdata), len(bdata)) + mdata + bdata
+
+		rolled = False
+		with self.lock:
+			p = self._seg_path(self.segment)
+			if os.path.isfile(p) and os.path.getsize(p) >= HISTORY_SEGMENT_SIZE:
+				self.segment += 1
+				p = self._seg_path(self.segment)
+				rolled = True
+			with open(p, "ab") as f:
+				off = f.tell()
+				f.write(rec)
+			cur = self.con.execute("INSERT INTO entries VALUES "
+				"(NULL,?,?,?,?,?,?,?,?,?,?)", (meta['time'],
+				meta.get('api'), meta['method'], meta['url'],
+				meta.get('endpoint'), meta.get('status'),
+				body.size, self.segment, off, len(rec)))
+			self.con.commit()
+		if rolled:
+			self.retain()
+		return cur.lastrowid
+
+	def query(self, method=None, endpoint=None, url=None, since=None,
+			limit=100, offset=0):
+		"""
+		Find entries (newest first) without reading the log.
+		Args:
+		  method, endpoint: Entries of endpoint
+		  url:    Entries with url starting with this string
+		  since:  Entries not older than this (unix time)
+		  limit, offset: Page of the result
+		Return:
+		  List of dictionaries {'id', 'time', 'api', 'method',
+		  'url', 'endpoint', 'status', 'size'}
+		"""
+		self.retain()
+		where = ["time>=?"]
+		args = [max(since or 0, time.time() - self.max_age)]
+		if method:
+			where.append("method=?")
+			args.append(method)
+		if endpoint:
+			where.append("endpoint=?")
+			args.append(endpoint)
+		if url:
+			# Prefix as range, so the url index is used
+			where.append("url>=?")
+			args.append(url)
+			end = _prefix_end(url)
+			if end:
+				where.append("url<?")
+				args.append(end)
+		sql = "SELECT " + ", ".join(_COLUMNS) + " FROM entries"
+		sql += " WHERE " + " AND ".join(where)
+		sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
+		with self.lock:
+			rows = self.con.execute(sql, args + [limit, offset]).fetchall()
+		return [dict(zip(_COLUMNS, r)) for r in rows]
+
+	def load(self, entry_id):
+		"""
+		Read entry from the log.
+		Return:
+		  Tuple (meta, body) with body as bytes or None if the
+		  entry doesn't exist (anymore).
+		"""
+		with self.lock:
+			row = self.con.execute("SELECT segment, offset, length "
+				"FROM entries WHERE id=?", (entry_id,)).fetchone()
+			if not row:
+				return None
+			seg,off,n = row
+			try:
+				fd = self.fds.get(seg)
+				if fd == None:
+					fd = os.open(self._seg_path(seg), os.O_RDONLY)
+					self.fds[seg] = fd
+				rec = os.pread(fd, n, off)
+			except OSError as e:
+				print("! Failed to read history entry " + str(entry_id))
+				print("  " + str(e))
+				return None
+		mlen,blen = _HEAD.unpack_from(rec)
+		meta = json.loads(rec[_HEAD.size:_HEAD.size+mlen].decode("utf-8"))
+		body = zlib.decompress(rec[_HEAD.size+mlen:_HEAD.size+mlen+blen])
+		return meta,body
+
+	def retain(self):
+		"""
+		Delete oldest segments exceeding max. size or age.
+		"""
+		with self.lock:
+			segs = self._segments()
+			sizes = {s:os.path.getsize(self._seg_path(s)) for s in segs}
+			total = sum(sizes.values())
+			limit = time.time() - self.max_age
+			for seg in segs:
+				if seg == self.segment:
+					break
+				newest = self.con.execute("SELECT MAX(time) FROM "
+					"entries WHERE segment=?", (seg,)).fetchone()[0]
+				if total <= self.max_size and newest != None and newest >= limit:
+					break
+				self._delete_segment(seg)
+				total -= sizes[seg]
+			self.con.commit()
+
+	def _delete_segment(self, seg):
+		fd = self.fds.pop(seg, None)
+		if fd != None:
+			os.close(fd)
+		self.con.execute("DELETE FROM entries WHERE segment=?", (seg,))
+		try:
+			os.unlink(self._seg_path(seg))
+		except FileNotFoundError:
+			pass
+
+	def clear(self):
+		""" Delete whole history """
+		with self.lock:
+			for seg in self._segments():
+				self._delete_segment(seg)
+			self.segment += 1
+			self.con.commit()
+
+	def close(self):
+		with self.lock:
+			for fd in self.fds.values():
+				os.close(fd)
+			self.fds = {}
+			self.con.close()
+
+
+_history = None
+
+def history_open(basedir):
+	"""
+	Open history at <basedir>/history.
+	"""
+	global _history
+	try:
+		_history = History(os.path.join(basedir, "history"))
+	except Exception as e:
+		print("! Failed to open history")
+		print("  " + str(e))
+		_history = None
+	return _history
+
+def history_get():
+	""" Get opened history (or None) """
+	return _history
+
+def history_close():
+	""" Close history """
+	global _history
+	if _history:
+		_history.close()
+		_history = None
@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+
+"""
+Local cache of HTTP responses with conditional requests.
+
+Responses with an ETag or Last-Modified header are stored at
+<basedir>/cache/. When the same request is sent again, the cached
+validators are sent as If-None-Match/If-Modified-Since and a
+'304 Not Modified' is answered with the cached response, so a large
+repeated payload only costs a round trip.
+
+Entries are keyed by method, url and the values of the request
+headers named in the response's Vary header. Bodies are stored as
+files, the metadata in <basedir>/cache/index.db:
+  vary    (url_key, names)		Vary header names of method + url
+  entries (key, method, url, status, reason, headers, etag,
+	   last_modified, size, atime)
+
+The cache is limited to HTTPCACHE_MAX_SIZE bytes, least recently
+used entries are evicted first.
+"""
+
+# Max. size (bytes) of all cached bodies
+HTTPCACHE_MAX_SIZE = 256*1024*1024
+
+# Only responses to these methods are cached
+HTTPCACHE_METHODS = ('GET', 'HEAD')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vary (
+	url_key TEXT PRIMARY KEY, names TEXT);
+CREATE TABLE IF NOT EXISTS entries (
+	key TEXT PRIMARY KEY, method TEXT, url TEXT, status INTEGER,
+	reason TEXT, headers TEXT, etag TEXT, last_modified TEXT,
+	size INTEGER, atime REAL);
+CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime);
+"""
+
+def _hash(*parts):
+	return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+def _get_header(hdrs, name):
+	# Get header (case-insensitive) from plain dictionary
+	if not hdrs:
+		return ""
+	for k,v in hdrs.items():
+		if k.lower() == name:
+			return v
+	return ""
+
+
+class CacheEntry:
+	"""
+	Cached response.
+	"""
+	__slots__ = ('key', 'status', 'reason', 'headers', 'etag',
+			'last_modified', 'size', 'path')
+
+	def open(self):
+		""" Open cached body (binary file) """
+		return open(self.path, "rb")
+
+
+class HttpCache:
+	"""
+	Response cache stored in a directory.
+	"""
+	def __init__(self, cachedir, max_size=HTTPCACHE_MAX_SIZE):
+		self.dir = cachedir
+		self.max_size = max_size
+		os.makedirs(cachedir, exist_ok=True)
+		self.con = sqlite3.connect(os.path.join(cachedir, "index.db"),
+				check_same_thread=False)
+		self.con.executescript(_SCHEMA)
+		self.lock = threading.Lock()
+
+	def _key(self, method, url, hdrs, names=None):
+		# Get key of request (None if response varies on '*'),
+		# names of varying headers default to the stored ones.
+		if names == None:
+			row = self.con.execute("SELECT names FROM vary "
+				"WHERE url_key=?", (_hash(method, url),)).fetchone()
+			names = json.loads(row[0]) if row else []
+		if '*' in names:
+			return None
+		return _hash(method, url, *[n + ":" + _get_header(hdrs, n)
+						for n in names])
+
+	def _path(self, key):
+		return os.path.join(self.dir, key)
+
+	def lookup(self, method, url, hdrs=None):
+		"""
+		Get cached response of request.
+		Return:
+		  CacheEntry or None
+		"""
+		if method not in HTTPCACHE_METHODS:
+			return None
+		with self.lock:
+			key = self._key(method, url, hdrs)
+			if not key:
+				return None
+			row = self.con.execute("SELECT status, reason, headers, "
+				"etag, last_modified, size FROM entries WHERE key=?",
+				(key,)).fetchone()
+		if not row or not os.path.isfile(self._path(key)):
+			return None
+		e = CacheEntry()
+		e.key = key
+		e.status,e.reason = row[0],row[1]
+		e.headers = json.loads(row[2])
+		e.etag,e.last_modified,e.size = row[3],row[4],row[5]
+		e.path = self._path(key)
+		return e
+
+	def conditional_headers(self, entry, hdrs=None):
+		"""
+		Get copy of request headers with the validators of the
+		cached response added.
+		"""
+		hdrs = dict(hdrs) if hdrs else {}
+		if entry.etag:
+			hdrs['If-None-Match'] = entry.etag
+		if entry.last_modified:
+			hdrs['If-Modified-Since'] = entry.last_modified
+		return hdrs
+
+	def touch(self, entry, headers=None):
+		"""
+		Mark entry as used (after a 304), headers of the 304
+		response update the cached headers.
+		"""
+		with self.lock:
+			if headers:
+				entry.headers.update(headers)
+				self.con.execute("UPDATE entries SET headers=? "
+					"WHERE key=?", (json.dumps(entry.headers),
+						entry.key))
+			self.con.execute("UPDATE entries SET atime=? WHERE key=?",
+				(time.time(), entry.key))
+			self.con.commit()
+
+	def is_cacheable(self, method, resp):
+		"""
+		Can given response (requests.Response) be cached?
+		"""
+		h = resp.headers
+		return method in HTTPCACHE_METHODS and resp.status_code == 200 and\
+			('etag' in h or 'last-modified' in h) and\
+			'no-store' not in h.get('cache-control', '').lower() and\
+			h.get('vary', '').strip() != '*'
+
+	def store(self, method, url, hdrs, resp, body):
+		"""
+		Store response.
+		Args:
+		  method, url, hdrs: The request
+		  resp:  The response (requests.Response)
+		  body:  Received body (httpclient.ResponseBody)
+		"""
+		names = sorted(set(n.strip().lower()
+				for n in resp.headers.get('vary', '').split(",")
+				if n.strip()))
+		key = self._key(method, url, hdrs, names)
+		if not key or body.size > self.max_size:
+			return
+
+		# Copy body to a temporary file of its own first, rename
+		# it when complete (together with the index update, so
+		# concurrent stores of the same key don't mix).
+		try:
+			fd,tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+		except Exception as e:
+			print("! Failed to cache response of " + url)
+			print("  " + str(e))
+			return
+		try:
+			with os.fdopen(fd, "wb") as f:
+				off = 0
+				while off < body.size:
+					chunk = body.read(1024*1024, off)
+					f.write(chunk)
+					off += len(chunk)
+			with self.lock:
+				os.replace(tmp, self._path(key))
+				with self.con:
+					self.con.execute("INSERT OR REPLACE INTO vary "
+						"VALUES (?,?)", (_hash(method, url),
+						json.dumps(names)))
+					self.con.execute("INSERT OR REPLACE INTO entries "
+						"VALUES (?,?,?,?,?,?,?,?,?,?)", (key,
+						method, url, resp.status_code, resp.reason,
+						json.dumps(dict(resp.headers)),
+						resp.headers.get('etag'),
+						resp.headers.get('last-modified'),
+						body.size, time.time()))
+					self._evict()
+		except Exception as e:
+			print("! Failed to cache response of " + url)
+			print("  " + str(e))
+			try:
+				os.unlink(tmp)
+			except OSError:
+				pass
+
+	def _evict(self):
+		# Delete least recently used entries until the cache
+		# fits into max_size.
+		total = self.con.execute("SELECT TOTAL(size) FROM entries")\
+				.fetchone()[0]
+		if total <= self.max_size:
+			return
+		for key,size in self.con.execute("SELECT key, size FROM "
+				"entries ORDER BY atime").fetchall():
+			self.con.execute("DELETE FROM entries WHERE key=?", (key,))
+			try:
+				os.unlink(self._path(key))
+			except FileNotFoundError:
+				pass
+			total -= size
+			if total <= self.max_size:
+				break
+
+	def clear(self):
+		""" Delete all cached responses """
+		with self.lock:
+			for (key,) in self.con.execute("SELECT key FROM entries")\
+					.fetchall():
+				try:
+					os.unlink(self._path(key))
+				except FileNotFoundError:
+					pass
+			self.con.execute("DELETE FROM entries")
+			self.con.execute("DELETE FROM vary")
+			self.con.commit()
+
+	def close(self):
+		with self.lock:
+			self.con.close()
+
+
+_cache = None
+
+def httpcache_open(basedir, max_size=HTTPCACHE_MAX_SIZE):
+	"""
+	Open response cache at <basedir>/cache.
+	"""
+	global _cache
+	try:
+		_cache = HttpCache(os.path.join(basedir, "cache"), max_size)
+	except Exception as e:
+		print("! Failed to open response cache")
+		print("  " + str(e))
+		_cache = None
+	return _cache
+
+def httpcache_get():
+	""" Get opened response cache (or None) """
+	return _cache
+
+def httpcache_close():
+	""" Close response cache """
+	global _cache
+	if _cache:
+		_cache.close()
+		_cache = None
@@ -0,0 +1,389 @@
+import time
+import socket
+import weakref
+import tempfile
+import threading
+import requests
+from urllib.parse import urlsplit
+
+from httptiming import TimingAdapter
+from httptiming import httptiming_start
+from httptiming import httptiming_get
+
+"""
+Pooled keep-alive HTTP sessions.
+
+All requests of okapi are sent through the session pool (see
+httpclient_request), which keeps one requests.Session per host
+(scheme + host + port). Following requests to the same host reuse
+open connections and don't pay the TCP/TLS handshake again.
+Sessions not used for HTTP_IDLE_TIMEOUT seconds are closed, sessions
+in use (a request being sent or a streamed response not closed yet)
+are kept.
+
+Bodies of streamed responses (stream=True) are read in chunks with
+httpclient_receive() into a ResponseBody, which keeps small bodies in
+memory and spills large ones to a temporary file.
+
+Every response gets the attribute 'pool_info':
+{
+  'reused' : <bool>,		# Request used an already open connection
+  'requests' : <int>,		# Requests sent to this host
+  'connections' : <int>,	# Connections opened to this host
+}
+and the attribute 'timing' with the timing breakdown of the request
+(see httptiming.py), 'transfer' is set by httpclient_receive().
+
+Requests sent with job=<reqengine.Job> are aborted when the job is
+cancelled: the socket of the connection is shut down, so a request
+waiting for the response or the body fails at once.
+"""
+
+# Max. number of open connections per host
+HTTP_POOL_SIZE = 10
+
+# Seconds after which an unused session is closed
+HTTP_IDLE_TIMEOUT = 120
+
+# Response bodies larger than this are spilled to a temporary file
+HTTP_SPOOL_SIZE = 4*1024*1024
+
+# Size of chunks read from streamed responses
+HTTP_CHUNK_SIZE = 64*1024
+
+# Bytes kept in memory as ResponseBody.head (e.g. for previews)
+HTTP_HEAD_SIZE = 64*1024
+
+
+class _HostSession:
+	__slots__ = ('session', 'last_used', 'requests', 'connections', 'users',
+			'retired')
+
+	def __init__(self, pool_size):
+		self.session = requests.Session()
+		adapter = TimingAdapter(pool_connections=1, pool_maxsize=pool_size)
+		self.session.mount("http://", adapter)
+		self.session.mount("https://", adapter)
+		self.last_used = time.monotonic()
+		self.requests = 0
+		self.connections = 0
+		self.users = 0		# Requests/responses using the session
+		self.retired = False	# Removed from pool, close when unused
+
+	def num_connections(self, url):
+		# Get number of connections opened by the urllib3
+		# pools of the session (all belong to the same host).
+		pools = self.session.get_adapter(url).poolmanager.pools
+		n = 0
+		for key in pools.keys():
+			p = pools.get(key)
+			if p != None:
+				n += p.num_connections
+		return n
+
+	def close(self):
+		self.session.close()
+
+
+def _shutdown(conn):
+	# Shut down socket of urllib3 connection, a thread blocked
+	# on it fails at once.
+	sock = getattr(conn, 'sock', None)
+	if sock:
+		try:
+			sock.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+
+
+class _CloseResponse:
+	# Replaces close() of a streamed response: closes it and
+	# releases its session. Refers to the response weakly, so
+	# an unclosed response is still freed (and released) as
+	# soon as it's unreferenced.
+	__slots__ = ('resp', 'release')
+
+	def __init__(self, resp, release):
+		self.resp = weakref.ref(resp)
+		self.release = release
+
+	def __call__(self):
+		resp = self.resp()
+		try:
+			if resp != None:
+				type(resp).close(resp)
+		finally:
+			self.release()
+
+
+class SessionPool:
+	"""
+	Per-host pool of keep-alive sessions.
+	"""
+	def __init__(self, pool_size=HTTP_POOL_SIZE, idle_timeout=HTTP_IDLE_TIMEOUT):
+		"""
+		Args:
+		  pool_size:    Max. open connections per host
+		  idle_timeout: Close sessions unused for that many seconds
+		"""
+		self.pool_size = pool_size
+		self.idle_timeout = idle_timeout
+		self.sessions = {}	# {(scheme,netloc):_HostSession}
+		self.lock = threading.Lock()
+
+	def _get(self, url):
+		# Get session for url's host, create new one
+		# (and close idle ones) if needed. The session is
+		# in use until _release.
+		parts = urlsplit(url)
+		key = (parts.scheme.lower(), parts.netloc.lower())
+		now = time.monotonic()
+		with self.lock:
+			for k,hs in list(self.sessions.items()):
+				if hs.users == 0 and now - hs.last_used > self.idle_timeout:
+					del self.sessions[k]
+					hs.close()
+			hs = self.sessions.get(key)
+			if hs == None:
+				hs = _HostSession(self.pool_size)
+				self.sessions[key] = hs
+			hs.last_used = now
+			hs.users += 1
+		return hs
+
+	def _release(self, hs):
+		with self.lock:
+			hs.users -= 1
+			hs.last_used = time.monotonic()
+			if hs.retired and hs.users == 0:
+				hs.close()
+
+	def _release_on_close(self, hs, resp):
+		# Streamed response uses the session until it's closed
+		# (or garbage collected, if the caller doesn't close it).
+		resp.close = _CloseResponse(resp,
+				weakref.finalize(resp, self._release, hs))
+
+	def request(self, method, url, job=None, **kwargs):
+		"""
+		Send request (see requests.request for arguments).
+		Args:
+		  job: reqengine.Job aborting the request on cancel
+		Return:
+		  requests.Response with attribute 'pool_info'
+		"""
+		return self._send(url, lambda s: s.request(method, url, **kwargs),
+				job, kwargs.get('stream', False))
+
+	def send(self, prep, **kwargs):
+		"""
+		Send prepared request (requests.PreparedRequest), e.g.
+		to send the same request many times without building
+		it again (see requests.Session.send for arguments).
+		Return:
+		  requests.Response with attribute 'pool_info'
+		"""
+		return self._send(prep.url, lambda s: s.send(prep, **kwargs),
+				None, kwargs.get('stream', False))
+
+	def _send(self, url, func, job=None, stream=False):
+		hs = self._get(url)
+		resp = None
+		try:
+			n = hs.num_connections(url)
+			httptiming_start((lambda conn: job.set_abort(
+					lambda: _shutdown(conn))) if job else None)
+			try:
+				resp = func(hs.session)
+			finally:
+				timing = httptiming_get()
+				if job:
+					job.set_abort(None)
+		finally:
+			if stream and resp != None:
+				self._release_on_close(hs, resp)
+			else:	self._release(hs)
+		resp.timing = timing
+		opened = hs.num_connections(url) - n
+		with self.lock:
+			hs.requests += 1
+			hs.connections += opened
+			hs.last_used = time.monotonic()
+			resp.pool_info = {'reused':opened == 0,
+				'requests':hs.requests,
+				'connections':hs.connections}
+		return resp
+
+	def configure(self, pool_size=None, idle_timeout=None):
+		"""
+		Change pool size and/or idle timeout. A new pool size
+		is used for sessions created afterwards.
+		"""
+		if pool_size != None:
+			self.pool_size = pool_size
+			self._retire()
+		if idle_timeout != None:
+			self.idle_timeout = idle_timeout
+
+	def _retire(self):
+		# Remove all sessions from the pool, sessions in use
+		# are closed when they have been released.
+		with self.lock:
+			for hs in self.sessions.values():
+				hs.retired = True
+				if hs.users == 0:
+					hs.close()
+			self.sessions = {}
+
+	def close(self):
+		""" Close all sessions """
+		with self.lock:
+			for hs in self.sessions.values():
+				hs.close()
+			self.sessions = {}
+
+	def stats(self):
+		"""
+		Get dictionary {netloc:(requests, connections)}
+		"""
+		with self.lock:
+			return {k[1]:(hs.requests, hs.connections)
+				for k,hs in self.sessions.items()}
+
+
+class ResponseBody:
+	"""
+	Received response body, kept in memory up to HTTP_SPOOL_SIZE
+	bytes, larger bodies are moved to a temporary file.
+	"""
+	def __init__(self, spool_size=HTTP_SPOOL_SIZE):
+		self.file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+		self.head = b""		# First HTTP_HEAD_SIZE bytes
+		self.size = 0
+		self.start = time.monotonic()
+		self.duration = 0.0
+		self.complete = False
+
+	def write(self, chunk):
+		""" Append received chunk """
+		if len(self.head) < HTTP_HEAD_SIZE:
+			self.head += chunk[:HTTP_HEAD_SIZE-len(self.head)]
+		self.file.write(chunk)
+		self.size += len(chunk)
+		self.duration = time.monotonic() - self.start
+
+	def throughput(self):
+		""" Get bytes per second """
+		return self.size / self.duration if self.duration else 0.0
+
+	def is_spilled(self):
+		""" Is the body stored in a temporary file? """
+		return getattr(self.file, '_rolled', False)
+
+	def read(self, n=-1, offset=0):
+		""" Read n bytes (-1: all) starting at offset """
+		self.file.seek(offset)
+		return self.file.read(n)
+
+	def close(self):
+		""" Close (and delete) the buffer """
+		self.file.close()
+
+
+def httpclient_receive(resp, on_progress=None, interval=0.2,
+		chunk_size=HTTP_CHUNK_SIZE, job=None, on_chunk=None):
+	"""
+	Read body of a streamed response (requested with stream=True).
+	Args:
+	  resp:        requests.Response
+	  on_progress: Function called with the ResponseBody while
+		       receiving, at most every interval seconds.
+	  job:         reqengine.Job, receiving stops with
+		       RequestCancelled when the job is cancelled.
+	  on_chunk:    Function called with each received chunk
+		       (bytes), e.g. to process the body while
+		       it arrives.
+	Return:
+	  ResponseBody
+	"""
+	body = ResponseBody()
+	last = body.start
+	if job:
+		conn = getattr(resp.raw, 'connection', None)
+		job.set_abort(lambda: _shutdown(conn))
+	try:
+		for chunk in resp.iter_content(chunk_size):
+			if job:
+				job.check()
+			body.write(chunk)
+			if on_chunk:
+				on_chunk(chunk)
+			if on_progress and body.start + body.duration - last >= interval:
+				last = body.start + body.duration
+				on_progress(body)
+	except BaseException:
+		body.close()
+		if job:
+			job.check()
+		raise
+	finally:
+		if job:
+			job.set_abort(None)
+		resp.close()
+	body.duration = time.monotonic() - body.start
+	body.complete = True
+	if hasattr(resp, 'timing'):
+		resp.timing['transfer'] = body.duration
+	return body
+
+def httpclient_read_file(filepath):
+	"""
+	Read body from file (e.g. cached response).
+	Return:
+	  ResponseBody
+	"""
+	body = ResponseBody()
+	with open(filepath, "rb") as f:
+		while True:
+			chunk = f.read(HTTP_CHUNK_SIZE)
+			if not chunk:
+				break
+			body.write(chunk)
+	body.duration = time.monotonic() - body.start
+	body.complete = True
+	return body
+
+def httpclient_format_size(n):
+	""" Get number of bytes as readable string (e.g. '1.2 MB') """
+	for unit in ("byte", "KB", "MB"):
+		if n < 1024:
+			return (str(n) if unit == "byte" else "{:.1f}".format(n)) +\
+				" " + unit
+		n /= 1024
+	return "{:.1f} GB".format(n)
+
+
+# Pool shared by all request frames
+_pool = SessionPool()
+
+def httpclient_request(method, url, **kwargs):
+	"""
+	Send request using the shared session pool.
+	Args: see requests.request and SessionPool.request
+	Return:
+	  requests.Response (with 'pool_info', see above)
+	"""
+	return _pool.request(method, url, **kwargs)
+
+def httpclient_configure(pool_size=None, idle_timeout=None):
+	"""
+	Configure the shared session pool.
+	Args:
+	  pool_size:    Max. open connections per host
+	  idle_timeout: Close sessions unused for that many seconds
+	"""
+	_pool.configure(pool_size, idle_timeout)
+
+def httpclient_close():
+	""" Close all connections of the shared pool """
+	_pool.close()
@@ -0,0 +1,173 @@
+import time
+import random
+import requests
+from email.utils import parsedate_to_datetime
+
+"""
+Timeouts and retries of requests.
+
+A RetryPolicy holds the connect and read timeout of a request and
+decides whether a failed attempt is repeated:
+  - Connection errors and timeouts are retried for idempotent methods
+    (a connect timeout for all methods, the request hasn't been sent).
+  - Responses with status 429 or 503 are retried for all methods,
+    the server didn't process the request.
+The delay before attempt n+1 is a random value between 0 and
+backoff * 2^n seconds (exponential backoff with full jitter), limited
+to max_delay. A Retry-After header of the response is used instead,
+the request isn't retried if it asks to wait longer than max_delay.
+
+The settings of an apidoc are stored in DOC['settings'] (see DOC.py)
+and passed in by the caller (see httpretry_policy), requests can
+override single values:
+{
+  'connect_timeout' : <float>,		# Seconds
+  'read_timeout' : <float>,		# Seconds between received bytes
+  'retries' : <int>,			# Max. number of retries
+  'backoff' : <float>			# Delay (sec) of the first retry
+}
+"""
+
+# Defaults
+HTTPRETRY_CONNECT_TIMEOUT = 5.0
+HTTPRETRY_READ_TIMEOUT = 30.0
+HTTPRETRY_RETRIES = 2
+HTTPRETRY_BACKOFF = 0.5
+
+# Max. seconds to wait before a retry
+HTTPRETRY_MAX_DELAY = 60.0
+
+# Settings (see above) and their labels
+HTTPRETRY_SETTINGS = {
+	'connect_timeout' : "Connect",
+	'read_timeout' : "Read",
+	'retries' : "Retries",
+	'backoff' : "Backoff"
+}
+
+# Methods which can be sent again without side effects
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE')
+
+# Status codes retried for all methods
+RETRY_STATUS = (429, 503)
+
+
+def _retry_after(resp):
+	# Get seconds of Retry-After header (delay or date) or None
+	val = resp.headers.get('retry-after', '').strip()
+	if not val:
+		return None
+	if val.isdigit():
+		return float(val)
+	try:
+		return max(0.0, parsedate_to_datetime(val).timestamp() - time.time())
+	except (TypeError, ValueError):
+		return None
+
+
+class RetryPolicy:
+	"""
+	Timeouts and retry rules of a request.
+	"""
+	__slots__ = ('connect_timeout', 'read_timeout', 'retries',
+			'backoff', 'max_delay')
+
+	def __init__(self, connect_timeout=HTTPRETRY_CONNECT_TIMEOUT,
+			read_timeout=HTTPRETRY_READ_TIMEOUT,
+			retries=HTTPRETRY_RETRIES, backoff=HTTPRETRY_BACKOFF,
+			max_delay=HTTPRETRY_MAX_DELAY):
+		self.connect_timeout = connect_timeout
+		self.read_timeout = read_timeout
+		self.retries = retries
+		self.backoff = backoff
+		self.max_delay = max_delay
+
+	def timeout(self):
+		""" Get timeout argument of requests: (connect, read) """
+		return (self.connect_timeout, self.read_timeout)
+
+	def delay(self, method, attempt, resp=None, error=None):
+		"""
+		Get seconds to wait before retrying a failed attempt.
+		Args:
+		  method:  HTTP method of the request
+		  attempt: Number of the failed attempt (0 = first)
+		  resp:    Response of the attempt (requests.Response)
+		  error:   Exception raised by the attempt (no resp)
+		Return:
+		  Seconds or None if the request isn't retried
+		"""
+		if attempt >= self.retries:
+			return None
+		if error != None:
+			if isinstance(error, requests.exceptions.ConnectTimeout):
+				pass
+			elif not isinstance(error, (requests.exceptions.ConnectionError,
+					requests.exceptions.Timeout)):
+				return None
+			elif method.upper() not in IDEMPOTENT_METHODS:
+				return None
+		elif resp.status_code not in RETRY_STATUS:
+			return None
+		else:
+			after = _retry_after(resp)
+			if after != None:
+				return after if after <= self.max_delay else None
+		return random.uniform(0, min(self.max_delay,
+				self.backoff * 2**attempt))
+
+	def update(self, d):
+		"""
+		Set values given in dictionary d (see above), None
+		values are ignored.
+		"""
+		for k in ('connect_timeout', 'read_timeout', 'backoff'):
+			if d.get(k) != None:
+				setattr(self, k, float(d[k]))
+		if d.get('retries') != None:
+			self.retries = int(d['retries'])
+		return self
+
+	def to_dict(self):
+		return {'connect_timeout' : self.connect_timeout,
+			'read_timeout' : self.read_timeout,
+			'retries' : self.retries,
+			'backoff' : self.backoff}
+
+
+def httpretry_parse_settings(d):
+	"""
+	Parse settings entered as strings, empty values are skipped.
+	Return:
+	  Tuple (settings, invalid) with the settings dictionary and
+	  a list of keys with invalid values.
+	"""
+	settings = {}
+	invalid = []
+	for k,val in d.items():
+		val = val.strip()
+		if not val:
+			continue
+		try:
+			v = int(val) if k == 'retries' else float(val)
+		except ValueError:
+			v = -1
+		if v < 0:
+			invalid.append(k)
+		else:	settings[k] = v
+	return settings,invalid
+
+def httpretry_policy(settings=None, overrides=None):
+	"""
+	Get policy from settings (see above) with values of
+	dictionary overrides applied.
+	Args:
+	  settings:  Settings of the apidoc (e.g. DOC['settings'])
+	  overrides: Settings of the request
+	"""
+	policy = RetryPolicy()
+	if settings:
+		policy.update(settings)
+	if overrides:
+		policy.update(overrides)
+	return policy
@@ -0,0 +1,138 @@
+import time
+import socket
+import threading
+from urllib3.connection import HTTPConnection
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.connectionpool import HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError
+from requests.adapters import HTTPAdapter
+
+"""
+Timing breakdown of requests.
+
+TimingAdapter makes requests use urllib3 connections that measure
+the phases of a request and write them to a thread-local dictionary
+(urllib3 runs in the thread sending the request):
+{
+  'dns' : <float>,	# Name resolution (new connections only)
+  'connect' : <float>,	# TCP connect (new connections only)
+  'tls' : <float>,	# TLS handshake (new https connections only)
+  'send' : <float>,	# Sending request headers and body
+  'ttfb' : <float>,	# Waiting for the response headers
+  'transfer' : <float>	# Receiving the body (set by the caller)
+}
+All values are seconds. Use httptiming_start() before and
+httptiming_get() after sending the request.
+"""
+
+# Phases in order
+TIMING_PHASES = ('dns', 'connect', 'tls', 'send', 'ttfb', 'transfer')
+
+_local = threading.local()
+
+def httptiming_start(on_connection=None):
+	"""
+	Start recording timings of the current thread.
+	Args:
+	  on_connection: Function called with the urllib3 connection
+			 when the request is sent over it (e.g. to be
+			 able to shut it down from another thread).
+	"""
+	_local.timing = {}
+	_local.on_connection = on_connection
+
+def httptiming_get():
+	"""
+	Get timings recorded since httptiming_start() (and stop
+	recording).
+	"""
+	t = getattr(_local, 'timing', None)
+	_local.timing = None
+	_local.on_connection = None
+	return t if t != None else {}
+
+def _record(phase, seconds):
+	t = getattr(_local, 'timing', None)
+	if t != None:
+		t[phase] = t.get(phase, 0.0) + seconds
+
+def httptiming_total(timing):
+	""" Get sum of all phases """
+	return sum(timing.get(p, 0.0) for p in TIMING_PHASES)
+
+
+class _TimingMixin:
+	def _new_conn(self):
+		# Resolve the name first, then connect to the
+		# resolved addresses (in order) to time both.
+		host = self._dns_host
+		t = time.perf_counter()
+		try:
+			infos = socket.getaddrinfo(host, self.port, 0,
+					socket.SOCK_STREAM)
+		except socket.gaierror as e:
+			raise NameResolutionError(self.host, self, e) from e
+		t1 = time.perf_counter()
+		_record('dns', t1 - t)
+
+		err = None
+		try:
+			for info in infos:
+				self._dns_host = info[4][0]
+				try:
+					sock = super()._new_conn()
+					break
+				except Exception as e:
+					err = e
+			else:	raise err
+		finally:
+			self._dns_host = host
+		_record('connect', time.perf_counter() - t1)
+		return sock
+
+	def request(self, *args, **kwargs):
+		on_connection = getattr(_local, 'on_connection', None)
+		if on_connection:
+			on_connection(self)
+		t = time.perf_counter()
+		super().request(*args, **kwargs)
+		_record('send', time.perf_counter() - t)
+
+	def getresponse(self, *args, **kwargs):
+		t = time.perf_counter()
+		resp = super().getresponse(*args, **kwargs)
+		_record('ttfb', time.perf_counter() - t)
+		return resp
+
+class TimingHTTPConnection(_TimingMixin, HTTPConnection):
+	pass
+
+class TimingHTTPSConnection(_TimingMixin, HTTPSConnection):
+	def connect(self):
+		# The TLS handshake is what connect() takes besides
+		# resolving and connecting (see _new_conn).
+		t = getattr(_local, 'timing', None)
+		before = (t.get('dns', 0.0) + t.get('connect', 0.0)) if t != None else 0
+		start = time.perf_counter()
+		super().connect()
+		if t != None:
+			after = t.get('dns', 0.0) + t.get('connect', 0.0)
+			_record('tls', time.perf_counter() - start - (after - before))
+
+class _TimingHTTPPool(HTTPConnectionPool):
+	ConnectionCls = TimingHTTPConnection
+
+class _TimingHTTPSPool(HTTPSConnectionPool):
+	ConnectionCls = TimingHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+	"""
+	HTTPAdapter using timing connections.
+	"""
+	def init_poolmanager(self, *args, **kwargs):
+		super().init_poolmanager(*args, **kwargs)
+		self.poolmanager.pool_classes_by_scheme = {
+			'http' : _TimingHTTPPool,
+			'https' : _TimingHTTPSPool}
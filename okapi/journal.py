@@ -0,0 +1,246 @@
+import os
+import json
+import threading
+
+from docindex import docindex_delete
+from schema import schema_json_default
+
+"""
+Write-ahead journal for apidoc files.
+
+Instead of rewriting the whole apidoc file <name>.json on every save,
+changed sections are appended to <name>.json.journal as json lines:
+
+  {"op": "base", "mtime": <int>}		# First line: mtime (ns) of <name>.json
+  {"op": "set", "path": [...], "value": ...}	# Set value at path
+  {"op": "del", "path": [...]}			# Delete value at path
+
+A path is a list of keys, e.g. ["endpoints", "GET", "/users"]. Each
+entry holds the complete new value of a section, so replaying entries
+is idempotent.
+
+The journal is replayed on load and compacted into <name>.json by a
+background thread once it's bigger than JOURNAL_COMPACT_SIZE. The
+compacted file keeps the mtime of the file it replaces, so the journal
+remains valid until it's truncated. A full write of <name>.json gets
+a new mtime, which invalidates a journal left behind (e.g. by a crash).
+All files are written to a temporary file first and then renamed, so
+a crash never leaves a half written apidoc. Rewriting <name>.json drops
+its offset index (see docindex.py).
+"""
+
+# Compact journal if it's bigger than this (bytes)
+JOURNAL_COMPACT_SIZE = 1024*1024
+
+# Serializes appends, full writes and the end of compaction.
+_lock = threading.Lock()
+
+# Paths currently compacted by a background thread.
+_compacting = set()
+
+
+def journal_get_path(filepath):
+	""" Get path of journal for given apidoc file """
+	return filepath + ".journal"
+
+def journal_get_size(filepath):
+	""" Get size of journal (0 if not exists) """
+	try:
+		return os.stat(journal_get_path(filepath)).st_size
+	except OSError:
+		return 0
+
+def journal_read(filepath, object_hook=None):
+	"""
+	Read journal entries of given apidoc file.
+	A journal which doesn't belong to the current version of the
+	apidoc file is ignored, so is a truncated last line.
+	Return:
+	  List with entries
+	"""
+	try:
+		f = open(journal_get_path(filepath), "r")
+		lines = f.read().split("\n")
+		f.close()
+		mtime = os.stat(filepath).st_mtime_ns
+	except OSError:
+		return []
+
+	entries = []
+	for i,line in enumerate(lines):
+		if not line: continue
+		try:
+			e = json.loads(line, object_hook=object_hook)
+		except ValueError:
+			print("! Skipping invalid journal line "+str(i+1)+" of "+filepath)
+			continue
+		if i == 0:
+			if e.get('op') != 'base' or e.get('mtime') != mtime:
+				print("! Ignoring outdated journal of " + filepath)
+				return []
+		else:	entries.append(e)
+	return entries
+
+def journal_apply(doc, entries):
+	"""
+	Apply journal entries to apidoc dictionary.
+	Missing dictionaries along a path are created with the type
+	of their parent.
+	"""
+	for e in entries:
+		path = e['path']
+		d = doc
+		for key in path[:-1]:
+			if key not in d:
+				dict.__setitem__(d, key, type(d)())
+			d = d[key]
+		if e['op'] == 'set':
+			dict.__setitem__(d, path[-1], e['value'])
+		elif e['op'] == 'del' and path[-1] in d:
+			dict.__delitem__(d, path[-1])
+
+		# Drop containers emptied by deleting an endpoint
+		if e['op'] == 'del' and len(path) == 3 and \
+				path[0] == 'endpoints' and not d:
+			dict.__delitem__(doc['endpoints'], path[1])
+
+def journal_load(filepath, object_hook=None):
+	"""
+	Load apidoc file and replay its journal.
+	Return:
+	  Apidoc dictionary
+	"""
+	f = open(filepath, "r")
+	doc = json.load(f, object_hook=object_hook)
+	f.close()
+	journal_apply(doc, journal_read(filepath, object_hook))
+	return doc
+
+def journal_append(filepath, entries):
+	"""
+	Append entries to journal and flush them to disk.
+	Return:
+	  Size of journal in bytes
+	"""
+	s = "".join([json.dumps(e, default=schema_json_default) + "\n"
+		for e in entries])
+	p = journal_get_path(filepath)
+
+	with _lock:
+		if not os.path.isfile(p):
+			mtime = os.stat(filepath).st_mtime_ns
+			s = json.dumps({'op':'base', 'mtime':mtime}) + "\n" + s
+		f = open(p, "a")
+		f.write(s)
+		f.flush()
+		os.fsync(f.fileno())
+		size = f.tell()
+		f.close()
+	return size
+
+def _write_file(filepath, doc, mtime_ns=None):
+	# Write apidoc to temporary file and rename it to filepath.
+	# If mtime_ns is given, the new file gets this mtime.
+	tmp = filepath + ".tmp"
+	f = open(tmp, "w")
+	json.dump(doc, f, indent=2, default=schema_json_default)
+	f.flush()
+	os.fsync(f.fileno())
+	f.close()
+	if mtime_ns != None:
+		os.utime(tmp, ns=(mtime_ns, mtime_ns))
+	os.replace(tmp, filepath)
+	docindex_delete(filepath)
+
+def journal_write_full(filepath, doc):
+	"""
+	Write whole apidoc atomically and drop its journal.
+	"""
+	with _lock:
+		_write_file(filepath, doc)
+		try:
+			os.unlink(journal_get_path(filepath))
+		except FileNotFoundError:
+			pass
+
+def journal_delete(filepath):
+	"""
+	Delete apidoc file and its journal.
+	"""
+	with _lock:
+		docindex_delete(filepath)
+		for p in (journal_get_path(filepath), filepath):
+			try:
+				os.unlink(p)
+			except FileNotFoundError:
+				pass
+
+def journal_compact(filepath):
+	"""
+	Merge journal into apidoc file.
+	Entries appended while compacting are kept in the journal.
+	Return:
+	  True on success, False on error.
+	"""
+	p = journal_get_path(filepath)
+	try:
+		with _lock:
+			mtime = os.stat(filepath).st_mtime_ns
+			f = open(p, "r")
+			data = f.read()
+			f.close()
+
+		# Replay entries and write the new apidoc file to
+		# a temporary file (without holding the lock).
+		f = open(filepath, "r")
+		doc = json.load(f)
+		f.close()
+		lines = [l for l in data.split("\n")[1:] if l]
+		journal_apply(doc, [json.loads(l) for l in lines])
+		tmp = filepath + ".compact"
+		f = open(tmp, "w")
+		json.dump(doc, f, indent=2)
+		f.flush()
+		os.fsync(f.fileno())
+		f.close()
+		os.utime(tmp, ns=(mtime, mtime))
+
+		with _lock:
+			if os.stat(filepath).st_mtime_ns != mtime:
+				# Apidoc has been rewritten meanwhile
+				os.unlink(tmp)
+				return False
+			f = open(p, "r")
+			rest = f.read()[len(data):]
+			f.close()
+
+			os.replace(tmp, filepath)
+			docindex_delete(filepath)
+			if rest:
+				f = open(p + ".tmp", "w")
+				f.write(json.dumps({'op':'base', 'mtime':mtime}) + "\n" + rest)
+				f.flush()
+				os.fsync(f.fileno())
+				f.close()
+				os.replace(p + ".tmp", p)
+			else:	os.unlink(p)
+		return True
+	except Exception as e:
+		print("! Failed to compact journal of " + filepath)
+		print("  " + str(e))
+		return False
+
+def journal_compact_async(filepath):
+	"""
+	Compact journal of given apidoc file in a background thread.
+	"""
+	def run():
+		journal_compact(filepath)
+		with _lock:
+			_compacting.discard(filepath)
+
+	with _lock:
+		if filepath in _compacting:
+			return
+		_compacting.add(filepath)
+	threading.Thread(target=run, daemon=True).start()
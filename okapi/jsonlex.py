@@ -0,0 +1,238 @@
+import re
+import codecs
+
+from styledtext import StyledText
+
+"""
+Streaming, error tolerant JSON lexer.
+
+JsonLexer splits JSON text into tokens while it arrives, chunk by
+chunk. The original text is kept as it is (key order, number format,
+whitespace). Invalid or truncated JSON isn't rejected, unknown parts
+become 'error' tokens and the lexer continues behind them. A token
+cut at the end of a chunk is kept back until the next chunk (or
+close()) completes it. Strings are passed on in parts while they
+arrive, so a long string is scanned only once.
+
+Tokens are (kind, text) with kind one of:
+  'key', 'string', 'number', 'bool', 'null', 'punct', 'space', 'error'
+
+JsonHighlighter feeds bytes (e.g. chunks of a response body) to the
+lexer and appends the tokens to a StyledText (see styledtext.py) with
+the tags of TextStyler (JSONLEX_TAGS).
+"""
+
+# Tags (see TextStyler) of token kinds
+JSONLEX_TAGS = {
+	'key'    : 'json_key',
+	'string' : 'json_string',
+	'number' : 'json_int',
+	'bool'   : 'json_bool',
+	'null'   : 'json_none',
+	'error'  : 'json_error'
+}
+
+_TOKEN = re.compile(r'''
+	 (?P<space>\s+)
+	|(?P<string>"[^"\\\n]*(?:\\.[^"\\\n]*)*")
+	|(?P<punct>[{}\[\]:,])
+	|(?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)
+	|(?P<bool>true|false)
+	|(?P<null>null)
+	|(?P<badstring>"[^"\\\n]*(?:\\.[^"\\\n]*)*(?=\n))
+	|(?P<error>[^\s{}\[\]:,"]+)
+	''', re.X)
+
+# Rest of a number that is still being received (e.g. '.5' of '1.5')
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]+\Z')
+
+# Content of a string up to its closing quote
+_STRING_REST = re.compile(r'[^"\\\n]*(?:\\.[^"\\\n]*)*')
+
+# Longer space/error tokens aren't kept back at the end of a chunk
+_MAX_KEEP = 4096
+
+
+class JsonLexer:
+	"""
+	Incremental JSON tokenizer.
+	"""
+	def __init__(self, indent=None):
+		"""
+		Args:
+		  indent: Pretty print with that many spaces per level
+			  (original whitespace is dropped), None keeps
+			  the text as it is.
+		"""
+		self.indent = indent
+		self.buf = ""
+		self.stack = []		# Open brackets
+		self.expect_key = False
+		self.open = None	# Bracket waiting for its line break
+		self.string = None	# Kind of string being received
+
+	def feed(self, text, final=False):
+		"""
+		Tokenize text appended to the stream.
+		Args:
+		  final: No more text follows, tokens kept back are
+			 returned too.
+		Return:
+		  List of tokens (kind, text)
+		"""
+		buf = self.buf + text if self.buf else text
+		res = []
+		pos = 0
+		n = len(buf)
+		match = _TOKEN.match
+		while pos < n:
+			if self.string:
+				pos = self._string_rest(res, buf, pos, final)
+				if self.string and pos < n:
+					# Escape sequence continues in next chunk
+					break
+				continue
+			m = match(buf, pos)
+			if m == None:
+				# Unterminated string
+				if final:
+					self._add(res, 'error', buf[pos:])
+					pos = n
+					break
+				# Continued in next chunk, pass on what's there
+				self._add(res, 'string', '"')
+				self.string = res[-1][0]
+				pos += 1
+				continue
+			end = m.end()
+			kind = m.lastgroup
+			if not final and ((end == n and (end - pos < _MAX_KEEP or
+					kind not in ('space', 'error'))) or
+					(kind == 'number' and _NUMBER_TAIL.match(buf, end))):
+				# Token might continue in next chunk
+				break
+			if kind == 'badstring':
+				kind = 'error'
+			self._add(res, kind, m.group())
+			pos = end
+		self.buf = buf[pos:]
+		if final and self.open:
+			res.append(('space', "\n"))
+			self.open = None
+		return res
+
+	def _string_rest(self, res, buf, pos, final):
+		# Add next part of a string received in parts, return
+		# position behind it.
+		kind = self.string
+		n = len(buf)
+		end = _STRING_REST.match(buf, pos).end()
+		if end < n and buf[end] == '"':
+			end += 1
+			self.string = None
+		elif final:
+			end = n
+			self.string = None
+		elif end < n - 1 or (end == n - 1 and buf[end] != "\\"):
+			# Line break in string
+			self.string = None
+		if end > pos:
+			res.append((kind, buf[pos:end]))
+		return end
+
+	def close(self):
+		""" Get tokens kept back at the end of the stream """
+		return self.feed("", True)
+
+	def _add(self, res, kind, s):
+		# Append token, track nesting to tell keys from string
+		# values and to indent.
+		if kind == 'space':
+			if self.indent == None:
+				res.append((kind, s))
+			return
+		if self.indent == None and kind != 'punct' and kind != 'string':
+			self.expect_key = False
+			res.append((kind, s))
+			return
+		if self.indent != None and self.open:
+			# Line break after an opening bracket unless the
+			# container is empty.
+			if kind != 'punct' or s not in "}]":
+				res.append(('space', "\n" + " "*(self.indent*len(self.stack))))
+			self.open = None
+		elif self.indent != None and kind == 'punct' and s in "}]" and self.stack:
+			res.append(('space', "\n" + " "*(self.indent*(len(self.stack)-1))))
+
+		if kind == 'string' and self.expect_key and self.stack[-1:] == ['{']:
+			kind = 'key'
+		self.expect_key = False
+		if kind == 'punct':
+			if s in "{[":
+				self.stack.append(s)
+				self.expect_key = s == '{'
+				self.open = s if self.indent != None else None
+			elif s in "}]":
+				if self.stack:
+					self.stack.pop()
+			elif s == ',':
+				self.expect_key = True
+				if self.indent != None:
+					res.append((kind, s))
+					res.append(('space', "\n" + " "*(self.indent*len(self.stack))))
+					return
+			elif s == ':' and self.indent != None:
+				res.append((kind, ": "))
+				return
+		res.append((kind, s))
+
+
+class JsonHighlighter:
+	"""
+	Highlight JSON from a byte stream.
+	Example:
+		hl = JsonHighlighter()
+		for chunk in chunks:
+			hl.feed(chunk).insert(text)
+		hl.close().insert(text)
+	"""
+	def __init__(self, encoding='utf-8', indent=None):
+		self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+		self.lexer = JsonLexer(indent)
+
+	def feed(self, data, out=None, final=False):
+		"""
+		Highlight next chunk (bytes).
+		Args:
+		  out: StyledText to append to (default: a new one)
+		Return:
+		  StyledText
+		"""
+		text = self.decoder.decode(data, final)
+		return jsonlex_styled(self.lexer.feed(text, final), out)
+
+	def close(self, out=None):
+		""" Highlight text kept back at the end of the stream """
+		return self.feed(b"", out, True)
+
+
+def jsonlex_styled(tokens, out=None):
+	"""
+	Append tokens to StyledText out (default: a new one).
+	"""
+	if out == None:
+		out = StyledText()
+	add = out.add
+	get = JSONLEX_TAGS.get
+	for kind,s in tokens:
+		add(s, get(kind))
+	return out
+
+def jsonlex_highlight(text, indent=None):
+	"""
+	Highlight complete JSON string.
+	Return:
+	  StyledText
+	"""
+	lexer = JsonLexer(indent)
+	return jsonlex_styled(lexer.feed(text, True))
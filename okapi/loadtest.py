@@ -0,0 +1,219 @@
+import math
+import time
+import threading
+import requests
+
+from httpclient import SessionPool
+from reqengine import reqengine_submit
+
+"""
+Load test of a single request.
+
+The request is prepared once and sent count times by a number of
+concurrent workers, optionally limited to a target rate (requests
+per second). Workers run as jobs of the shared request engine (see
+reqengine.py) and record into LoadStats, which can be read (snapshot)
+at any time while the test is running:
+{
+  'sent' : <int>,			# Requests sent
+  'done' : <int>,			# Requests finished (incl. errors)
+  'elapsed' : <float>,			# Seconds since start
+  'throughput' : <float>,		# Finished requests per second
+  'bytes' : <int>,			# Received body bytes
+  'status' : {<CODE|ERROR>:<int>},	# Responses by status code or
+					# exception name
+  'errors' : <int>,			# Status >= 400 and exceptions
+  'p50' : <float>, 'p90' : <float>,	# Latency percentiles (sec)
+  'p99' : <float>, 'max' : <float>,
+  'histogram' : [(<UPPER>, <int>), ...]	# Latency buckets (sec, count)
+}
+"""
+
+# Max. number of concurrent workers
+LOADTEST_MAX_CONCURRENCY = 256
+
+# Resolution of the latency histogram, bucket bounds grow by
+# this factor (1.05 = 5% relative error)
+_BUCKET_BASE = 1.05
+_BUCKET_MIN = 1e-4	# Latencies below 0.1 ms go to the first bucket
+
+def _bucket(t):
+	# Get histogram bucket of latency t (sec)
+	if t <= _BUCKET_MIN:
+		return 0
+	return int(math.log(t / _BUCKET_MIN, _BUCKET_BASE)) + 1
+
+def _bucket_upper(b):
+	# Get upper bound of bucket b
+	return _BUCKET_MIN * _BUCKET_BASE ** b
+
+
+class LoadStats:
+	"""
+	Thread safe counters and latency histogram of a load test.
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.start = time.monotonic()
+		self.end = None
+		self.sent = 0
+		self.done = 0
+		self.bytes = 0
+		self.errors = 0
+		self.status = {}
+		self.buckets = {}	# {bucket:count}
+		self.max = 0.0
+
+	def record(self, latency, status, nbytes=0):
+		"""
+		Record finished request.
+		Args:
+		  latency: Seconds
+		  status:  Status code or exception name
+		  nbytes:  Received body bytes
+		"""
+		b = _bucket(latency)
+		with self.lock:
+			self.done += 1
+			self.bytes += nbytes
+			self.status[status] = self.status.get(status, 0) + 1
+			if type(status) != int or status >= 400:
+				self.errors += 1
+			self.buckets[b] = self.buckets.get(b, 0) + 1
+			if latency > self.max:
+				self.max = latency
+
+	def percentile(self, p, buckets=None, n=None):
+		"""
+		Get latency (sec) below which p percent of the
+		requests finished.
+		"""
+		if buckets == None:
+			with self.lock:
+				buckets = dict(self.buckets)
+				n = self.done
+		if not n:
+			return 0.0
+		rank = math.ceil(n * p / 100)
+		count = 0
+		for b in sorted(buckets):
+			count += buckets[b]
+			if count >= rank:
+				return min(_bucket_upper(b), self.max)
+		return self.max
+
+	def snapshot(self):
+		"""
+		Get dictionary with current statistics (see above).
+		"""
+		with self.lock:
+			buckets = dict(self.buckets)
+			res = {'sent':self.sent, 'done':self.done,
+				'bytes':self.bytes, 'errors':self.errors,
+				'status':dict(self.status), 'max':self.max}
+		end = self.end if self.end else time.monotonic()
+		res['elapsed'] = end - self.start
+		res['throughput'] = res['done'] / res['elapsed'] if res['elapsed'] else 0.0
+		for p in (50, 90, 99):
+			res['p'+str(p)] = self.percentile(p, buckets, res['done'])
+		res['histogram'] = [(_bucket_upper(b), buckets[b])
+					for b in sorted(buckets)]
+		return res
+
+
+class LoadTest:
+	"""
+	Load test sending the same request count times.
+	"""
+	def __init__(self, method, url, data=None, headers=None,
+			count=100, concurrency=10, rps=0, timeout=10):
+		"""
+		Args:
+		  method, url, data, headers: The request
+		  count:       Number of requests
+		  concurrency: Number of concurrent workers
+		  rps:         Target requests per second (0: unlimited)
+		  timeout:     Timeout (sec) of a single request
+		"""
+		self.prep = requests.Request(method, url, data=data,
+				headers=headers).prepare()
+		self.count = count
+		self.concurrency = max(1, min(concurrency, count,
+				LOADTEST_MAX_CONCURRENCY))
+		self.rps = rps
+		self.timeout = timeout
+		self.stats = None
+		self.active = False
+		self.jobs = []
+		self.next = 0		# Index of next request
+		self.lock = threading.Lock()
+		self.running = 0	# Number of running workers
+		self.pool = None
+
+	def start(self):
+		"""
+		Start workers (returns immediately).
+		"""
+		self.stats = LoadStats()
+		self.pool = SessionPool(pool_size=self.concurrency)
+		self.active = True
+		self.running = self.concurrency
+		self.jobs = [reqengine_submit(self._worker)
+				for _ in range(self.concurrency)]
+
+	def stop(self):
+		"""
+		Stop running test.
+		"""
+		for job in self.jobs:
+			job.cancel()
+		self._finish()
+
+	def is_running(self):
+		return self.active
+
+	def _finish(self):
+		with self.lock:
+			active = self.active
+			self.active = False
+		if active:
+			self.stats.end = time.monotonic()
+			self.pool.close()
+
+	def _take(self):
+		# Get index of next request to send or None if done.
+		with self.lock:
+			if self.next >= self.count:
+				return None
+			i = self.next
+			self.next += 1
+			self.stats.sent += 1
+			return i
+
+	def _worker(self, job):
+		try:
+			while not job.is_cancelled():
+				i = self._take()
+				if i == None:
+					break
+				if self.rps:
+					# Wait for scheduled send time
+					delay = self.stats.start + i/self.rps - time.monotonic()
+					if delay > 0 and job.cancelled.wait(delay):
+						break
+				self._send()
+		finally:
+			with self.lock:
+				self.running -= 1
+				last = self.running == 0
+			if last:
+				self._finish()
+
+	def _send(self):
+		t = time.monotonic()
+		try:
+			resp = self.pool.send(self.prep, timeout=self.timeout)
+			n = len(resp.content)
+			self.stats.record(time.monotonic() - t, resp.status_code, n)
+		except requests.exceptions.RequestException as e:
+			self.stats.record(time.monotonic() - t, type(e).__name__)
@@ -18,6 +18,13 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from getopt import getopt, GetoptError
 from OkAPI import OkAPI
+from catalog import catalog_print
+import DOC as doc
+from validate import validate_doc
+from validate import validate_print
+from httpclient import httpclient_configure
+from smoketest import SmokeTest
+from smoketest import smoketest_print
 import sys
 
 HELP="""
@@ -27,15 +34,31 @@ Usage: okapi [OPTIONS]
 
 -h, --help            Show this help and quit
 -d, --basedir=PATH    Set different basedirectory path
+-l, --list            List stored apidocs and quit
+-s, --sqlite=NAME     Convert stored apidoc to sqlite database and quit
+-j, --json=NAME       Convert stored apidoc to json file and quit
+-V, --validate=NAME   Validate stored apidoc and quit
+-T, --smoketest=NAME  Send one request per endpoint of stored apidoc,
+                      print report and quit
+    --pool-size=N     Max. open connections per host (default: 10)
+    --idle-timeout=SEC
+                      Close connections unused for SEC seconds
+                      (default: 120)
 """
 
 def main(args):
 
 	basedir = None
+	list_docs = False
+	convert = None
+	validate = None
+	smoketest = None
 
 	try:
-		opts,rem = getopt(args, 'hd:',
-				['help', 'basedir='])
+		opts,rem = getopt(args, 'hd:ls:j:V:T:',
+				['help', 'basedir=', 'list', 'sqlite=', 'json=',
+				 'validate=', 'smoketest=', 'pool-size=',
+				 'idle-timeout='])
 	except GetoptError as ge:
 		print('Error: {}'.format(ge))
 		return
@@ -46,9 +69,48 @@ def main(args):
 			return
 		elif opt in ('-d', '--basedir'):
 			basedir = arg
+		elif opt in ('-l', '--list'):
+			list_docs = True
+		elif opt in ('-s', '--sqlite'):
+			convert = (arg, True)
+		elif opt in ('-j', '--json'):
+			convert = (arg, False)
+		elif opt in ('-V', '--validate'):
+			validate = arg
+		elif opt in ('-T', '--smoketest'):
+			smoketest = arg
+		elif opt == '--pool-size':
+			httpclient_configure(pool_size=int(arg))
+		elif opt == '--idle-timeout':
+			httpclient_configure(idle_timeout=float(arg))
 
+	okapi = OkAPI(basedir)
+	if list_docs:
+		catalog_print(okapi.basedir)
+		return
+	if convert:
+		try:
+			p = doc.DOC_convert_storage(okapi.basedir, *convert)
+			print("Stored apidoc '" + convert[0] + "' at " + p)
+		except Exception as e:
+			print("! Failed to convert apidoc '" + convert[0] + "'")
+			print("  " + str(e))
+		return
+	if validate:
+		p = doc.DOC_get_storage_path(okapi.basedir, {'name':validate})
+		if doc.DOC_load(p):
+			validate_print(validate_doc())
+		return
+	if smoketest:
+		p = doc.DOC_get_storage_path(okapi.basedir, {'name':smoketest})
+		if doc.DOC_load(p):
+			test = SmokeTest()
+			test.run()
+			test.wait()
+			smoketest_print(test)
+		return
 
-	OkAPI().run()
+	okapi.run()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,249 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from uidispatch import uidispatch_post
+
+"""
+Request engine running all requests of okapi (interactive requests,
+smoke and load tests) on one shared pool of worker threads.
+
+The engine is thread based: the requests library is blocking, so
+every running job holds a worker thread while it's sending or
+receiving. Threads are created on demand up to REQENGINE_WORKERS and
+reused. A single background asyncio event loop schedules the jobs and
+handles their timeouts and cancellation, a job waiting for a free
+worker only costs a coroutine.
+
+A job is submitted with reqengine_submit(func, *args). func is called
+as func(job, *args) in a worker thread. Jobs can be cancelled and can
+have a timeout, which a job can end once it's making progress (see
+Job.end_timeout), e.g. after the response headers of a long download
+have been received. A job blocked in I/O can set an abort function (see
+Job.set_abort), which is called on cancel, e.g. to shut down the
+connection of the request. The result of a job that finishes after
+it has been cancelled (or timed out) is passed to on_discard, e.g. to
+close a received response.
+
+Results (on_done callbacks) and functions posted by running jobs
+(job.post) are executed on the Tk thread by the ui dispatcher (see
+uidispatch.py).
+"""
+
+# Max. number of jobs running at the same time (worker threads), room
+# for a load test (see loadtest.py) besides the interactive requests
+REQENGINE_WORKERS = 320
+
+
+class RequestCancelled(Exception):
+	""" Raised in a job that has been cancelled """
+	pass
+
+
+class Job:
+	"""
+	Submitted job.
+	"""
+	__slots__ = ('engine', 'func', 'args', 'kwargs', 'timeout',
+			'on_done', 'on_discard', 'cancelled', 'future', 'abort',
+			'timed')
+
+	def __init__(self, engine, func, args, kwargs, timeout, on_done,
+			on_discard=None):
+		self.engine = engine
+		self.func = func
+		self.args = args
+		self.kwargs = kwargs
+		self.timeout = timeout
+		self.on_done = on_done
+		self.on_discard = on_discard
+		self.cancelled = threading.Event()
+		self.future = None	# concurrent.futures.Future
+		self.abort = None	# Called on cancel (see set_abort)
+		self.timed = True	# Timeout applies (see end_timeout)
+
+	def cancel(self):
+		"""
+		Cancel job. A job that is already running notices it
+		when checking job.cancelled (e.g. httpclient_receive)
+		or by its abort function failing the blocked call.
+		"""
+		self._abort()
+		if self.future:
+			self.future.cancel()
+
+	def _abort(self):
+		self.cancelled.set()
+		abort = self.abort
+		if abort:
+			try:
+				abort()
+			except Exception as e:
+				print("! Failed to abort request")
+				print("  " + str(e))
+
+	def set_abort(self, func):
+		"""
+		Set function called (on any thread) when the job is
+		cancelled, None removes it. Called at once if the job
+		has already been cancelled.
+		"""
+		self.abort = func
+		if func and self.cancelled.is_set():
+			func()
+
+	def end_timeout(self):
+		"""
+		The timeout of the job doesn't apply any more, it
+		runs until it's done (or cancelled).
+		"""
+		self.timed = False
+
+	def is_cancelled(self):
+		return self.cancelled.is_set()
+
+	def check(self):
+		""" Raise RequestCancelled if job has been cancelled """
+		if self.cancelled.is_set():
+			raise RequestCancelled()
+
+	def post(self, func, *args, key=None):
+		"""
+		Call func(*args) on the Tk thread (skipped if the job
+		has been cancelled meanwhile). Posts with the same key
+		are coalesced (see uidispatch.py).
+		"""
+		uidispatch_post(func, *args, key=key, skip_if=self.is_cancelled)
+
+	def result(self, timeout=None):
+		"""
+		Wait for job and get result of func (raises its
+		exception). For use outside of the Tk thread.
+		"""
+		return self.future.result(timeout)
+
+
+class ThreadedRequestEngine:
+	"""
+	Event loop thread and worker thread pool for jobs.
+	"""
+	def __init__(self, workers=REQENGINE_WORKERS):
+		self.executor = ThreadPoolExecutor(workers,
+				thread_name_prefix="okapi-request")
+		self.loop = asyncio.new_event_loop()
+		self.thread = threading.Thread(target=self._run,
+				name="okapi-engine", daemon=True)
+		self.thread.start()
+
+	def _run(self):
+		asyncio.set_event_loop(self.loop)
+		self.loop.run_forever()
+		# Cancel jobs left after shutdown
+		tasks = asyncio.all_tasks(self.loop)
+		for t in tasks:
+			t.cancel()
+		self.loop.run_until_complete(
+			asyncio.gather(*tasks, return_exceptions=True))
+		self.loop.close()
+
+	async def _run_job(self, job):
+		res = err = cf = None
+		try:
+			job.check()
+			cf = self.executor.submit(job.func, job, *job.args,
+					**job.kwargs)
+			f = asyncio.wrap_future(cf)
+			try:
+				res = await asyncio.wait_for(asyncio.shield(f),
+						job.timeout)
+			except asyncio.TimeoutError:
+				if job.timed:
+					raise
+				res = await asyncio.shield(f)
+		except asyncio.TimeoutError:
+			job._abort()
+			self._discard(job, cf)
+			err = TimeoutError("Timeout after " + str(job.timeout) + " sec")
+		except asyncio.CancelledError:
+			if cf:
+				self._discard(job, cf)
+			self._done(job, None, RequestCancelled())
+			raise
+		except Exception as e:
+			err = e
+		self._done(job, res, err)
+		if err:
+			raise err
+		return res
+
+	def _discard(self, job, cf):
+		# Result of job isn't delivered, pass it to on_discard
+		# when the worker is done.
+		if cf.cancel() or not job.on_discard:
+			return
+		def discard(cf):
+			if cf.cancelled() or cf.exception() != None:
+				return
+			try:
+				job.on_discard(cf.result())
+			except Exception as e:
+				print("! Failed to discard result")
+				print("  " + str(e))
+		cf.add_done_callback(discard)
+
+	def _done(self, job, res, err):
+		if job.on_done:
+			uidispatch_post(job.on_done, job, res, err)
+
+	def submit(self, func, *args, timeout=None, on_done=None,
+			on_discard=None, **kwargs):
+		"""
+		Submit job.
+		Args:
+		  func:       Function called as func(job, *args, **kwargs)
+			      in a worker thread.
+		  timeout:    Cancel job after that many seconds (unless
+			      it has ended the timeout, see Job.end_timeout)
+		  on_done:    Function called as on_done(job, result, error)
+			      on the Tk thread, error is None on success.
+		  on_discard: Function called (in the worker thread) with
+			      the result of func if it's returned after the
+			      job has been cancelled or timed out.
+		Return:
+		  Job
+		"""
+		job = Job(self, func, args, kwargs, timeout, on_done, on_discard)
+		job.future = asyncio.run_coroutine_threadsafe(
+				self._run_job(job), self.loop)
+		return job
+
+	def shutdown(self):
+		""" Stop event loop and worker threads """
+		self.loop.call_soon_threadsafe(self.loop.stop)
+		self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_engine = None
+
+def reqengine_get():
+	""" Get (and create) the request engine """
+	global _engine
+	if _engine == None:
+		_engine = ThreadedRequestEngine()
+	return _engine
+
+def reqengine_submit(func, *args, timeout=None, on_done=None,
+		on_discard=None, **kwargs):
+	"""
+	Submit job to the shared request engine (see
+	ThreadedRequestEngine.submit).
+	"""
+	return reqengine_get().submit(func, *args, timeout=timeout,
+			on_done=on_done, on_discard=on_discard, **kwargs)
+
+def reqengine_shutdown():
+	""" Stop the request engine """
+	global _engine
+	if _engine:
+		_engine.shutdown()
+		_engine = None
@@ -0,0 +1,187 @@
+import re
+from urllib.parse import urlsplit
+from urllib.parse import unquote
+
+"""
+Route trie for matching concrete urls against the endpoint URIs of
+an apidoc, e.g. 'GET /users/42/orders' matches the endpoint
+'GET /users/{userId}/orders' with path items {'userId': '42'}.
+
+Each node of the trie is one path segment. Segments are either
+literal ('users'), a single path item ('{userId}') or a pattern
+mixing both ('{name}.json'). Literal children are looked up in a
+dict, so matching a path costs O(number of segments) unless a
+literal dead end forces trying a path item branch.
+"""
+
+_reg_item = re.compile(r"\{(\w+)\}")
+
+class _RouteNode:
+	__slots__ = ('literal', 'item', 'patterns', 'endpoints')
+
+	def __init__(self):
+		self.literal = {}	# {segment:_RouteNode}
+		self.item = None	# _RouteNode for '{name}' segments
+		self.patterns = {}	# {segment:(regex,_RouteNode)}
+		self.endpoints = {}	# {method:uri}
+
+	def is_empty(self):
+		return not (self.literal or self.item or\
+				self.patterns or self.endpoints)
+
+def _split(path):
+	# Split path into segments (ignoring leading/trailing '/')
+	path = path.strip("/")
+	return path.split("/") if path else []
+
+def _with_scheme(url):
+	# Prepend scheme to url (if missing), so that urlsplit()
+	# doesn't take the host for a path.
+	if url and not url.startswith("/") and "://" not in url:
+		return "http://" + url
+	return url
+
+def _segment_kind(seg):
+	# Get kind of uri segment ('literal', 'item' or 'pattern')
+	if not "{" in seg:
+		return 'literal'
+	elif _reg_item.fullmatch(seg):
+		return 'item'
+	return 'pattern'
+
+def _segment_regex(seg):
+	# Compile regex for a segment mixing literals and path items.
+	parts = _reg_item.split(seg)
+	s = ""
+	for i,p in enumerate(parts):
+		s += "([^/]+?)" if i % 2 else re.escape(p)
+	return re.compile(s)
+
+
+class RouteTrie:
+	"""
+	Trie of endpoint URIs.
+	"""
+	def __init__(self, endpoints=None):
+		"""
+		Args:
+		  endpoints: Dictionary {method:{uri:...}} (e.g.
+			     DOC['endpoints']), only the keys are used.
+		"""
+		self.root = _RouteNode()
+		self.items = {}		# {(method,uri):[pathitem, ...]}
+		if endpoints:
+			for method,x in endpoints.items():
+				for uri in x.keys():
+					self.add(method, uri)
+
+	def __len__(self):
+		return len(self.items)
+
+	def add(self, method, uri):
+		"""
+		Add endpoint with given method and uri.
+		"""
+		node = self.root
+		for seg in _split(uri.split("?", 1)[0]):
+			kind = _segment_kind(seg)
+			if kind == 'literal':
+				node = node.literal.setdefault(seg, _RouteNode())
+			elif kind == 'item':
+				if node.item == None:
+					node.item = _RouteNode()
+				node = node.item
+			else:
+				if seg not in node.patterns:
+					node.patterns[seg] = (_segment_regex(seg), _RouteNode())
+				node = node.patterns[seg][1]
+		node.endpoints[method] = uri
+		self.items[(method, uri)] = _reg_item.findall(uri)
+
+	def remove(self, method, uri):
+		"""
+		Remove endpoint with given method and uri.
+		Return:
+		  True if removed, False if not found.
+		"""
+		if (method, uri) not in self.items:
+			return False
+		del self.items[(method, uri)]
+
+		# Walk down, remember path for pruning empty nodes.
+		path = []
+		node = self.root
+		for seg in _split(uri.split("?", 1)[0]):
+			kind = _segment_kind(seg)
+			path.append((node, kind, seg))
+			if kind == 'literal':
+				node = node.literal[seg]
+			elif kind == 'item':
+				node = node.item
+			else:	node = node.patterns[seg][1]
+		del node.endpoints[method]
+
+		for parent,kind,seg in reversed(path):
+			if not node.is_empty():
+				break
+			if kind == 'literal':
+				del parent.literal[seg]
+			elif kind == 'item':
+				parent.item = None
+			else:	del parent.patterns[seg]
+			node = parent
+		return True
+
+	def _match(self, node, segs, i, method, values):
+		# Match segments segs[i:] below node, path item values
+		# are appended to values.
+		if i == len(segs):
+			if method in node.endpoints:
+				return node.endpoints[method]
+			return None
+
+		seg = segs[i]
+		child = node.literal.get(seg)
+		if child:
+			uri = self._match(child, segs, i+1, method, values)
+			if uri: return uri
+
+		for reg,child in node.patterns.values():
+			m = reg.fullmatch(seg)
+			if m:
+				n = len(values)
+				values.extend(m.groups())
+				uri = self._match(child, segs, i+1, method, values)
+				if uri: return uri
+				del values[n:]
+
+		if node.item and seg:
+			values.append(seg)
+			uri = self._match(node.item, segs, i+1, method, values)
+			if uri: return uri
+			values.pop()
+		return None
+
+	def match(self, method, url, base=""):
+		"""
+		Match concrete url against the endpoint URIs.
+		Args:
+		  method: HTTP method
+		  url:    Url or path (e.g. 'http://host/users/42?x=1')
+		  base:   Api address, its path is removed from url's path
+			  (e.g. 'http://host/api/v1')
+		Return:
+		  Tuple (uri, pathitems) or None if no endpoint matches.
+		  pathitems is a dictionary {name:value}.
+		"""
+		path = urlsplit(_with_scheme(url)).path
+		bpath = urlsplit(_with_scheme(base)).path.rstrip("/")
+		if bpath and (path == bpath or path.startswith(bpath + "/")):
+			path = path[len(bpath):]
+
+		values = []
+		uri = self._match(self.root, _split(path), 0, method, values)
+		if uri == None:
+			return None
+		names = self.items[(method, uri)]
+		return uri, {k:unquote(v) for k,v in zip(names, values)}
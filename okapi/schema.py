@@ -0,0 +1,475 @@
+import sys
+from collections.abc import MutableMapping
+
+"""
+In-memory objects of the apidoc (see DOC.py for the format).
+
+Endpoints, parameters, responses, models and model attributes are
+stored as slotted schema objects, everything else as DocDict. Schema
+objects behave like dictionaries, so DOC['endpoints'][m][u]['params']
+is still accessed the same way, but they take a fraction of the memory
+of a dictionary. Enum-like values (type, source, content_type, ...)
+are interned, all parameters share the same string objects.
+
+Every DocDict, DocList and schema object knows the section of DOC it
+belongs to and calls the touch handler (see schema_set_touch_handler)
+with this section on every change. Dictionaries and lists added to
+the apidoc are converted to DocDict's/DocList's/schema objects, so
+in-place edits (e.g. values.append(x)) are noticed too. Objects that
+aren't part of DOC (no section) don't call the touch handler.
+
+Use schema_json_default() as 'default' when serializing with json.
+"""
+
+SECTION_ROOT = ('root',)
+
+_NOVALUE = object()
+
+def _touch_handler(section):
+	pass
+
+def _touch(section):
+	# Report change of section, objects not in DOC (yet)
+	# have none and aren't reported.
+	if section != None:
+		_touch_handler(section)
+
+def schema_set_touch_handler(func):
+	"""
+	Set function called with the changed section on every
+	change of a DocDict, DocList or schema object (see
+	DOC_touch).
+	"""
+	global _touch_handler
+	_touch_handler = func
+
+
+class DocDict(dict):
+	"""
+	Dictionary used for all untyped objects of the apidoc.
+	Every modification calls the touch handler, so detecting
+	changes doesn't need to serialize the whole document.
+	Nested dictionaries are converted to DocDict's when they
+	are added, changes deep inside the apidoc (e.g. in an
+	endpoint edited in place) are noticed too.
+
+	Each DocDict knows the section of DOC it belongs to
+	(see DOC_dirty), so changes are recorded per section.
+	"""
+	__slots__ = ('_sec', '__weakref__')
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._sec = None
+		for k,v in dict.items(self):
+			if type(v) in (dict, list):
+				dict.__setitem__(self, k, _container(v))
+
+	def __setitem__(self, key, value):
+		value = self._convert(key, value)
+		if not isinstance(value, _CONTAINERS) and \
+				dict.get(self, key, _NOVALUE) == value:
+			# Same scalar value, nothing changed.
+			return
+		dict.__setitem__(self, key, value)
+		sec = self._child_section(key)
+		if isinstance(value, _TAGGED):
+			schema_tag(value, sec)
+		_touch(sec)
+
+	def __delitem__(self, key):
+		dict.__delitem__(self, key)
+		_touch(self._child_section(key))
+
+	def setdefault(self, key, default=None):
+		if key not in self:
+			self[key] = default
+		return dict.__getitem__(self, key)
+
+	def update(self, *args, **kwargs):
+		for k,v in dict(*args, **kwargs).items():
+			self[k] = v
+
+	def pop(self, key, *default):
+		if key in self:
+			_touch(self._child_section(key))
+		return dict.pop(self, key, *default)
+
+	def popitem(self):
+		key,value = dict.popitem(self)
+		_touch(self._child_section(key))
+		return key,value
+
+	def clear(self):
+		for key in list(self.keys()):
+			del self[key]
+
+	def _convert(self, key, value):
+		# Convert value added at key. Models and endpoints
+		# become schema objects.
+		sec = self._sec
+		if sec == SECTION_ROOT:
+			if key == 'models':
+				return _typed(Model, value)
+			elif key == 'endpoints':
+				return _endpoints(value)
+		elif sec == ('endpoints',):
+			return _typed(Endpoint, value)
+		return _container(value)
+
+	def _child_section(self, key):
+		# Get section of the value stored at key.
+		sec = self._sec
+		if sec == None:
+			return None
+		elif sec == SECTION_ROOT:
+			if key in ('endpoints', 'models'):
+				return (key,)
+			return ('doc', key)
+		elif sec[0] == 'endpoints':
+			return ('method', key)
+		elif sec[0] == 'method':
+			return ('endpoint', sec[1], key)
+		elif sec[0] == 'models':
+			return ('model', key)
+		return sec
+
+class DocList(list):
+	"""
+	List used for all lists of the apidoc (e.g. the values of
+	a parameter), calls the touch handler on every
+	modification like DocDict.
+	"""
+	__slots__ = ('_sec',)
+
+	def __init__(self, *args):
+		super().__init__(_container(v) for v in list(*args))
+		self._sec = None
+
+	def _changed(self):
+		sec = getattr(self, '_sec', None)
+		for v in list.__iter__(self):
+			if isinstance(v, _TAGGED) and v._sec != sec:
+				schema_tag(v, sec)
+		_touch(sec)
+
+	def _child_section(self, key):
+		return self._sec
+
+	def __setitem__(self, key, value):
+		if isinstance(key, slice):
+			value = [_container(v) for v in value]
+		else:	value = _container(value)
+		list.__setitem__(self, key, value)
+		self._changed()
+
+	def __delitem__(self, key):
+		list.__delitem__(self, key)
+		self._changed()
+
+	def __iadd__(self, other):
+		self.extend(other)
+		return self
+
+	def __imul__(self, n):
+		list.__imul__(self, n)
+		self._changed()
+		return self
+
+	def append(self, value):
+		list.append(self, _container(value))
+		self._changed()
+
+	def extend(self, values):
+		list.extend(self, [_container(v) for v in values])
+		self._changed()
+
+	def insert(self, i, value):
+		list.insert(self, i, _container(value))
+		self._changed()
+
+	def remove(self, value):
+		list.remove(self, value)
+		self._changed()
+
+	def pop(self, *args):
+		value = list.pop(self, *args)
+		self._changed()
+		return value
+
+	def clear(self):
+		list.clear(self)
+		self._changed()
+
+	def sort(self, *args, **kwargs):
+		list.sort(self, *args, **kwargs)
+		self._changed()
+
+	def reverse(self):
+		list.reverse(self)
+		self._changed()
+
+	def copy(self):
+		""" Get shallow copy as plain list """
+		return list(self)
+
+class TypedDict(DocDict):
+	"""
+	DocDict with values of a schema class (e.g. the parameters
+	of an endpoint). Added dictionaries are converted to it.
+	"""
+	__slots__ = ('_cls',)
+
+	def __init__(self, cls, d=None):
+		dict.__init__(self)
+		self._sec = None
+		self._cls = cls
+		if d:
+			for k,v in d.items():
+				dict.__setitem__(self, k, cls.from_dict(v))
+
+	def _convert(self, key, value):
+		return self._cls.from_dict(value)
+
+def _typed(cls, value):
+	# Get value as TypedDict of given schema class.
+	if isinstance(value, TypedDict) and value._cls is cls:
+		# Convert values added without conversion
+		# (e.g. by journal_apply()).
+		for k,v in dict.items(value):
+			if isinstance(v, dict):
+				dict.__setitem__(value, k, cls.from_dict(v))
+		return value
+	return TypedDict(cls, value)
+
+def _endpoints(value):
+	# Get value as DocDict with a TypedDict of endpoints
+	# for every HTTP method.
+	eps = DocDict()
+	for method,x in value.items():
+		dict.__setitem__(eps, method, _typed(Endpoint, x))
+	return eps
+
+
+class SchemaObject(MutableMapping):
+	"""
+	Base class of all schema objects.
+	Subclasses set _fields to the known keys (in order). Values
+	of known keys are stored in slots named '_' + key, values of
+	unknown keys in the dictionary _extra.
+	"""
+	__slots__ = ('_sec', '_extra')
+
+	# Known keys
+	_fields = ()
+
+	# Keys with dictionaries of schema objects {key:class}
+	_typed = {}
+
+	# Keys with interned string values
+	_interned = ()
+
+	def __init_subclass__(cls):
+		cls._slots = {k:'_' + k for k in cls._fields}
+
+	def __init__(self, d=None):
+		self._sec = None
+		self._extra = None
+		if d:
+			for k,v in d.items():
+				self._set(k, v)
+
+	@classmethod
+	def from_dict(cls, d):
+		"""
+		Create object from dictionary.
+		If d already is an instance of cls, it's returned.
+		"""
+		if isinstance(d, cls):
+			return d
+		return cls(d)
+
+	def to_dict(self):
+		"""
+		Get object as (nested) plain dictionary.
+		"""
+		return {k:_to_plain(v) for k,v in self.items()}
+
+	def _set(self, key, value):
+		# Set value without calling the touch handler.
+		if key in self._typed:
+			value = _typed(self._typed[key], value)
+		elif type(value) in (dict, list):
+			value = _container(value)
+		elif type(value) == str and key in self._interned:
+			value = sys.intern(value)
+
+		slot = self._slots.get(key)
+		if slot:
+			setattr(self, slot, value)
+		else:
+			if self._extra == None:
+				self._extra = {}
+			self._extra[key] = value
+		return value
+
+	def _child_section(self, key):
+		return self._sec
+
+	def __getitem__(self, key):
+		slot = self._slots.get(key)
+		if slot:
+			try:
+				return getattr(self, slot)
+			except AttributeError:
+				raise KeyError(key) from None
+		if self._extra and key in self._extra:
+			return self._extra[key]
+		raise KeyError(key)
+
+	def __setitem__(self, key, value):
+		if not isinstance(value, _CONTAINERS) and \
+				self.get(key, _NOVALUE) == value:
+			return
+		value = self._set(key, value)
+		if isinstance(value, _TAGGED):
+			schema_tag(value, self._sec)
+		_touch(self._sec)
+
+	def __delitem__(self, key):
+		slot = self._slots.get(key)
+		if slot:
+			try:
+				delattr(self, slot)
+			except AttributeError:
+				raise KeyError(key) from None
+		elif self._extra and key in self._extra:
+			del self._extra[key]
+		else:	raise KeyError(key)
+		_touch(self._sec)
+
+	def __contains__(self, key):
+		slot = self._slots.get(key)
+		if slot:
+			return hasattr(self, slot)
+		return bool(self._extra) and key in self._extra
+
+	def __iter__(self):
+		for key,slot in self._slots.items():
+			if hasattr(self, slot):
+				yield key
+		if self._extra:
+			yield from list(self._extra)
+
+	def __len__(self):
+		return sum(1 for _ in self)
+
+	def __repr__(self):
+		return type(self).__name__ + "(" + repr(dict(self.items())) + ")"
+
+	def copy(self):
+		""" Get shallow copy as plain dictionary """
+		return dict(self.items())
+
+class Attribute(SchemaObject):
+	""" Model attribute """
+	_fields = ('type', 'required', 'is_array', 'values', 'example', 'info')
+	_interned = ('type',)
+	__slots__ = tuple('_' + k for k in _fields)
+
+class Model(SchemaObject):
+	""" Model """
+	_fields = ('info', 'attributes')
+	_typed = {'attributes' : Attribute}
+	__slots__ = tuple('_' + k for k in _fields)
+
+class Parameter(SchemaObject):
+	""" Endpoint parameter """
+	_fields = ('type', 'source', 'required', 'is_array',
+		'content_type', 'values', 'example', 'info')
+	_interned = ('type', 'source', 'content_type')
+	__slots__ = tuple('_' + k for k in _fields)
+
+class Response(SchemaObject):
+	""" Endpoint response """
+	_fields = ('summary', 'content_type', 'model', 'example', 'headers')
+	_interned = ('summary', 'content_type', 'model')
+	__slots__ = tuple('_' + k for k in _fields)
+
+class Endpoint(SchemaObject):
+	""" Endpoint """
+	_fields = ('summary', 'info', 'params', 'response')
+	_typed = {'params' : Parameter, 'response' : Response}
+	__slots__ = tuple('_' + k for k in _fields) + ('__weakref__',)
+
+
+_CONTAINERS = (dict, list, SchemaObject)
+_TAGGED = (DocDict, DocList, SchemaObject)
+
+def _container(v):
+	# Convert plain dictionary/list to DocDict/DocList.
+	if type(v) == dict:
+		return DocDict(v)
+	elif type(v) == list:
+		return DocList(v)
+	return v
+
+def _to_plain(v):
+	# Convert value to plain dictionaries/lists.
+	if isinstance(v, SchemaObject):
+		return v.to_dict()
+	elif isinstance(v, dict):
+		return {k:_to_plain(x) for k,x in v.items()}
+	elif isinstance(v, list):
+		return [_to_plain(x) for x in v]
+	return v
+
+def schema_tag(d, sec):
+	"""
+	Set section of given DocDict/DocList/schema object and of
+	all nested ones. Plain lists (e.g. added without conversion
+	by journal_apply()) are converted to DocList's.
+	"""
+	d._sec = sec
+	if isinstance(d, list):
+		items = enumerate(list.__iter__(d))
+	else:	items = list(dict.items(d) if isinstance(d, dict) else d.items())
+	for k,v in items:
+		if type(v) == list:
+			v = DocList(v)
+			if isinstance(d, dict):
+				dict.__setitem__(d, k, v)
+			elif isinstance(d, list):
+				list.__setitem__(d, k, v)
+			else:	d._set(k, v)
+		if isinstance(v, _TAGGED):
+			schema_tag(v, d._child_section(k))
+
+def schema_doc_from_dict(d):
+	"""
+	Convert apidoc dictionary (e.g. loaded from json) to
+	DocDict with schema objects for models and endpoints.
+	"""
+	doc = DocDict()
+	doc._sec = SECTION_ROOT
+	for k,v in d.items():
+		dict.__setitem__(doc, k, doc._convert(k, v))
+	schema_tag(doc, SECTION_ROOT)
+	return doc
+
+def schema_to_dict(d):
+	"""
+	Get DocDict/schema object as (nested) plain dictionary,
+	independent of the original.
+	"""
+	return _to_plain(d)
+
+def schema_json_default(o):
+	"""
+	Serialize schema objects with json, use as
+	json.dump(doc, f, default=schema_json_default).
+	"""
+	if isinstance(o, SchemaObject):
+		return dict(o.items())
+	raise TypeError("Object of type " + type(o).__name__ +\
+			" is not JSON serializable")
@@ -0,0 +1,262 @@
+import json
+import time
+import threading
+import requests
+from urllib.parse import urlencode
+
+from httpclient import SessionPool
+from reqengine import reqengine_submit
+from uritemplate import uritemplate_get
+import DOC as doc
+
+"""
+Smoke test of all endpoints of an apidoc.
+
+One request is built per endpoint from the examples of the apidoc
+(parameter 'example' or first of 'values', model examples from
+DOC_model_to_dict(), defaults of the datatype otherwise). Requests
+are sent by a bounded number of workers, jobs of the shared request
+engine (see reqengine.py).
+There is one result per endpoint:
+{
+  'method' : <str>,
+  'uri' : <str>,			# Endpoint URI
+  'url' : <str>,			# Requested url
+  'status' : <int>,			# Status code (None on error)
+  'latency' : <float>,			# Seconds
+  'documented' : <bool>,		# Status is documented in 'response'
+  'error' : <str>,			# Exception (None on success)
+  'timing' : {<PHASE>:<float>}		# Timing breakdown (see httptiming.py)
+}
+"""
+
+# Default number of concurrent requests
+SMOKETEST_WORKERS = 16
+
+# Values used for path items without example
+_PATH_DEFAULTS = {'integer':"1", 'decimal':"1.0", 'boolean':"true"}
+
+
+def _param_value(key, p):
+	# Get example value of parameter as string or None.
+	if p.get('example') not in (None, ""):
+		v = p['example']
+	elif p.get('values'):
+		v = p['values'][0]
+	elif p['type'] in doc.DOC['models']:
+		return json.dumps(doc.DOC_model_to_dict(p['type']))
+	elif p['source'] == 'path':
+		return _PATH_DEFAULTS.get(p['type'], key)
+	elif p.get('required'):
+		v = doc.PARAMETER_EXAMPLES.get(p['type'], "")
+	else:	return None
+
+	if type(v) == bool:
+		return "true" if v else "false"
+	elif type(v) in (dict, list):
+		return json.dumps(v)
+	return str(v)
+
+def smoketest_build_request(method, uri, ep):
+	"""
+	Build request of endpoint from examples of DOC.
+	Args:
+	  method, uri: The endpoint
+	  ep:          The endpoint dictionary
+	Return:
+	  Tuple (url, body, headers)
+	"""
+	hdrs = dict(doc.DOC.get('headers') or {})
+	pathitems = {}
+	query = []
+	form = []
+	body = None
+	for key,p in (ep.get('params') or {}).items():
+		val = _param_value(key, p)
+		if val == None:
+			continue
+		src = p['source']
+		if src == 'path':
+			pathitems[key] = val
+		elif src == 'query':
+			query.append((key, val))
+		elif src == 'header':
+			hdrs[key] = val
+		elif src == 'body':
+			body = val
+			if p.get('content_type'):
+				hdrs['Content-Type'] = p['content_type']
+		elif src == 'form-data':
+			form.append((key, val))
+
+	url = doc.DOC['address'] + uritemplate_get(uri).expand(pathitems)
+	if query:
+		url += "?" + urlencode(query)
+	if form and body == None:
+		body = urlencode(form)
+	return url, body, hdrs if hdrs else None
+
+
+class SmokeTest:
+	"""
+	Smoke test sending one request per endpoint.
+	"""
+	def __init__(self, endpoints=None, workers=SMOKETEST_WORKERS, timeout=10):
+		"""
+		Args:
+		  endpoints: List of (method, uri) (default: all endpoints)
+		  workers:   Max. number of concurrent requests
+		  timeout:   Timeout (sec) of a single request
+		"""
+		if endpoints == None:
+			endpoints = [(m,u) for m,x in doc.DOC['endpoints'].items()
+					for u in x.keys()]
+		# Build requests on the calling thread, endpoints of
+		# lazily loaded apidocs are read here.
+		self.requests = []
+		for method,uri in endpoints:
+			ep = doc.DOC['endpoints'][method][uri]
+			codes = set(str(c) for c in (ep.get('response') or {}))
+			self.requests.append((method, uri, codes,
+				smoketest_build_request(method, uri, ep)))
+		self.workers = max(1, min(workers, len(self.requests)))
+		self.timeout = timeout
+		self.results = []
+		self.lock = threading.Lock()
+		self.next = 0
+		self.running = 0
+		self.active = False
+		self.start = self.end = None
+		self.jobs = []
+		self.pool = None
+
+	def run(self):
+		"""
+		Start test (returns immediately).
+		"""
+		self.start = time.monotonic()
+		self.pool = SessionPool(pool_size=self.workers)
+		self.active = True
+		self.running = self.workers
+		self.jobs = [reqengine_submit(self._worker)
+				for _ in range(self.workers)]
+
+	def stop(self):
+		""" Stop running test """
+		for job in self.jobs:
+			job.cancel()
+		self._finish()
+
+	def wait(self):
+		""" Wait until all requests are done """
+		for job in self.jobs:
+			try:
+				job.result()
+			except Exception:
+				pass
+
+	def is_running(self):
+		return self.active
+
+	def get_results(self, start=0):
+		""" Get results[start:] """
+		with self.lock:
+			return self.results[start:]
+
+	def summary(self):
+		"""
+		Get dictionary {'total', 'done', 'ok', 'undocumented',
+		'errors', 'elapsed'}, ok counts documented responses.
+		"""
+		with self.lock:
+			res = list(self.results)
+		end = self.end if self.end else time.monotonic()
+		return {'total' : len(self.requests), 'done' : len(res),
+			'ok' : len([r for r in res if r['documented']]),
+			'undocumented' : len([r for r in res
+				if r['status'] and not r['documented']]),
+			'errors' : len([r for r in res if r['error']]),
+			'elapsed' : end - self.start if self.start else 0.0}
+
+	def _finish(self):
+		with self.lock:
+			active = self.active
+			self.active = False
+		if active:
+			self.end = time.monotonic()
+			self.pool.close()
+
+	def _take(self):
+		with self.lock:
+			if self.next >= len(self.requests):
+				return None
+			self.next += 1
+			return self.requests[self.next-1]
+
+	def _worker(self, job):
+		try:
+			while not job.is_cancelled():
+				req = self._take()
+				if req == None:
+					break
+				res = self._send(*req)
+				with self.lock:
+					self.results.append(res)
+		finally:
+			with self.lock:
+				self.running -= 1
+				last = self.running == 0
+			if last:
+				self._finish()
+
+	def _send(self, method, uri, codes, req):
+		url,body,hdrs = req
+		res = {'method':method, 'uri':uri, 'url':url, 'status':None,
+			'latency':0.0, 'documented':False, 'error':None,
+			'timing':{}}
+		t = time.monotonic()
+		try:
+			resp = self.pool.request(method, url, data=body,
+					headers=hdrs, timeout=self.timeout,
+					stream=True)
+			t1 = time.monotonic()
+			try:
+				resp.content
+			finally:
+				resp.close()
+			resp.timing['transfer'] = time.monotonic() - t1
+			res['timing'] = resp.timing
+			res['status'] = resp.status_code
+			res['documented'] = str(resp.status_code) in codes
+		except requests.exceptions.RequestException as e:
+			res['error'] = type(e).__name__ + ": " + str(e)
+		res['latency'] = time.monotonic() - t
+		return res
+
+
+def smoketest_format(res):
+	"""
+	Get result as string.
+	"""
+	if res['error']:
+		state = "ERR"
+	else:	state = str(res['status']) + ("" if res['documented'] else "?")
+	s = "{:<5} {:>8.3f}  {} {}".format(state, res['latency'],
+			res['method'], res['uri'])
+	if res['timing']:
+		s += "  (" + " ".join("{} {:.1f}ms".format(p, 1000*v)
+			for p,v in res['timing'].items() if v) + ")"
+	if res['error']:
+		s += "\n      " + res['error']
+	return s
+
+def smoketest_print(test):
+	"""
+	Print results and summary of finished test.
+	"""
+	for r in sorted(test.get_results(), key=lambda r: (r['uri'], r['method'])):
+		print(smoketest_format(r))
+	s = test.summary()
+	print("{} endpoints in {:.2f} sec: {} ok, {} undocumented status, "
+		"{} error(s)".format(s['total'], s['elapsed'], s['ok'],
+			s['undocumented'], s['errors']))
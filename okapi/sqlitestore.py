@@ -0,0 +1,308 @@
+import os
+import json
+import sqlite3
+
+from journal import journal_load
+from journal import journal_write_full
+from schema import schema_json_default
+
+"""
+SQLite storage backend for (very large) apidocs.
+
+Instead of one json blob, the apidoc is stored at <name>.db with one
+row per endpoint, parameter, response and model, so changing a single
+endpoint only rewrites the rows of this endpoint.
+
+Tables:
+  doc       (key, pos, value)			Top level keys (name, info, ...)
+  endpoints (method, uri, summary, value)	Endpoint without params/response
+  params    (method, uri, pos, key, value)	Endpoint parameters
+  responses (method, uri, pos, code, value)	Endpoint responses
+  models    (name, value)			Models
+
+All values are json encoded. 'pos' keeps the order of keys.
+"""
+
+SQLITE_SCHEMA_VERSION = 1
+
+def _dumps(value):
+	return json.dumps(value, default=schema_json_default)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS doc (
+	key TEXT PRIMARY KEY, pos INTEGER, value TEXT);
+CREATE TABLE IF NOT EXISTS endpoints (
+	method TEXT, uri TEXT, summary TEXT, value TEXT,
+	PRIMARY KEY (method, uri));
+CREATE TABLE IF NOT EXISTS params (
+	method TEXT, uri TEXT, pos INTEGER, key TEXT, value TEXT);
+CREATE INDEX IF NOT EXISTS params_endpoint ON params (method, uri);
+CREATE TABLE IF NOT EXISTS responses (
+	method TEXT, uri TEXT, pos INTEGER, code TEXT, value TEXT);
+CREATE INDEX IF NOT EXISTS responses_endpoint ON responses (method, uri);
+CREATE TABLE IF NOT EXISTS models (
+	name TEXT PRIMARY KEY, value TEXT);
+"""
+
+def _connect(dbpath, check_same_thread=True):
+	# Open database and create tables if not exist.
+	con = sqlite3.connect(dbpath, check_same_thread=check_same_thread)
+	con.executescript(_SCHEMA)
+	con.execute("PRAGMA user_version = {}".format(SQLITE_SCHEMA_VERSION))
+	return con
+
+def _insert_endpoint(con, method, uri, ep):
+	# Insert rows of a single endpoint. An existing endpoint row is
+	# updated in place to keep its rowid (and so the endpoint order).
+	rest = {k:v for k,v in ep.items() if k not in ('params', 'response')}
+	con.execute("INSERT INTO endpoints VALUES (?,?,?,?) "
+		"ON CONFLICT (method, uri) DO UPDATE SET "
+		"summary=excluded.summary, value=excluded.value",
+		(method, uri, ep.get('summary', ''), _dumps(rest)))
+	con.executemany("INSERT INTO params VALUES (?,?,?,?,?)",
+		[(method, uri, i, k, _dumps(p))
+		 for i,(k,p) in enumerate(ep.get('params', {}).items())])
+	con.executemany("INSERT INTO responses VALUES (?,?,?,?,?)",
+		[(method, uri, i, c, _dumps(r))
+		 for i,(c,r) in enumerate(ep.get('response', {}).items())])
+
+def _delete_endpoints(con, method, uri=None, keep_row=False):
+	# Delete rows of one endpoint or of all endpoints with
+	# given method. With keep_row=True, the endpoints row is
+	# kept (see _insert_endpoint).
+	where = "method=?" if uri == None else "method=? AND uri=?"
+	args = (method,) if uri == None else (method, uri)
+	tables = ('params', 'responses') if keep_row else \
+		('endpoints', 'params', 'responses')
+	for table in tables:
+		con.execute("DELETE FROM " + table + " WHERE " + where, args)
+
+def _write_doc_key(con, doc, key):
+	# Insert/delete single top level key.
+	if key in doc:
+		pos = list(doc.keys()).index(key)
+		con.execute("INSERT INTO doc VALUES (?,?,?) ON CONFLICT (key) "
+			"DO UPDATE SET pos=excluded.pos, value=excluded.value",
+			(key, pos, _dumps(doc[key])))
+	else:	con.execute("DELETE FROM doc WHERE key=?", (key,))
+
+def _write_model(con, doc, name):
+	# Insert/delete single model.
+	if name in doc['models']:
+		con.execute("INSERT INTO models VALUES (?,?) ON CONFLICT (name) "
+			"DO UPDATE SET value=excluded.value",
+			(name, _dumps(doc['models'][name])))
+	else:	con.execute("DELETE FROM models WHERE name=?", (name,))
+
+def _write_all_endpoints(con, doc):
+	con.execute("DELETE FROM endpoints")
+	con.execute("DELETE FROM params")
+	con.execute("DELETE FROM responses")
+	for method,x in doc['endpoints'].items():
+		for uri,ep in x.items():
+			_insert_endpoint(con, method, uri, ep)
+
+def _write_all_models(con, doc):
+	con.execute("DELETE FROM models")
+	for name in doc['models'].keys():
+		_write_model(con, doc, name)
+
+
+def sqlite_store_save(dbpath, doc):
+	"""
+	Write whole apidoc to database.
+	"""
+	con = _connect(dbpath)
+	with con:
+		con.execute("DELETE FROM doc")
+		for key in doc.keys():
+			if key not in ('endpoints', 'models'):
+				_write_doc_key(con, doc, key)
+		_write_all_models(con, doc)
+		_write_all_endpoints(con, doc)
+	con.close()
+
+def sqlite_store_save_sections(dbpath, doc, sections):
+	"""
+	Write changed sections of apidoc to database.
+	Args:
+	  dbpath:   Path to database
+	  doc:      Apidoc dictionary
+	  sections: Changed sections (see DOC.DOC_dirty)
+	"""
+	con = _connect(dbpath)
+	with con:
+		for sec in sections:
+			if sec[0] == 'doc':
+				_write_doc_key(con, doc, sec[1])
+			elif sec[0] == 'endpoints':
+				_write_all_endpoints(con, doc)
+			elif sec[0] == 'models':
+				_write_all_models(con, doc)
+			elif sec[0] == 'model':
+				_write_model(con, doc, sec[1])
+			elif sec[0] == 'method':
+				_delete_endpoints(con, sec[1])
+				for uri,ep in doc['endpoints'].get(sec[1], {}).items():
+					_insert_endpoint(con, sec[1], uri, ep)
+
+		# Endpoints not already written with their method
+		for sec in sections:
+			if sec[0] == 'endpoint' and ('endpoints',) not in sections \
+					and ('method', sec[1]) not in sections:
+				x = doc['endpoints'].get(sec[1], {})
+				_delete_endpoints(con, sec[1], sec[2], sec[2] in x)
+				if sec[2] in x:
+					_insert_endpoint(con, sec[1], sec[2], x[sec[2]])
+	con.close()
+
+def _load_head(con, dict_type):
+	# Load top level keys and models.
+	def loads(s):
+		return json.loads(s, object_hook=dict_type)
+
+	doc = dict_type()
+	for key,value in con.execute("SELECT key,value FROM doc ORDER BY pos"):
+		doc[key] = loads(value)
+
+	doc['models'] = dict_type()
+	for name,value in con.execute("SELECT name,value FROM models ORDER BY rowid"):
+		doc['models'][name] = loads(value)
+	return doc
+
+def sqlite_store_load(dbpath, dict_type=dict):
+	"""
+	Load apidoc from database.
+	Args:
+	  dbpath:    Path to database
+	  dict_type: Type of created dictionaries
+	Return:
+	  Apidoc dictionary
+	"""
+	if not os.path.isfile(dbpath):
+		raise FileNotFoundError("No such file: " + dbpath)
+
+	def loads(s):
+		return json.loads(s, object_hook=dict_type)
+
+	con = _connect(dbpath)
+	doc = _load_head(con, dict_type)
+
+	eps = dict_type()
+	for method,uri,value in con.execute(
+			"SELECT method,uri,value FROM endpoints ORDER BY rowid"):
+		if method not in eps:
+			eps[method] = dict_type()
+		ep = loads(value)
+		ep['params'] = dict_type()
+		ep['response'] = dict_type()
+		eps[method][uri] = ep
+
+	for method,uri,key,value in con.execute(
+			"SELECT method,uri,key,value FROM params ORDER BY pos"):
+		eps[method][uri]['params'][key] = loads(value)
+	for method,uri,code,value in con.execute(
+			"SELECT method,uri,code,value FROM responses ORDER BY pos"):
+		eps[method][uri]['response'][code] = loads(value)
+	doc['endpoints'] = eps
+	con.close()
+	return doc
+
+def sqlite_store_info(dbpath):
+	"""
+	Get name, version and number of endpoints/models of the
+	apidoc stored in given database (without loading it).
+	"""
+	con = _connect(dbpath)
+	info = {'name':'', 'version':''}
+	for key,value in con.execute(
+			"SELECT key,value FROM doc WHERE key IN ('name','version')"):
+		info[key] = json.loads(value)
+	info['n_endpoints'] = con.execute("SELECT COUNT(*) FROM endpoints").fetchone()[0]
+	info['n_models'] = con.execute("SELECT COUNT(*) FROM models").fetchone()[0]
+	con.close()
+	return info
+
+def sqlite_import_json(jsonpath, dbpath):
+	"""
+	Import apidoc json file (and its journal) into database.
+	"""
+	sqlite_store_save(dbpath, journal_load(jsonpath))
+
+def sqlite_export_json(dbpath, jsonpath):
+	"""
+	Export apidoc from database to json file.
+	"""
+	journal_write_full(jsonpath, sqlite_store_load(dbpath))
+
+
+class SqliteSource:
+	"""
+	Source for lazy loading an apidoc from database (see DOC_load).
+	Endpoints are read one by one when accessed.
+	"""
+	def __init__(self, dbpath):
+		if not os.path.isfile(dbpath):
+			raise FileNotFoundError("No such file: " + dbpath)
+		self.con = _connect(dbpath, False)
+
+	def __del__(self):
+		self.close()
+
+	def close(self):
+		""" Close database """
+		if getattr(self, 'con', None):
+			self.con.close()
+			self.con = None
+
+	def load_head(self, dict_type=dict):
+		"""
+		Load all top level values except the endpoints.
+		"""
+		return _load_head(self.con, dict_type)
+
+	def get_endpoint_keys(self):
+		"""
+		Get dictionary {<METHOD> : [<URI>, ...], ...}
+		"""
+		keys = {}
+		for method,uri in self.con.execute(
+				"SELECT method,uri FROM endpoints ORDER BY rowid"):
+			keys.setdefault(method, []).append(uri)
+		return keys
+
+	def get_endpoint(self, method, uri, dict_type=dict):
+		"""
+		Read single endpoint from database.
+		"""
+		def loads(s):
+			return json.loads(s, object_hook=dict_type)
+
+		args = (method, uri)
+		row = self.con.execute("SELECT value FROM endpoints "
+			"WHERE method=? AND uri=?", args).fetchone()
+		if not row:
+			raise KeyError(uri)
+		ep = loads(row[0])
+		ep['params'] = dict_type()
+		ep['response'] = dict_type()
+		for key,value in self.con.execute("SELECT key,value FROM params "
+				"WHERE method=? AND uri=? ORDER BY pos", args):
+			ep['params'][key] = loads(value)
+		for code,value in self.con.execute("SELECT code,value FROM responses "
+				"WHERE method=? AND uri=? ORDER BY pos", args):
+			ep['response'][code] = loads(value)
+		return ep
+
+	def get_endpoint_size(self, method, uri):
+		"""
+		Get size of endpoint in database (bytes of its values).
+		"""
+		args = (method, uri)
+		return self.con.execute("SELECT "
+			"(SELECT COALESCE(SUM(LENGTH(value)), 0) FROM endpoints "
+			"WHERE method=? AND uri=?) + "
+			"(SELECT COALESCE(SUM(LENGTH(value)), 0) FROM params "
+			"WHERE method=? AND uri=?) + "
+			"(SELECT COALESCE(SUM(LENGTH(value)), 0) FROM responses "
+			"WHERE method=? AND uri=?)", args*3).fetchone()[0]
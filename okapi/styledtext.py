@@ -0,0 +1,127 @@
+import re
+from bisect import bisect_right
+
+"""
+Text with tag ranges built in python (e.g. in a worker thread) and
+inserted into a text area at once.
+"""
+
+_NEWLINE = re.compile("\n")
+
+
+class StyledText:
+	"""
+	Text with tag ranges built in python, inserted into a
+	ScrollTextFrame with a single insert and one tag_add per tag
+	(instead of one Tk call per token).
+	Example:
+		st = StyledText()
+		st.add('"key"', 'json_key')
+		st.add(' : 1\n')
+		st.insert(text)
+	"""
+	# Max. number of ranges per tag_add call
+	RANGES_PER_CALL = 4096
+
+	def __init__(self):
+		self.parts = []
+		self.ranges = {}	# {tag:[start, end, ...]} char offsets
+		self.pos = 0		# Length of the text
+
+	def add(self, s, tag=None):
+		""" Append string s with (optional) tag """
+		start = self.pos
+		self.pos += len(s)
+		self.parts.append(s)
+		if tag and s:
+			r = self.ranges.get(tag)
+			if r == None:
+				r = self.ranges[tag] = []
+			r.append(start)
+			r.append(self.pos)
+
+	def get_text(self):
+		return "".join(self.parts)
+
+	def split(self, size):
+		"""
+		Split into pieces of max. size characters, cut after
+		line breaks where possible.
+		Return:
+		  List of StyledText
+		"""
+		text = self.get_text()
+		n = len(text)
+		starts = []
+		start = 0
+		while start < n:
+			starts.append(start)
+			end = start + size
+			if end < n:
+				nl = text.rfind("\n", start, end)
+				if nl >= start:
+					end = nl + 1
+			start = end
+		if len(starts) <= 1:
+			return [self] if n else []
+		pieces = []
+		for i,start in enumerate(starts):
+			p = StyledText()
+			p.pos = (starts[i+1] if i+1 < len(starts) else n) - start
+			p.parts.append(text[start:start+p.pos])
+			pieces.append(p)
+		for tag,offs in self.ranges.items():
+			for j in range(0, len(offs), 2):
+				a,b = offs[j],offs[j+1]
+				i = bisect_right(starts, a) - 1
+				while a < b:
+					start = starts[i]
+					end = min(b, start + pieces[i].pos)
+					r = pieces[i].ranges.setdefault(tag, [])
+					r.append(a - start)
+					r.append(end - start)
+					a = end
+					i += 1
+		return pieces
+
+	def get_indices(self, text=None, line=1, col=0):
+		"""
+		Get ranges as Tk indices ('line.col') for the text
+		inserted at given position.
+		Return:
+		  Dictionary {tag:[index, ...]}
+		"""
+		if text == None:
+			text = self.get_text()
+		starts = [0]
+		starts.extend(m.end() for m in _NEWLINE.finditer(text))
+		res = {}
+		for tag,offs in self.ranges.items():
+			idx = []
+			for off in offs:
+				l = bisect_right(starts, off) - 1
+				c = off - starts[l]
+				idx.append("{}.{}".format(line + l, col + c if l == 0 else c))
+			res[tag] = idx
+		return res
+
+	def insert(self, text):
+		"""
+		Append to the end of given ScrollTextFrame.
+		"""
+		t = text.text
+		line,col = map(int, t.index("end-1c").split("."))
+		s = self.get_text()
+		text.enable()
+		t.insert("end", s)
+		self.add_tags(t, s, line, col)
+		text.disable()
+
+	def add_tags(self, t, text=None, line=1, col=0):
+		"""
+		Add tags to text already in tk.Text t, at given position.
+		"""
+		n = 2 * self.RANGES_PER_CALL
+		for tag,idx in self.get_indices(text, line, col).items():
+			for i in range(0, len(idx), n):
+				t.tag_add(tag, *idx[i:i+n])
@@ -0,0 +1,192 @@
+import re
+from array import array
+from bisect import bisect_right
+
+"""
+Line index of a large styled text, kept in python instead of a text
+widget.
+
+The text is stored in blocks (e.g. the StyledText pieces of a
+formatted body, see bodyformat.py) with their tag ranges as arrays of
+character offsets. The offsets of all line starts are indexed, long
+lines are soft-wrapped into rows of a fixed number of characters
+(monospace font). Looking up the rows of a window is independent of
+the size of the text (bisect over the indices), so a viewer (see
+widgets.VirtualTextFrame) only has to put the visible rows into its
+text widget.
+
+Lines and rows are counted from 0, positions in the text are
+character offsets.
+"""
+
+_NEWLINE = re.compile("\n")
+
+
+class TextIndex:
+	"""
+	Styled text with index of lines and wrapped rows.
+	"""
+	def __init__(self, width=80):
+		"""
+		Args:
+		  width: Characters per row
+		"""
+		self.width = max(1, width)
+		self.clear()
+
+	def clear(self):
+		self.blocks = []		# Text blocks
+		self.block_starts = array('q')	# Offset of each block
+		self.block_tags = []		# {tag:array(start, end, ...)}
+		self.line_starts = array('q', [0])	# Offset of each line
+		self.row_starts = array('q', [0])	# First row of each line
+		self.size = 0			# Number of characters
+
+	def nlines(self):
+		return len(self.line_starts)
+
+	def line_length(self, line):
+		""" Get length of line (without line break) """
+		if line + 1 < len(self.line_starts):
+			return self.line_starts[line+1] - 1 - self.line_starts[line]
+		return self.size - self.line_starts[line]
+
+	def _rows(self, line):
+		# Number of rows of line
+		return max(1, -(-self.line_length(line) // self.width))
+
+	def nrows(self):
+		""" Get number of rows of the whole text """
+		last = len(self.line_starts) - 1
+		return self.row_starts[last] + self._rows(last)
+
+	def append(self, text, ranges=None):
+		"""
+		Append text.
+		Args:
+		  text:   String
+		  ranges: Tags of text {tag:[start, end, ...]} with offsets
+			  relative to text (see StyledText)
+		"""
+		if not text:
+			return
+		base = self.size
+		self.blocks.append(text)
+		self.block_starts.append(base)
+		tags = {}
+		if ranges:
+			for tag,offs in ranges.items():
+				tags[tag] = array('q', (base + off for off in offs))
+		self.block_tags.append(tags)
+		self.size += len(text)
+
+		# Rows of the previous last line are fixed now
+		line = len(self.line_starts) - 1
+		w = self.width
+		for m in _NEWLINE.finditer(text):
+			n = base + m.start() - self.line_starts[line]
+			self.row_starts.append(self.row_starts[line] + max(1, -(-n // w)))
+			self.line_starts.append(base + m.end())
+			line += 1
+
+	def append_styled(self, styled):
+		""" Append StyledText (see styledtext.py) """
+		self.append(styled.get_text(), styled.ranges)
+
+	def set_width(self, width):
+		"""
+		Set characters per row, all rows are wrapped again.
+		"""
+		width = max(1, width)
+		if width == self.width:
+			return
+		self.width = width
+		rows = array('q', [0])
+		n = 0
+		starts = self.line_starts
+		for i in range(1, len(starts)):
+			n += max(1, -(-(starts[i] - 1 - starts[i-1]) // width))
+			rows.append(n)
+		self.row_starts = rows
+
+	def row_to_line(self, row):
+		"""
+		Get line and its first row of given row.
+		"""
+		line = bisect_right(self.row_starts, row) - 1
+		return line,self.row_starts[line]
+
+	def line_to_row(self, line):
+		""" Get first row of given line """
+		return self.row_starts[line]
+
+	def get_range(self, start, end):
+		"""
+		Get text between offsets start and end.
+		"""
+		if start >= end:
+			return ""
+		i = bisect_right(self.block_starts, start) - 1
+		res = []
+		while i < len(self.blocks) and self.block_starts[i] < end:
+			b = self.block_starts[i]
+			res.append(self.blocks[i][max(0, start-b):end-b])
+			i += 1
+		return "".join(res)
+
+	def get_text(self):
+		return "".join(self.blocks)
+
+	def get_rows(self, first, last):
+		"""
+		Get rows first .. last-1.
+		Return:
+		  List of (offset, text) of the rows
+		"""
+		res = []
+		if first >= last:
+			return res
+		line,row = self.row_to_line(first)
+		k = first - row		# Row within line
+		w = self.width
+		n = len(self.line_starts)
+		rows = []
+		while len(rows) < last - first and line < n:
+			start = self.line_starts[line]
+			length = self.line_length(line)
+			rows.append((start + k*w, start + min(length, (k+1)*w)))
+			k += 1
+			if k*w >= length:
+				line += 1
+				k = 0
+		if not rows:
+			return res
+		text = self.get_range(rows[0][0], rows[-1][1])
+		base = rows[0][0]
+		for start,end in rows:
+			res.append((start, text[start-base:end-base]))
+		return res
+
+	def get_tags(self, start, end):
+		"""
+		Get tag ranges overlapping offsets start .. end.
+		Return:
+		  Dictionary {tag:[(start, end), ...]}
+		"""
+		res = {}
+		if start >= end:
+			return res
+		i = max(0, bisect_right(self.block_starts, start) - 1)
+		while i < len(self.blocks) and self.block_starts[i] < end:
+			for tag,offs in self.block_tags[i].items():
+				j = bisect_right(offs, start)
+				j = j - 1 if j % 2 else j
+				r = None
+				while j < len(offs) and offs[j] < end:
+					if offs[j+1] > start:
+						if r == None:
+							r = res.setdefault(tag, [])
+						r.append((offs[j], offs[j+1]))
+					j += 2
+			i += 1
+		return res
@@ -0,0 +1,113 @@
+import time
+import threading
+
+"""
+Dispatch of widget updates from worker threads to the Tk thread.
+
+Tk isn't thread-safe, so workers must not call widget methods. Instead
+they post functions with uidispatch_post(func, *args), which are
+called on the Tk thread by a loop started with uidispatch_attach(root).
+The loop runs once per frame (UIDISPATCH_FRAME_MS) and calls the
+posted functions in order.
+
+Updates posted with a key are coalesced: if updates with the same key
+are posted within a frame (e.g. the progress of a download), only the
+last one is called, at the position of the first. A burst of updates
+therefore costs at most one redraw per frame. Calls exceeding the
+time budget of a frame are left for the next frame.
+"""
+
+# Interval (ms) of calling posted updates
+UIDISPATCH_FRAME_MS = 16
+
+# Max. time (ms) spent calling updates per frame
+UIDISPATCH_BUDGET_MS = 12
+
+
+class UiDispatcher:
+	"""
+	Queue of updates for the Tk thread.
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.items = []		# [[func, args, skip_if, key], ...]
+		self.keyed = {}		# {key:item} of queued items with key
+
+	def post(self, func, *args, key=None, skip_if=None):
+		"""
+		Queue call func(*args), may be called on any thread.
+		Args:
+		  key:     Replace queued update with the same key
+		  skip_if: Function, the call is skipped if it returns
+			   True (e.g. job.is_cancelled)
+		"""
+		with self.lock:
+			if key != None:
+				item = self.keyed.get(key)
+				if item:
+					item[0],item[1],item[2] = func,args,skip_if
+					return
+			item = [func, args, skip_if, key]
+			self.items.append(item)
+			if key != None:
+				self.keyed[key] = item
+
+	def drain(self, budget=None):
+		"""
+		Call queued updates, must be called on the Tk thread.
+		Args:
+		  budget: Max. seconds, remaining updates stay queued
+		"""
+		with self.lock:
+			items = self.items
+			self.items = []
+			self.keyed = {}
+		start = time.monotonic()
+		for i,(func,args,skip_if,key) in enumerate(items):
+			if budget and time.monotonic() - start > budget:
+				self._requeue(items[i:])
+				return
+			if skip_if and skip_if():
+				continue
+			try:
+				func(*args)
+			except Exception as e:
+				print("! Failed to update ui")
+				print("  " + str(e))
+
+	def _requeue(self, rest):
+		# Put updates back in front of the queue, newer updates
+		# with the same key replace them.
+		with self.lock:
+			for item in rest:
+				newer = self.keyed.get(item[3]) if item[3] != None else None
+				if newer:
+					item[0],item[1],item[2] = newer[0],newer[1],newer[2]
+					self.items = [x for x in self.items if x is not newer]
+				if item[3] != None:
+					self.keyed[item[3]] = item
+			self.items = rest + self.items
+
+
+_dispatcher = UiDispatcher()
+
+def uidispatch_post(func, *args, key=None, skip_if=None):
+	"""
+	Call func(*args) on the Tk thread (see UiDispatcher.post).
+	"""
+	_dispatcher.post(func, *args, key=key, skip_if=skip_if)
+
+def uidispatch_drain():
+	"""
+	Call all queued updates (on the Tk thread).
+	"""
+	_dispatcher.drain()
+
+def uidispatch_attach(root):
+	"""
+	Call posted updates on the Tk thread of root (tk.Tk).
+	"""
+	def run():
+		_dispatcher.drain(UIDISPATCH_BUDGET_MS / 1000)
+		root.after(UIDISPATCH_FRAME_MS, run)
+	root.after(UIDISPATCH_FRAME_MS, run)
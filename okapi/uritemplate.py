@@ -0,0 +1,66 @@
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+"""
+Compiled endpoint URI templates.
+
+A template like '/users/{userId}/orders' is split once into its
+literal parts and path items, so filling in the path items doesn't
+need to build and compile a regex for every item and every value.
+Use uritemplate_get() to get the (cached) template of an URI.
+"""
+
+_reg_item = re.compile(r"\{(\w+)\}")
+
+class UriTemplate:
+	"""
+	Endpoint URI with path items.
+	"""
+	__slots__ = ('uri', 'parts', 'items')
+
+	def __init__(self, uri):
+		self.uri = uri
+		# Literals at even, path item names at odd indices,
+		# e.g. ['/users/', 'userId', '/orders']
+		self.parts = _reg_item.split(uri)
+		self.items = tuple(self.parts[1::2])
+
+	def __repr__(self):
+		return "UriTemplate(" + repr(self.uri) + ")"
+
+	def expand(self, values, encode=True):
+		"""
+		Replace path items with given values.
+		Args:
+		  values: Dictionary {pathitem:value}, path items
+			  without value are kept as '{pathitem}'.
+		  encode: Percent-encode values?
+		Return:
+		  Expanded uri (e.g. '/users/123/orders')
+		"""
+		res = []
+		for i,p in enumerate(self.parts):
+			if not i % 2:
+				res.append(p)
+			elif p in values:
+				v = str(values[p])
+				res.append(quote(v, safe='') if encode else v)
+			else:	res.append("{" + p + "}")
+		return "".join(res)
+
+	def segments(self):
+		"""
+		Get path segments, each one split into literals (even
+		indices) and path items (odd indices) like self.parts.
+		Example: '/files/{name}.json' returns
+		  [['files'], ['', 'name', '.json']]
+		"""
+		return [_reg_item.split(s) for s in self.uri.split("/") if s]
+
+@lru_cache(maxsize=4096)
+def uritemplate_get(uri):
+	"""
+	Get (cached) UriTemplate for given uri.
+	"""
+	return UriTemplate(uri)
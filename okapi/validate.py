@@ -0,0 +1,198 @@
+import re
+import DOC as doc
+
+"""
+Validation of a whole apidoc.
+
+validate_doc() checks the apidoc in a single pass and returns a list
+of diagnostics:
+[
+  {
+    'level' : <str>,		# 'error' or 'warning'
+    'path' : [<KEY>, ...],	# Path of the object, e.g. ['endpoints', 'GET', '/users']
+    'msg' : <str>		# Description
+  },
+  ...
+]
+If only some sections of the apidoc changed (see DOC_dirty), only
+these sections are checked. Sections referencing a deleted model are
+looked up in the reference index of DOC (see DOC_model_referrers).
+"""
+
+HTTP_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS')
+
+DATATYPES = frozenset(doc.PARAMETER_DATATYPES + ['boolean', 'bool', 'decimal'])
+
+_reg_item = re.compile(r"\{(\w+)\}")
+
+
+class _Validator:
+	def __init__(self, d):
+		self.doc = d
+		self.models = d.get('models', {})
+		self.diags = []
+
+	def add(self, level, path, msg):
+		self.diags.append({'level':level, 'path':path, 'msg':msg})
+
+	def is_type(self, typ):
+		return typ in DATATYPES or typ in self.models
+
+	def check_head(self, key=None):
+		# Check top level values (all or the given one).
+		for k,level in (('name','error'), ('version','warning'),
+				('address','warning')):
+			if (key == None or key == k) and not self.doc.get(k):
+				self.add(level, [k], "Missing api " + k)
+
+	def check_model(self, name):
+		path = ['models', name]
+		model = self.models[name]
+		if not doc.is_valid_model_name(name):
+			self.add('error', path, "Invalid model name")
+		if 'attributes' not in model:
+			self.add('error', path, "Missing attributes")
+			return
+		for key,attr in model['attributes'].items():
+			if not doc.is_valid_parameter_key(key):
+				self.add('warning', path + [key], "Invalid attribute name")
+			typ = attr.get('type')
+			if not typ:
+				self.add('error', path + [key], "Missing type")
+			elif not self.is_type(typ):
+				self.add('error', path + [key], "Unknown type '"+typ+"'")
+
+	def check_endpoint(self, method, uri, ep):
+		path = ['endpoints', method, uri]
+		if method not in HTTP_METHODS:
+			self.add('error', path, "Unknown HTTP method")
+		if not doc.is_valid_URI(uri, allow_placeholders=True):
+			self.add('error', path, "Invalid URI")
+		if not ep.get('summary'):
+			self.add('warning', path, "Missing summary")
+
+		items = set(_reg_item.findall(uri))
+		params = ep.get('params') or {}
+		for key,p in params.items():
+			ppath = path + ['params', key]
+			if not doc.is_valid_parameter_key(key):
+				self.add('warning', ppath, "Invalid parameter name")
+			src = p.get('source')
+			if src not in doc.PARAMETER_SOURCES:
+				self.add('error', ppath, "Unknown source '"+str(src)+"'")
+			elif src == 'path' and key not in items:
+				self.add('error', ppath, "Path parameter not in URI")
+			typ = p.get('type')
+			if not typ:
+				self.add('error', ppath, "Missing type")
+			elif not self.is_type(typ):
+				self.add('warning', ppath, "Unknown type '"+typ+"'")
+
+		for item in items:
+			if item not in params or params[item].get('source') != 'path':
+				self.add('error', path, "No path parameter for {"+item+"}")
+
+		resps = ep.get('response') or {}
+		if not resps:
+			self.add('warning', path, "No responses")
+		for code,r in resps.items():
+			rpath = path + ['response', code]
+			if not doc.is_valid_http_code(code):
+				self.add('error', rpath, "Invalid status code")
+			if r.get('model') and r['model'] not in self.models:
+				self.add('error', rpath, "Unknown model '"+r['model']+"'")
+			ctype = r.get('content_type')
+			if ctype and ctype not in doc.RESPONSE_CONTENT_TYPES:
+				self.add('warning', rpath, "Unknown content type '"+ctype+"'")
+
+	def check_method(self, method):
+		for uri,ep in self.doc['endpoints'][method].items():
+			self.check_endpoint(method, uri, ep)
+
+	def check_all(self):
+		self.check_head()
+		for name in self.models.keys():
+			self.check_model(name)
+		for method in self.doc.get('endpoints', {}).keys():
+			self.check_method(method)
+
+	def check_references(self, names, checked=()):
+		# Check endpoints and models referencing the given
+		# (deleted) models, except the sections checked already.
+		refs = set()
+		for name in names:
+			refs |= doc.DOC_model_referrers(name)
+		for sec in sorted(refs):
+			if sec in checked or ('method', sec[1]) in checked:
+				continue
+			if sec[0] == 'model':
+				model = self.models.get(sec[1]) or {}
+				for key,attr in model.get('attributes', {}).items():
+					if attr.get('type') in names:
+						self.add('error', ['models', sec[1], key],
+							"Unknown type '"+attr['type']+"'")
+				continue
+			ep = self.doc['endpoints'].get(sec[1], {}).get(sec[2]) or {}
+			for code,r in (ep.get('response') or {}).items():
+				if r.get('model') in names:
+					self.add('error', ['endpoints', sec[1],
+						sec[2], 'response', code],
+						"Unknown model '"+r['model']+"'")
+
+	def check_sections(self, sections):
+		done = set()
+		deleted = set()
+		for sec in sections:
+			if sec[0] in ('endpoints', 'models'):
+				self.check_all()
+				return
+		for sec in sections:
+			if sec[0] == 'doc':
+				self.check_head(sec[1])
+			elif sec[0] == 'model':
+				if sec[1] in self.models:
+					self.check_model(sec[1])
+				else:	deleted.add(sec[1])
+			elif sec[0] == 'method':
+				if sec[1] in self.doc['endpoints']:
+					self.check_method(sec[1])
+				done.add(sec[1])
+		for sec in sections:
+			if sec[0] == 'endpoint' and sec[1] not in done:
+				x = self.doc['endpoints'].get(sec[1], {})
+				if sec[2] in x:
+					self.check_endpoint(sec[1], sec[2], x[sec[2]])
+		if deleted:
+			self.check_references(deleted, sections)
+
+
+def validate_doc(d=None, sections=None):
+	"""
+	Validate apidoc.
+	Args:
+	  d:        Apidoc dictionary (default: DOC)
+	  sections: Only check these sections of DOC (see
+		    DOC_dirty), None checks the whole apidoc.
+	Return:
+	  List with diagnostics (see above)
+	"""
+	v = _Validator(doc.DOC if d == None else d)
+	if sections == None or v.doc is not doc.DOC:
+		v.check_all()
+	else:	v.check_sections(sections)
+	return v.diags
+
+def validate_format(diag):
+	"""
+	Get diagnostic as string.
+	"""
+	return diag['level'] + ": " + " ".join(diag['path']) + ": " + diag['msg']
+
+def validate_print(diags):
+	"""
+	Print diagnostics and summary.
+	"""
+	for d in diags:
+		print(validate_format(d))
+	nerr = len([d for d in diags if d['level'] == 'error'])
+	print(str(nerr) + " error(s), " + str(len(diags)-nerr) + " warning(s)")
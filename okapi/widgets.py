@@ -1,8 +1,15 @@
 import tkinter as tk
 from tkinter import ttk
+from tkinter import font as tkfont
 from tkinter.constants import *
 
 import pyperclip
+from bisect import bisect_right
+
+from styledtext import StyledText
+from jsonlex import JSONLEX_TAGS
+from jsonlex import jsonlex_highlight
+from textindex import TextIndex
 
 class LeftLabel(tk.Label):
 	'''
@@ -142,6 +149,187 @@ class ScrollTextFrame(tk.Frame):
 
 
 
+class VirtualTextFrame(tk.Frame):
+	"""
+	Read-only text area for large texts.
+	The text is kept in a TextIndex (see textindex.py), the text
+	widget only holds the visible rows and OVERSCAN rows above and
+	below. Long lines are wrapped at the width of the widget.
+	Scrolling doesn't depend on the size of the text.
+	Supports the read-only part of ScrollTextFrame (set_text,
+	add_text, clear_text, get_text, tag_config, ...).
+	"""
+	# Rows put into the text widget above/below the visible ones
+	OVERSCAN = 50
+
+	# Rows scrolled per mouse wheel step
+	WHEEL_ROWS = 3
+
+	def __init__(self, parent, *args, **kwargs):
+		super().__init__(parent)
+		self.index = TextIndex()
+		self.top = 0		# First visible row
+		self.shown = (0, 0)	# Rows in the text widget
+		self.after_id = None
+		self.text = tk.Text(self, wrap=tk.NONE, highlightthickness=0,
+				padx=0, *args, **kwargs)
+		self.text.configure(state=tk.DISABLED)
+		self.font = tkfont.Font(font=self.text['font'])
+
+		self.grid_columnconfigure(0, weight=1)
+		self.grid_rowconfigure(1, weight=1)
+		self.text.grid(row=1, column=0, sticky='nswe')
+		self.yScroll = tk.Scrollbar(self, orient='vertical',
+				command=self._on_yscroll)
+		self.yScroll.grid(row=1, column=1, sticky='ns')
+
+		self.text.bind("<Configure>", self._on_configure)
+		self.text.bind("<MouseWheel>",
+			lambda e: self._scroll(-e.delta//120*self.WHEEL_ROWS))
+		self.text.bind("<Button-4>", lambda e: self._scroll(-self.WHEEL_ROWS))
+		self.text.bind("<Button-5>", lambda e: self._scroll(self.WHEEL_ROWS))
+		self.text.bind("<Prior>", lambda e: self._scroll(-self._visible()))
+		self.text.bind("<Next>", lambda e: self._scroll(self._visible()))
+		self.text.bind("<Up>", lambda e: self._scroll(-1))
+		self.text.bind("<Down>", lambda e: self._scroll(1))
+		self.text.bind("<Control-Home>", lambda e: self._scroll_to(0))
+		self.text.bind("<Control-End>",
+			lambda e: self._scroll_to(self.index.nrows()))
+		PopupMenu(self.text, {'copy all' :
+			lambda: pyperclip.copy(self.get_text())})
+		self.clear_text()
+
+	def configure(self, *args, **kwargs):
+		self.text.configure(*args, **kwargs)
+
+	def bind(self, event, callback, add=None):
+		self.text.bind(event, callback, add=add)
+
+	def tag_config(self, *a, **kw):
+		self.text.tag_config(*a, **kw)
+
+	def enable(self):
+		pass
+	def disable(self):
+		pass
+
+	def clear_text(self):
+		self.index.clear()
+		self.top = 0
+		self._render(True)
+
+	def get_text(self):
+		return self.index.get_text().strip()
+
+	def set_text(self, text):
+		self.clear_text()
+		self.add_text(text)
+
+	def add_text(self, text, tag=None):
+		self._append(text, {tag:[0, len(text)]} if tag else None)
+
+	def append_styled(self, styled):
+		"""
+		Append StyledText (see styledtext.py).
+		"""
+		self._append(styled.get_text(), styled.ranges)
+
+	def _append(self, text, ranges):
+		shown_all = self.shown[1] >= self.index.nrows()
+		self.index.append(text, ranges)
+		if shown_all:
+			# Last row is visible or in overscan
+			self._render(True)
+		else:	self._set_scrollbar()
+
+	def _visible(self):
+		# Number of rows fitting into the text widget
+		h = self.text.winfo_height()
+		return max(1, h // self.font.metrics('linespace'))
+
+	def _on_configure(self, ev=None):
+		# Wrap again when resizing has stopped
+		if self.after_id:
+			self.after_cancel(self.after_id)
+		self.after_id = self.after(100, self._rewrap)
+
+	def _rewrap(self):
+		self.after_id = None
+		w = self.text.winfo_width() - 2*int(self.text['borderwidth'])
+		line,_ = self.index.row_to_line(self.top)
+		self.index.set_width(w // self.font.measure("0"))
+		self.top = self.index.line_to_row(line)
+		self._render(True)
+
+	def _on_yscroll(self, *args):
+		if args[0] == 'moveto':
+			self._scroll_to(int(float(args[1]) * self.index.nrows()))
+		elif args[0] == 'scroll':
+			n = int(args[1])
+			if args[2] == 'pages':
+				n *= self._visible()
+			self._scroll(n)
+
+	def _scroll(self, n):
+		self._scroll_to(self.top + n)
+		return "break"
+
+	def _scroll_to(self, row):
+		self.top = row
+		self._render()
+		return "break"
+
+	def _render(self, force=False):
+		# Put rows around top into the text widget (unless
+		# they are already there) and scroll to top.
+		vis = self._visible()
+		total = self.index.nrows()
+		self.top = max(0, min(self.top, total - vis))
+		first,last = self.shown
+		if force or self.top < first or \
+				(self.top + vis > last and last < total):
+			first = max(0, self.top - self.OVERSCAN)
+			last = min(total, self.top + vis + self.OVERSCAN)
+			self._fill(first, last)
+		self.text.yview("{}.0".format(self.top - first + 1))
+		self._set_scrollbar()
+
+	def _fill(self, first, last):
+		rows = self.index.get_rows(first, last)
+		self.shown = (first, first + len(rows))
+		t = self.text
+		t.configure(state=tk.NORMAL)
+		t.delete("1.0", tk.END)
+		t.insert("1.0", "\n".join(s for _,s in rows))
+		if rows:
+			self._add_tags(rows)
+		t.configure(state=tk.DISABLED)
+
+	def _add_tags(self, rows):
+		# Add tags of the rows
+		starts = [off for off,_ in rows]
+		end = starts[-1] + len(rows[-1][1])
+		for tag,ranges in self.index.get_tags(starts[0], end).items():
+			idx = []
+			for a,b in ranges:
+				i = max(0, bisect_right(starts, a) - 1)
+				while i < len(rows) and starts[i] < b:
+					s = max(a, starts[i]) - starts[i]
+					e = min(b, starts[i] + len(rows[i][1])) - starts[i]
+					if s < e:
+						idx.append("{}.{}".format(i+1, s))
+						idx.append("{}.{}".format(i+1, e))
+					i += 1
+			for i in range(0, len(idx), 2*StyledText.RANGES_PER_CALL):
+				self.text.tag_add(tag, *idx[i:i+2*StyledText.RANGES_PER_CALL])
+
+	def _set_scrollbar(self):
+		total = self.index.nrows()
+		vis = self._visible()
+		self.yScroll.set(self.top / total, min(1.0, (self.top + vis) / total))
+
+
+
 class ButtonLabel(tk.Label):
 	"""
 	Clickable button label.
@@ -513,6 +701,7 @@ class MultiEntry(tk.Frame):
 		self.opts   = options if options else []
 		self.title  = None
 		self.w      = None
+		self.styler = None	# JsonEditStyler
 		self._setup_gui(height, width)
 
 	def set_title(self, titleframe):
@@ -589,6 +778,13 @@ class MultiEntry(tk.Frame):
 		# Popup menu
 		self._setup_popup_menu()
 
+	def highlight_json(self):
+		"""
+		Highlight JSON while typing (style 'text' only).
+		"""
+		if self.style == 'text' and not self.styler:
+			self.styler = JsonEditStyler(self.w)
+
 	def get(self):
 		if self.style == 'text':
 			return self.w.get("1.0", tk.END).strip()
@@ -601,6 +797,8 @@ class MultiEntry(tk.Frame):
 		if self.style == 'text':
 			self.w.delete("1.0", tk.END)
 			self.w.insert(tk.END, value)
+			if self.styler:
+				self.styler.update()
 		elif self.style == 'entry':
 			self.vVal.set(value)
 		elif self.style == 'options':
@@ -623,6 +821,56 @@ class MultiEntry(tk.Frame):
 		PopupMenu(self.w, items)
 
 
+class JsonEditStyler:
+	"""
+	Highlights JSON in an editable tk.Text while typing.
+	The text is lexed again (see jsonlex.py) shortly after the
+	last key press, invalid parts get a red background.
+	Texts not starting with '{' or '[' aren't highlighted.
+	Example:
+		JsonEditStyler(text_frame.text)
+	"""
+	# Delay (ms) after last key press
+	DELAY_MS = 300
+
+	# Max. number of characters highlighted
+	MAX_SIZE = 1024*1024
+
+	COLORS = {
+		'json_key'    : '#7a2e00',
+		'json_string' : '#1a7a1a',
+		'json_int'    : '#c00',
+		'json_bool'   : '#0060b0',
+		'json_none'   : '#0060b0'
+	}
+
+	def __init__(self, text:tk.Text):
+		self.text = text
+		self.after_id = None
+		for tag,fg in self.COLORS.items():
+			text.tag_configure(tag, foreground=fg)
+		text.tag_configure('json_error', background='#ffd0d0')
+		text.bind("<KeyRelease>", self._on_key, add='+')
+
+	def _on_key(self, ev=None):
+		if self.after_id:
+			self.text.after_cancel(self.after_id)
+		self.after_id = self.text.after(self.DELAY_MS, self.update)
+
+	def update(self):
+		"""
+		Highlight current text.
+		"""
+		self.after_id = None
+		t = self.text
+		for tag in JSONLEX_TAGS.values():
+			t.tag_remove(tag, "1.0", tk.END)
+		s = t.get("1.0", "end-1c")
+		if len(s) > self.MAX_SIZE or s.lstrip()[:1] not in ('{', '['):
+			return
+		jsonlex_highlight(s).add_tags(t, s)
+
+
 class LabeledTextFrame(tk.Frame):
 	"""
 	+---------------+
@@ -667,6 +915,8 @@ class TextStyler:
 	"""
 	This class is used to set highlighted JSON/XML
 	in text area.
+	Text and tag ranges are built with StyledText and
+	inserted at once.
 	Example:
 		text = ScrollTextFrame(self, ...)
 		TextStyler(text).set_json(json_dict)
@@ -677,6 +927,7 @@ class TextStyler:
 		self.text_fg = text.text['fg']
 		self.text_bg = text.text['bg']
 		self.colors = {}
+		self.out = None		# StyledText being built
 
 		self.set_colors({
 			'key'         : '#e65c00',
@@ -686,38 +937,51 @@ class TextStyler:
 			'json_int'    : '#ff3333',
 			'json_bool'   : '#0099ff',
 			'json_none'   : '#0066cc',
+			'json_error'  : '#ff8080',
 			'xml_tag'     : '#0099ff',
-			'xml_values'  : '#e6ffff',
+			'xml_value'   : '#e6ffff',
+			'xml_attr'    : '#e6b800',
+			'xml_attr_value' : '#5cd65c',
+			'xml_comment' : '#8c8c8c',
+			'xml_error'   : '#ff8080',
 			'xml_header'  : '#d00'
 		})
 
-	# Set JSON
+	# Set JSON (dictionary or list)
 	def set_json(self, dct, is_array=False, clear_before=True):
-		if clear_before: self.text.clear_text()
+		self.out = StyledText()
 		if is_array:
-			self.text.add_text("[\n")
+			self.out.add("[\n")
 			self._add_json_dict(dct, 4)
-			self.add_text("]\n")
+			self.out.add("]\n")
+		elif type(dct) == list:
+			self._add_json_list(dct, 0, 2, 0)
 		else:	self._add_json_dict(dct, 2)
-		self._auto_adjust_text_height()
+		self._flush(clear_before)
 
 	# Set XML
 	def set_xml(self, name, dct,
 			hdr='<?xml version="1.0" encoding="UTF-8"?>',
 			clear_before=True):
-		if clear_before: self.text.clear_text()
-		self.text.add_text(hdr + "\n", 'xml_header')
+		self.out = StyledText()
+		self.out.add(hdr + "\n", 'xml_header')
 		self._add_xml_dict(name, dct)
-		self._auto_adjust_text_height()
+		self._flush(clear_before)
 
 	# Set colored dictionary as key-value pairs
 	def set_dict(self, dct, clear_before=True):
-		if clear_before: self.text.clear_text()
+		self.out = StyledText()
 		for k,v in dct.items():
-			self.text.add_text(k, 'key')
-			self.text.add_text(': ')
-			self.text.add_text(v, 'value')
-			self.text.add_text('\n')
+			self.out.add(k, 'key')
+			self.out.add(': ')
+			self.out.add(str(v), 'value')
+			self.out.add('\n')
+		self._flush(clear_before, False)
+
+	# Set text built with StyledText
+	def set_styled(self, styled, clear_before=True):
+		self.out = styled
+		self._flush(clear_before)
 
 	# Set tag colors
 	def set_colors(self, color_dict):
@@ -734,17 +998,24 @@ class TextStyler:
 			self.text.tag_config(k, foreground=fg)
 
 
+	def _flush(self, clear_before, adjust=True):
+		# Insert built text into the text area
+		if clear_before: self.text.clear_text()
+		self.out.insert(self.text)
+		self.out = None
+		if adjust:
+			self._auto_adjust_text_height()
+
 	def _auto_adjust_text_height(self):
 		if self.adjust_text_height:
 			self.text.adjust_height()
 
 	def _add_indented(self, s, indent, nl=False, tag=None):
 		end = "\n" if nl else ""
-		self.text.add_text(" "*indent + s + end, tag)
+		self.out.add(" "*indent + s + end, tag)
 
 	def _add_lineend(self, comma=False):
-		if comma: self.text.add_text(",")
-		self.text.add_text("\n")
+		self.out.add(",\n" if comma else "\n")
 
 	#
 	# JSON printing
@@ -752,13 +1023,13 @@ class TextStyler:
 	def _add_json_value(self, val, indent=0, comma=False):
 		self._add_indented("", indent)
 		if type(val) == str:
-			self.text.add_text('"{}"'.format(val), 'json_string')
-		elif type(val) in (int,float):
-			self.text.add_text("{}".format(val), 'json_int')
+			self.out.add('"{}"'.format(val), 'json_string')
 		elif type(val) == bool:
-			self.text.add_text("{}".format('true' if val else 'false'), 'json_bool')
+			self.out.add('true' if val else 'false', 'json_bool')
+		elif type(val) in (int,float):
+			self.out.add("{}".format(val), 'json_int')
 		elif val == None:
-			self.text.add_text("null", 'json_none')
+			self.out.add("null", 'json_none')
 
 		self._add_lineend(comma)
 
@@ -786,8 +1057,8 @@ class TextStyler:
 			k = kv[0]; v = kv[1]
 			not_last = True if i<len(d)-1 else False
 			self._add_indented("", indent)
-			self.text.add_text('"{}"'.format(k), 'json_key')
-			self.text.add_text(' : ')
+			self.out.add('"{}"'.format(k), 'json_key')
+			self.out.add(' : ')
 			if type(v) == list:
 				self._add_json_list(v, 0, indent+2, indent, not_last)
 			elif type(v) == dict:
@@ -802,9 +1073,9 @@ class TextStyler:
 	#
 	def _add_xml_value(self, key, v, indent):
 		self._add_indented("", indent)
-		self.text.add_text("<" + key + ">", 'xml_tag')
-		self.text.add_text(v, 'xml_value')
-		self.text.add_text("</" + key + ">\n", 'xml_tag')
+		self.out.add("<" + key + ">", 'xml_tag')
+		self.out.add(str(v), 'xml_value')
+		self.out.add("</" + key + ">\n", 'xml_tag')
 
 	def _add_xml_list(self, key, d, indent):
 		self._add_indented("<"+key+">", indent, True, 'xml_tag')
@@ -0,0 +1,240 @@
+import codecs
+from xml.etree.ElementTree import XMLPullParser
+from xml.etree.ElementTree import XMLParser
+from xml.etree.ElementTree import TreeBuilder
+from xml.etree.ElementTree import ParseError
+from xml.sax.saxutils import escape
+
+from styledtext import StyledText
+
+"""
+Streaming XML pretty printer.
+
+XmlHighlighter parses XML while it arrives, chunk by chunk, with an
+incremental parser (xml.etree.ElementTree.XMLPullParser) and appends
+the elements indented and highlighted to a StyledText (see
+styledtext.py), with the tags of TextStyler:
+  xml_header, xml_tag, xml_attr, xml_attr_value, xml_value,
+  xml_comment, xml_error
+Elements are written when their start/end is parsed and dropped from
+the tree right after, so memory doesn't grow with the size of the
+document (only with its depth and the size of single text nodes).
+Namespace prefixes and declarations are kept. Comments and processing
+instructions are added to the tree too, text behind them is their
+tail (otherwise the parser appends it to the previous element).
+
+XML is parsed with the encoding of its declaration (default utf-8),
+the charset of the response is used for the text behind a parse
+error only: the error is shown as comment, the body from the error
+on (from the end of the last markup before it, the character data
+there hasn't been reported) follows as it is. Bytes behind the last
+'>' are kept for that (as the parser keeps them to report a text).
+"""
+
+_XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+
+class XmlHighlighter:
+	"""
+	Pretty print and highlight XML from a byte stream.
+	Example:
+		hl = XmlHighlighter()
+		for chunk in chunks:
+			hl.feed(chunk).insert(text)
+		hl.close().insert(text)
+	"""
+	def __init__(self, encoding='utf-8', indent=2):
+		builder = TreeBuilder(insert_comments=True, insert_pis=True)
+		self.parser = XMLPullParser(('start', 'end', 'start-ns',
+				'comment', 'pi'),
+				_parser=XMLParser(target=builder))
+		self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+		self.indent = indent
+		self.stack = []		# Open elements
+		self.ns = []		# {uri:prefix} of open elements
+		self.pending_ns = []	# Declarations of next element
+		self.open = False	# Start tag of stack[-1] isn't closed
+		self.last = None	# Ended element, tail not written
+		self.head = b""		# Start of the document (declaration)
+		self.started = False
+		self.written = False	# Anything written yet
+		self.error = None
+		self.fed = 0		# Bytes fed to the parser
+		self.lines = 0		# Line breaks fed
+		self.line_start = 0	# Offset of last line fed
+		self.pending = b""	# Bytes fed behind the last '>'
+
+	def feed(self, data, out=None, final=False):
+		"""
+		Pretty print next chunk (bytes).
+		Args:
+		  out: StyledText to append to (default: a new one)
+		Return:
+		  StyledText
+		"""
+		if out == None:
+			out = StyledText()
+		if not self.started:
+			self._header(data, out, final)
+		if self.error:
+			out.add(self.decoder.decode(data, final))
+			return out
+		try:
+			self.parser.feed(data)
+			self._events(out)
+			if final:
+				self.parser.close()
+				self._events(out)
+		except ParseError as e:
+			self.error = e
+			out.add("\n<!-- ! " + str(e) + " -->\n", 'xml_error')
+			out.add(self.decoder.decode(self._unshown(data, e.position),
+					final))
+			return out
+		self.fed += len(data)
+		n = data.count(b"\n")
+		if n:
+			self.lines += n
+			self.line_start = self.fed - len(data) + data.rindex(b"\n") + 1
+		gt = data.rfind(b">")
+		if gt >= 0:
+			self.pending = data[gt+1:]
+		else:	self.pending += data
+		return out
+
+	def _unshown(self, data, position):
+		# Get the bytes not shown at a parse error: from the
+		# end of the last markup before the error position on.
+		buf = self.pending + data
+		line,col = position
+		if line - 1 <= self.lines:
+			pos = self.line_start + col
+		else:
+			off = -1
+			for i in range(line - 1 - self.lines):
+				off = data.find(b"\n", off + 1)
+			pos = self.fed + off + 1 + col
+		pos = max(0, min(pos - (self.fed - len(self.pending)), len(buf)))
+		return buf[buf.rfind(b">", 0, pos) + 1:]
+
+	def close(self, out=None):
+		""" Finish the document """
+		return self.feed(b"", out, True)
+
+	def _header(self, data, out, final):
+		# XML declaration isn't reported by the parser, wait
+		# until it's complete.
+		self.head += data
+		head = self.head.lstrip()
+		end = head.find(b"?>")
+		if head.startswith(b"<?xml") and end > 0:
+			out.add(head[:end+2].decode('ascii', 'replace'), 'xml_header')
+			self.written = True
+		elif not final and (len(head) < 5 or head.startswith(b"<?xml")) \
+				and len(head) < 1024:
+			return
+		self.started = True
+		self.head = None
+
+	def _events(self, out):
+		for ev,obj in self.parser.read_events():
+			if ev == 'start-ns':
+				self.pending_ns.append(obj)
+			elif ev == 'start':
+				self._tail(out)
+				self._close_start(out)
+				self._start(obj, out)
+			elif ev == 'end':
+				self._tail(out)
+				self._end(obj, out)
+			elif ev == 'comment':
+				self._tail(out)
+				self._close_start(out)
+				self._newline(out, len(self.stack))
+				out.add("<!--" + (obj.text or "") + "-->", 'xml_comment')
+				self.last = obj
+			elif ev == 'pi':
+				self._tail(out)
+				self._close_start(out)
+				self._newline(out, len(self.stack))
+				out.add("<?" + (obj.text or "") + "?>", 'xml_header')
+				self.last = obj
+
+	def _newline(self, out, level):
+		if self.written:
+			out.add("\n" + " "*(self.indent*level))
+		self.written = True
+
+	def _qname(self, tag, attr=False):
+		# Tag '{uri}name' as 'prefix:name'
+		if tag[:1] != "{":
+			return tag
+		uri,name = tag[1:].split("}", 1)
+		for ns in reversed(self.ns):
+			prefix = ns.get(uri)
+			if prefix != None and (prefix or not attr):
+				return prefix + ":" + name if prefix else name
+		if uri == _XML_NS:
+			return "xml:" + name
+		return tag
+
+	def _start(self, elem, out):
+		self._newline(out, len(self.stack))
+		self.ns.append({uri:prefix for prefix,uri in self.pending_ns})
+		out.add("<" + self._qname(elem.tag), 'xml_tag')
+		for prefix,uri in self.pending_ns:
+			out.add(" ")
+			out.add("xmlns:" + prefix if prefix else "xmlns", 'xml_attr')
+			out.add("=")
+			out.add('"' + escape(uri, {'"':"&quot;"}) + '"', 'xml_attr_value')
+		for k,v in elem.attrib.items():
+			out.add(" ")
+			out.add(self._qname(k, True), 'xml_attr')
+			out.add("=")
+			out.add('"' + escape(v, {'"':"&quot;"}) + '"', 'xml_attr_value')
+		self.pending_ns = []
+		self.stack.append(elem)
+		self.open = True
+
+	def _close_start(self, out):
+		# Close start tag of parent and write its text before
+		# the first child.
+		if not self.open:
+			return
+		out.add(">", 'xml_tag')
+		self.open = False
+		text = self.stack[-1].text
+		if text and text.strip():
+			self._newline(out, len(self.stack))
+			out.add(escape(text.strip()), 'xml_value')
+
+	def _end(self, elem, out):
+		name = self._qname(elem.tag)
+		if self.open:
+			# No children
+			if elem.text:
+				out.add(">", 'xml_tag')
+				out.add(escape(elem.text), 'xml_value')
+				out.add("</" + name + ">", 'xml_tag')
+			else:	out.add("/>", 'xml_tag')
+			self.open = False
+		else:
+			self._newline(out, len(self.stack)-1)
+			out.add("</" + name + ">", 'xml_tag')
+		self.stack.pop()
+		self.ns.pop()
+		self.last = elem
+
+	def _tail(self, out):
+		# Write text behind last ended element, then drop it
+		last = self.last
+		if last == None:
+			return
+		if last.tail and last.tail.strip():
+			self._newline(out, len(self.stack))
+			out.add(escape(last.tail.strip()), 'xml_value')
+		self.last = None
+		last.clear()
+		# Ended elements are removed, so it's the first child
+		if self.stack and len(self.stack[-1]) and self.stack[-1][0] is last:
+			del self.stack[-1][0]
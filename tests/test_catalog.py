@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import catalog
+from catalog import catalog_scan
+from catalog import catalog_load
+from catalog import catalog_get_names
+
+
+def _write(path, name, n_endpoints):
+	d = {'name':name, 'version':'1', 'info':'', 'address':'',
+		'headers':{}, 'models':{'M':{'info':'', 'attributes':{}}},
+		'endpoints':{'GET':{'/e' + str(i):{} for i in range(n_endpoints)}}}
+	f = open(path, "w")
+	json.dump(d, f)
+	f.close()
+
+
+class TestCatalog(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.dir = os.path.join(self.basedir, "apidoc")
+		os.mkdir(self.dir)
+		_write(os.path.join(self.dir, "a.json"), 'a', 2)
+		_write(os.path.join(self.dir, "b.json"), 'b', 1)
+
+	def tearDown(self):
+		shutil.rmtree(self.basedir)
+
+	def test_scan(self):
+		cat = catalog_scan(self.basedir)
+		self.assertEqual(sorted(cat), ['a.json', 'b.json'])
+		self.assertEqual(cat['a.json']['n_endpoints'], 2)
+		self.assertEqual(cat['a.json']['n_models'], 1)
+		self.assertEqual(catalog_load(self.basedir), cat)
+		self.assertEqual(catalog_get_names(self.basedir), ['a', 'b'])
+
+	def test_only_changed_files_parsed(self):
+		catalog_scan(self.basedir)
+		with mock.patch.object(catalog, 'journal_load',
+				side_effect=AssertionError("parsed")):
+			cat = catalog_scan(self.basedir)
+		self.assertEqual(len(cat), 2)
+
+		p = os.path.join(self.dir, "b.json")
+		_write(p, 'b', 5)
+		os.utime(p, (1, 1))
+		with mock.patch.object(catalog, 'journal_load',
+				wraps=catalog.journal_load) as load:
+			cat = catalog_scan(self.basedir)
+		load.assert_called_once_with(p)
+		self.assertEqual(cat['b.json']['n_endpoints'], 5)
+
+	def test_deleted_file_dropped(self):
+		catalog_scan(self.basedir)
+		os.remove(os.path.join(self.dir, "a.json"))
+		self.assertEqual(list(catalog_scan(self.basedir)), ['b.json'])
+		self.assertEqual(list(catalog_load(self.basedir)), ['b.json'])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import DOC as doc
+
+
+class TestAddEndpoint(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		os.mkdir(os.path.join(self.basedir, "apidoc"))
+		doc.DOC_new()
+		doc.DOC['name'] = 'test'
+		doc.DOC['version'] = '1'
+		ep = doc.new_endpoint()
+		ep['params']['id'] = doc.new_endpoint_parameter()
+		ep['response']['200'] = doc.new_endpoint_response()
+		doc.DOC_add_endpoint('GET', '/a', ep)
+
+	def tearDown(self):
+		shutil.rmtree(self.basedir)
+
+	def test_copy_is_independent(self):
+		src = doc.DOC_get_endpoint('GET', '/a')
+		doc.DOC_add_endpoint('GET', '/b', src)
+		doc.DOC_save_json(self.basedir)
+
+		# Edit source after the copy
+		src['params']['id']['required'] = True
+		src['response']['200']['summary'] = 'ok'
+		self.assertEqual(doc.DOC_dirty, {('endpoint', 'GET', '/a')})
+		copy = doc.DOC_get_endpoint('GET', '/b')
+		self.assertFalse(copy['params']['id']['required'])
+		self.assertEqual(copy['response']['200']['summary'], '')
+
+		# Saved (journal) and reloaded
+		p = doc.DOC_save_json(self.basedir)
+		doc.DOC_load(p)
+		a = doc.DOC_get_endpoint('GET', '/a')
+		b = doc.DOC_get_endpoint('GET', '/b')
+		self.assertTrue(a['params']['id']['required'])
+		self.assertEqual(a['response']['200']['summary'], 'ok')
+		self.assertFalse(b['params']['id']['required'])
+		self.assertEqual(b['response']['200']['summary'], '')
+
+
+class TestListEdits(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		os.mkdir(os.path.join(self.basedir, "apidoc"))
+		doc.DOC_new()
+		doc.DOC['name'] = 'test'
+		doc.DOC['version'] = '1'
+		ep = doc.new_endpoint()
+		ep['params']['x'] = doc.new_endpoint_parameter()
+		ep['params']['x']['values'] = ['a']
+		doc.DOC_add_endpoint('GET', '/a', ep)
+		self.path = doc.DOC_save_json(self.basedir)
+		doc.DOC_set_unchanged()
+
+	def tearDown(self):
+		shutil.rmtree(self.basedir)
+
+	def values(self):
+		return doc.DOC_get_endpoint('GET', '/a')['params']['x']['values']
+
+	def test_append_is_saved(self):
+		self.values().append('b')
+		self.assertTrue(doc.DOC_has_changed())
+		self.assertEqual(doc.DOC_dirty, {('endpoint', 'GET', '/a')})
+		doc.DOC_save_json(self.basedir)
+		doc.DOC_load(self.path)
+		self.assertEqual(self.values(), ['a', 'b'])
+
+		# Lists replayed from the journal are tracked too
+		self.values().remove('a')
+		self.assertEqual(doc.DOC_dirty, {('endpoint', 'GET', '/a')})
+		doc.DOC_save_json(self.basedir)
+		doc.DOC_load(self.path)
+		self.assertEqual(self.values(), ['b'])
+
+	def test_detached_objects_not_recorded(self):
+		rev = doc.DOC_revision
+		ep = doc.DOC_get_endpoint('GET', '/a').to_dict()
+		d = doc.DocDict(ep)
+		d['summary'] = 'x'
+		d['params']['x']['values'].append('c')
+		self.assertEqual(doc.DOC_revision, rev)
+		self.assertEqual(doc.DOC_dirty, set())
+
+
+class TestModelExample(unittest.TestCase):
+
+	def setUp(self):
+		doc.DOC_new()
+		for name,attrs in (('A', {'b':'B', 'n':'integer'}),
+				('B', {'a':'A', 's':'string'})):
+			m = doc.new_model()
+			for k,typ in attrs.items():
+				m['attributes'][k] = doc.new_model_attribute()
+				m['attributes'][k]['type'] = typ
+			doc.DOC_add_model(name, m)
+		doc.DOC['models']['A']['attributes']['n']['example'] = '5'
+
+	def test_cycle_cut_at_root(self):
+		self.assertEqual(doc.DOC_model_to_dict('B'),
+			{'a':{'b':{'$ref':'#/models/B'}, 'n':5}, 's':''})
+		self.assertEqual(doc.DOC_model_to_dict('A'),
+			{'b':{'a':{'$ref':'#/models/A'}, 's':''}, 'n':5})
+		self.assertEqual(doc.DOC_model_to_dict('B'),
+			{'a':{'b':{'$ref':'#/models/B'}, 'n':5}, 's':''})
+
+	def test_copy(self):
+		ex = doc.DOC_model_to_dict('A')
+		ex['b']['s'] = 'changed'
+		self.assertEqual(doc.DOC_model_to_dict('A')['b']['s'], '')
+
+	def test_invalidated(self):
+		doc.DOC_model_to_dict('A')
+		doc.DOC['models']['B']['attributes']['s']['example'] = 'x'
+		self.assertEqual(doc.DOC_model_to_dict('A')['b']['s'], 'x')
+
+	def test_zero(self):
+		self.assertEqual(doc.DOC_model_to_dict('A', zero=True)['n'], 0)
+		self.assertEqual(doc.DOC_model_to_dict('A')['n'], 5)
+
+
+if __name__ == '__main__':
+	unittest.main()
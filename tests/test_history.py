@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import history
+from history import History
+from httpclient import ResponseBody
+
+
+def _body(data):
+	body = ResponseBody()
+	body.write(data)
+	return body
+
+def _meta(url, t=None, endpoint=None):
+	return {'time':t if t else time.time(), 'api':'test', 'method':'GET',
+		'url':url, 'endpoint':endpoint, 'status':200}
+
+
+class TestHistory(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.hist = History(self.dir)
+		self.segment_size = history.HISTORY_SEGMENT_SIZE
+
+	def tearDown(self):
+		history.HISTORY_SEGMENT_SIZE = self.segment_size
+		self.hist.close()
+		shutil.rmtree(self.dir)
+
+	def test_add_load(self):
+		i = self.hist.add(_meta('http://host/a'), _body(b"x" * 10000))
+		meta,body = self.hist.load(i)
+		self.assertEqual(body, b"x" * 10000)
+		self.assertEqual((meta['url'], meta['size'], meta['truncated']),
+				('http://host/a', 10000, False))
+		self.assertIsNone(self.hist.load(i + 1))
+
+		# Index survives reopening
+		self.hist.close()
+		self.hist = History(self.dir)
+		self.assertEqual(self.hist.load(i)[1], b"x" * 10000)
+
+	def test_query(self):
+		for url in ('http://host/users/1', 'http://host/users/2',
+				'http://host/orders/1', 'http://other/users/1'):
+			self.hist.add(_meta(url, endpoint='/x'), _body(b""))
+		urls = [e['url'] for e in self.hist.query(url='http://host/users')]
+		self.assertEqual(urls, ['http://host/users/2', 'http://host/users/1'])
+		self.assertEqual(len(self.hist.query(method='GET', endpoint='/x')), 4)
+		self.assertEqual(len(self.hist.query(limit=2, offset=3)), 1)
+
+	def test_query_uses_url_index(self):
+		sql = []
+		self.hist.con.set_trace_callback(sql.append)
+		self.hist.query(url='http://host/users')
+		self.hist.con.set_trace_callback(None)
+		q = [s for s in sql if s.startswith("SELECT id")][0]
+		plan = self.hist.con.execute("EXPLAIN QUERY PLAN " + q).fetchall()
+		self.assertIn('entries_url', str(plan))
+
+	def test_retention(self):
+		history.HISTORY_SEGMENT_SIZE = 100
+		old = time.time() - 2*self.hist.max_age
+		a = self.hist.add(_meta('http://host/old', old), _body(b"x" * 200))
+		b = self.hist.add(_meta('http://host/old', old), _body(b"x" * 200))
+		self.assertEqual(self.hist.query(), [])
+		self.hist.add(_meta('http://host/new'), _body(b"x" * 200))
+
+		# Old segments are deleted, query doesn't return old entries
+		self.assertIsNone(self.hist.load(a))
+		self.assertEqual([e['url'] for e in self.hist.query()],
+				['http://host/new'])
+
+	def test_retention_by_size(self):
+		history.HISTORY_SEGMENT_SIZE = 100
+		self.hist.max_size = 1000
+		ids = [self.hist.add(_meta('http://host/' + str(i)),
+				_body(os.urandom(300))) for i in range(10)]
+		self.hist.query()
+		total = sum(os.path.getsize(os.path.join(self.dir, p))
+				for p in os.listdir(self.dir) if p.endswith(".log"))
+		self.assertLessEqual(total, 1000)
+		self.assertIsNone(self.hist.load(ids[0]))
+		self.assertIsNotNone(self.hist.load(ids[-1]))
+
+	def test_prefix_end(self):
+		self.assertEqual(history._prefix_end("ab"), "ac")
+		self.assertIsNone(history._prefix_end(chr(0x10ffff)))
+		self.assertEqual(history._prefix_end("a" + chr(0xd7ff)), "a" + chr(0xe000))
+
+
+if __name__ == '__main__':
+	unittest.main()
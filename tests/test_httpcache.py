@@ -0,0 +1,134 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+from httpcache import HttpCache
+from httpclient import SessionPool
+from httpclient import httpclient_receive
+
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	etag = '"v1"'
+	body = b'{"a": 1}'
+	requests = []
+
+	def do_GET(self):
+		_Handler.requests.append(dict(self.headers))
+		if self.headers.get('If-None-Match') == self.etag:
+			self.send_response(304)
+			self.send_header("ETag", self.etag)
+			self.send_header("X-Check", "2")
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+		self.send_response(200)
+		self.send_header("ETag", self.etag)
+		self.send_header("X-Check", "1")
+		self.send_header("Vary", "Accept")
+		self.send_header("Content-Length", str(len(self.body)))
+		self.end_headers()
+		self.wfile.write(self.body)
+
+	def log_message(self, *args):
+		pass
+
+
+class TestHttpCache(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.cache = HttpCache(self.dir)
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+		self.server.daemon_threads = True
+		threading.Thread(target=self.server.serve_forever,
+				daemon=True).start()
+		self.url = "http://127.0.0.1:{}/x".format(self.server.server_port)
+		self.pool = SessionPool()
+		_Handler.requests = []
+
+	def tearDown(self):
+		self.pool.close()
+		self.server.shutdown()
+		self.server.server_close()
+		self.cache.close()
+		shutil.rmtree(self.dir)
+
+	def get(self, hdrs):
+		resp = self.pool.request('GET', self.url, headers=hdrs,
+				stream=True)
+		return resp,httpclient_receive(resp)
+
+	def fetch(self, hdrs):
+		# Send request like ResponseFrame: conditional if cached
+		entry = self.cache.lookup('GET', self.url, hdrs)
+		resp,body = self.get(self.cache.conditional_headers(entry, hdrs)
+				if entry else hdrs)
+		if entry and resp.status_code == 304:
+			self.cache.touch(entry, dict(resp.headers))
+			return entry,None
+		if self.cache.is_cacheable('GET', resp):
+			self.cache.store('GET', self.url, hdrs, resp, body)
+		return None,body
+
+	def test_revalidate(self):
+		hdrs = {'Accept':'application/json'}
+		entry,body = self.fetch(hdrs)
+		self.assertIsNone(entry)
+		self.assertEqual(body.read(), _Handler.body)
+
+		entry,body = self.fetch(hdrs)
+		self.assertIsNotNone(entry)
+		self.assertEqual(_Handler.requests[-1].get('If-None-Match'), '"v1"')
+		with entry.open() as f:
+			self.assertEqual(f.read(), _Handler.body)
+		self.assertEqual(entry.status, 200)
+
+		# Headers of the 304 are stored
+		entry = self.cache.lookup('GET', self.url, hdrs)
+		self.assertEqual(entry.headers['X-Check'], "2")
+
+	def test_vary(self):
+		self.fetch({'Accept':'application/json'})
+		self.assertIsNotNone(self.cache.lookup('GET', self.url,
+				{'accept':'application/json'}))
+		self.assertIsNone(self.cache.lookup('GET', self.url,
+				{'Accept':'text/xml'}))
+		self.assertIsNone(self.cache.lookup('POST', self.url))
+
+	def test_evict(self):
+		self.cache.max_size = len(_Handler.body)
+		self.fetch({'Accept':'a'})
+		self.fetch({'Accept':'b'})
+		self.assertIsNone(self.cache.lookup('GET', self.url, {'Accept':'a'}))
+		self.assertIsNotNone(self.cache.lookup('GET', self.url,
+				{'Accept':'b'}))
+		self.assertEqual(sorted(os.listdir(self.dir)), sorted(
+			['index.db', self.cache.lookup('GET', self.url,
+				{'Accept':'b'}).key]))
+
+	def test_concurrent_store(self):
+		resp,body = self.get({})
+		threads = [threading.Thread(target=self.cache.store,
+				args=('GET', self.url, {}, resp, body))
+				for i in range(8)]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		entry = self.cache.lookup('GET', self.url, {})
+		with entry.open() as f:
+			self.assertEqual(f.read(), _Handler.body)
+		self.assertFalse([p for p in os.listdir(self.dir)
+				if p.endswith(".tmp")])
+
+
+if __name__ == '__main__':
+	unittest.main()
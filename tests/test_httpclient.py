@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+from httpclient import SessionPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def do_GET(self):
+		body = b"x" * 1024
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+class TestIdleSessions(unittest.TestCase):
+
+	def setUp(self):
+		self.servers = []
+		for i in range(2):
+			s = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+			s.daemon_threads = True
+			threading.Thread(target=s.serve_forever, daemon=True).start()
+			self.servers.append(s)
+		self.urls = ["http://127.0.0.1:{}/".format(s.server_port)
+				for s in self.servers]
+		self.pool = SessionPool(idle_timeout=0)
+
+	def tearDown(self):
+		self.pool.close()
+		for s in self.servers:
+			s.shutdown()
+			s.server_close()
+
+	def test_streamed_response_keeps_session(self):
+		resp = self.pool.request('GET', self.urls[0], stream=True)
+		# Sweep by a request to another host
+		self.pool.request('GET', self.urls[1]).close()
+		self.assertIn(self.urls[0][7:-1], self.pool.stats())
+		self.assertEqual(len(resp.content), 1024)
+		resp.close()
+		self.pool.request('GET', self.urls[1]).close()
+		self.assertNotIn(self.urls[0][7:-1], self.pool.stats())
+
+	def test_unclosed_response_is_released(self):
+		resp = self.pool.request('GET', self.urls[0], stream=True)
+		resp.content
+		del resp
+		self.pool.request('GET', self.urls[1]).close()
+		self.assertNotIn(self.urls[0][7:-1], self.pool.stats())
+
+	def test_configure_keeps_session_in_use(self):
+		resp = self.pool.request('GET', self.urls[0], stream=True)
+		hs = self.pool._get(self.urls[0])
+		self.pool._release(hs)
+		self.pool.configure(pool_size=2)
+		self.assertEqual(self.pool.stats(), {})
+		self.assertEqual(len(resp.content), 1024)
+		resp.close()
+		self.assertTrue(hs.retired)
+		self.assertEqual(hs.users, 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import unittest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+from httpretry import RetryPolicy
+from httpretry import httpretry_policy
+from httpretry import httpretry_parse_settings
+
+
+def _resp(status, headers=None):
+	resp = requests.Response()
+	resp.status_code = status
+	resp.headers.update(headers or {})
+	return resp
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+	def test_policy(self):
+		p = httpretry_policy({'connect_timeout':1, 'retries':4},
+				{'retries':0, 'read_timeout':None})
+		self.assertEqual(p.timeout(), (1.0, 30.0))
+		self.assertEqual(p.retries, 0)
+		self.assertEqual(httpretry_policy().to_dict(),
+				RetryPolicy().to_dict())
+
+	def test_delay(self):
+		p = RetryPolicy(retries=2, backoff=1)
+		err = requests.exceptions.ConnectionError()
+		self.assertLessEqual(p.delay('GET', 1, error=err), 2)
+		self.assertIsNone(p.delay('GET', 2, error=err))
+		self.assertIsNone(p.delay('POST', 0, error=err))
+		self.assertIsNotNone(p.delay('POST', 0,
+				error=requests.exceptions.ConnectTimeout()))
+		self.assertIsNone(p.delay('GET', 0, resp=_resp(500)))
+		self.assertIsNotNone(p.delay('POST', 0, resp=_resp(503)))
+		self.assertEqual(p.delay('GET', 0,
+				resp=_resp(429, {'Retry-After':'3'})), 3.0)
+		self.assertIsNone(p.delay('GET', 0,
+				resp=_resp(429, {'Retry-After':'3600'})))
+
+	def test_parse_settings(self):
+		self.assertEqual(httpretry_parse_settings({'retries':' 3 ',
+				'backoff':'', 'read_timeout':'x', 'connect_timeout':'-1'}),
+				({'retries':3}, ['read_timeout', 'connect_timeout']))
+
+
+if __name__ == '__main__':
+	unittest.main()
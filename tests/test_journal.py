@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import DOC as doc
+from journal import journal_get_path
+from journal import journal_read
+from journal import journal_load
+from journal import journal_append
+from journal import journal_write_full
+from journal import journal_compact
+
+
+class TestJournal(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, "a.json")
+		self.doc = {'name':'a', 'models':{},
+			'endpoints':{'GET':{'/a':{'summary':'a'}, '/b':{}}}}
+		journal_write_full(self.path, self.doc)
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def append(self):
+		journal_append(self.path, [
+			{'op':'set', 'path':['endpoints', 'GET', '/a'],
+				'value':{'summary':'changed'}},
+			{'op':'set', 'path':['endpoints', 'POST', '/c'], 'value':{}},
+			{'op':'del', 'path':['endpoints', 'GET', '/b']},
+			{'op':'set', 'path':['info'], 'value':'x'}])
+
+	def expected(self):
+		return {'name':'a', 'models':{}, 'info':'x',
+			'endpoints':{'GET':{'/a':{'summary':'changed'}},
+				'POST':{'/c':{}}}}
+
+	def test_replay(self):
+		self.append()
+		self.assertEqual(len(journal_read(self.path)), 4)
+		self.assertEqual(journal_load(self.path), self.expected())
+
+		# Replaying is idempotent
+		self.append()
+		self.assertEqual(journal_load(self.path), self.expected())
+
+	def test_truncated_line_skipped(self):
+		self.append()
+		f = open(journal_get_path(self.path), "a")
+		f.write('{"op": "set", "path": ["info"], "va')
+		f.close()
+		self.assertEqual(journal_load(self.path), self.expected())
+
+	def test_outdated_journal_ignored(self):
+		self.append()
+		journal = open(journal_get_path(self.path)).read()
+		journal_write_full(self.path, self.doc)
+		self.assertFalse(os.path.exists(journal_get_path(self.path)))
+
+		# Journal left behind by a crash during a full write
+		f = open(journal_get_path(self.path), "w")
+		f.write(journal)
+		f.close()
+		os.utime(self.path, ns=(1, 1))
+		self.assertEqual(journal_load(self.path), self.doc)
+
+	def test_compact(self):
+		self.append()
+		mtime = os.stat(self.path).st_mtime_ns
+		self.assertTrue(journal_compact(self.path))
+		self.assertFalse(os.path.exists(journal_get_path(self.path)))
+		self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+		f = open(self.path)
+		self.assertEqual(json.load(f), self.expected())
+		f.close()
+
+		# Appending after compaction continues the file
+		journal_append(self.path, [{'op':'del', 'path':['info']}])
+		res = self.expected()
+		del res['info']
+		self.assertEqual(journal_load(self.path), res)
+
+
+class TestSaveIncremental(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		os.mkdir(os.path.join(self.basedir, "apidoc"))
+		doc.DOC_new()
+		doc.DOC['name'] = 'test'
+		doc.DOC['version'] = '1'
+		for uri in ('/a', '/b'):
+			doc.DOC_add_endpoint('GET', uri, doc.new_endpoint())
+		self.path = doc.DOC_save_json(self.basedir)
+
+	def tearDown(self):
+		shutil.rmtree(self.basedir)
+
+	def test_set_and_delete(self):
+		st = os.stat(self.path)
+		doc.DOC_get_endpoint('GET', '/a')['summary'] = 'changed'
+		doc.DOC_delete_endpoint('GET', '/b')
+		doc.DOC['info'] = 'x'
+		doc.DOC_save_json(self.basedir)
+
+		# Only the journal has been written
+		self.assertEqual(os.stat(self.path).st_mtime_ns, st.st_mtime_ns)
+		paths = [e['path'] for e in journal_read(self.path)]
+		self.assertEqual(sorted(paths), [['endpoints', 'GET', '/a'],
+			['endpoints', 'GET', '/b'], ['info']])
+
+		doc.DOC_load(self.path)
+		self.assertEqual(doc.DOC_get_endpoint('GET', '/a')['summary'],
+				'changed')
+		self.assertFalse(doc.DOC_is_endpoint('GET', '/b'))
+		self.assertEqual(doc.DOC['info'], 'x')
+		self.assertFalse(doc.DOC_has_changed())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import time
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+from jsonlex import JsonLexer
+from jsonlex import JsonHighlighter
+
+
+def _chars(tokens):
+	# Kind of each character
+	return [kind for kind,s in tokens for c in s]
+
+def _lex(text, size, indent=None):
+	lexer = JsonLexer(indent)
+	tokens = []
+	for i in range(0, len(text), size):
+		tokens += lexer.feed(text[i:i+size])
+	return tokens + lexer.close()
+
+
+class TestJsonLexer(unittest.TestCase):
+
+	def test_chunked_equals_whole(self):
+		random.seed(1)
+		doc = json.dumps([{"key %d" % i : "va\\\"lé" * i, "n" : -i/3,
+			"b" : [True, None, {}]} for i in range(20)])
+		for indent in (None, 2):
+			whole = _lex(doc, len(doc), indent)
+			for size in range(1, 40):
+				tokens = _lex(doc, size, indent)
+				self.assertEqual("".join(s for k,s in tokens),
+					"".join(s for k,s in whole))
+				self.assertEqual(_chars(tokens), _chars(whole))
+
+	def test_malformed_keeps_text(self):
+		doc = '{"a": tru, "b": "x\n, "c"\\'
+		whole = "".join(s for k,s in _lex(doc, len(doc)))
+		self.assertEqual(whole, doc)
+		for size in range(1, 10):
+			self.assertEqual("".join(s for k,s in _lex(doc, size)), doc)
+
+	def test_long_string_in_small_chunks(self):
+		# Scanning must not start over with every chunk
+		value = "x" * (4*1024*1024) + "\\\"" + "y" * 1024
+		doc = json.dumps({"key" : value}).encode()
+		hl = JsonHighlighter()
+		start = time.process_time()
+		size = 0
+		for i in range(0, len(doc), 1024):
+			size += hl.feed(doc[i:i+1024]).pos
+		size += hl.close().pos
+		self.assertLess(time.process_time() - start, 10)
+		self.assertEqual(size, len(doc))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import gc
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import DOC as doc
+
+
+class TestLazyLoading(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		os.mkdir(os.path.join(self.basedir, "apidoc"))
+		self.saved = (doc.DOC_LAZY_MIN_SIZE, doc.DOC_LAZY_MAX_SIZE)
+		doc.DOC_LAZY_MIN_SIZE = 0
+		doc.DOC_new()
+		doc.DOC['name'] = 'test'
+		doc.DOC['version'] = '1'
+		for i in range(50):
+			ep = doc.new_endpoint()
+			ep['summary'] = 'e' + str(i)
+			ep['info'] = 'x' * (1000 if i == 0 else 100)
+			doc.DOC_add_endpoint('GET', '/e' + str(i), ep)
+		self.path = doc.DOC_save_json(self.basedir)
+
+	def tearDown(self):
+		doc.DOC_LAZY_MIN_SIZE,doc.DOC_LAZY_MAX_SIZE = self.saved
+		shutil.rmtree(self.basedir)
+
+	def loaded(self):
+		x = doc.DOC['endpoints']['GET']
+		return [u for u in dict.keys(x)
+			if dict.get(x, u) is not doc._UNLOADED]
+
+	def test_loaded_when_accessed(self):
+		doc.DOC_load(self.path)
+		self.assertIsInstance(doc.DOC['endpoints']['GET'], doc.LazyDocDict)
+		self.assertEqual(self.loaded(), [])
+		self.assertEqual(doc.DOC_get_endpoint('GET', '/e3')['summary'], 'e3')
+		self.assertEqual(self.loaded(), ['/e3'])
+		self.assertEqual(len(list(doc.DOC['endpoints']['GET'].keys())), 50)
+
+	def test_evicted_by_size(self):
+		doc.DOC_LAZY_MAX_SIZE = 1000
+		doc.DOC_load(self.path)
+		for i in range(1, 50):
+			doc.DOC_get_endpoint('GET', '/e' + str(i))
+		self.assertLessEqual(doc._lazy_size, 1000)
+		self.assertLess(len(self.loaded()), 49)
+		self.assertIn('/e49', self.loaded())
+
+		# A large endpoint counts more than a small one
+		doc.DOC_get_endpoint('GET', '/e0')
+		self.assertEqual(self.loaded(), ['/e0'])
+
+		# Dropped endpoints are read again
+		self.assertEqual(doc.DOC_get_endpoint('GET', '/e1')['summary'], 'e1')
+		self.assertFalse(doc.DOC_has_changed())
+
+	def test_eviction_while_held(self):
+		doc.DOC_LAZY_MAX_SIZE = 1000
+		doc.DOC_load(self.path)
+		ep = doc.DOC_get_endpoint('GET', '/e1')
+		for i in range(2, 50):
+			doc.DOC_get_endpoint('GET', '/e' + str(i))
+		gc.collect()
+		self.assertNotIn('/e1', self.loaded())
+
+		# The held endpoint is the one in DOC again
+		self.assertIs(doc.DOC_get_endpoint('GET', '/e1'), ep)
+		for i in range(2, 50):
+			doc.DOC_get_endpoint('GET', '/e' + str(i))
+
+		# Changed while dropped: put back and kept
+		ep['summary'] = 'changed'
+		self.assertEqual(doc.DOC_dirty, {('endpoint', 'GET', '/e1')})
+		self.assertIn('/e1', self.loaded())
+		for i in range(2, 50):
+			doc.DOC_get_endpoint('GET', '/e' + str(i))
+		self.assertIn('/e1', self.loaded())
+
+		doc.DOC_save_json(self.basedir)
+		doc.DOC_load(self.path)
+		self.assertEqual(doc.DOC_get_endpoint('GET', '/e1')['summary'],
+				'changed')
+
+	def test_sqlite(self):
+		doc.DOC_LAZY_MAX_SIZE = 1000
+		db = doc.DOC_convert_storage(self.basedir, 'test', True)
+		doc.DOC_load(db)
+		self.assertEqual(self.loaded(), [])
+		for i in range(50):
+			self.assertEqual(doc.DOC_get_endpoint('GET',
+					'/e' + str(i))['summary'], 'e' + str(i))
+		self.assertLessEqual(doc._lazy_size, 1000)
+		self.assertLess(len(self.loaded()), 50)
+
+
+if __name__ == '__main__':
+	unittest.main()
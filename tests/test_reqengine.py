@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+from reqengine import ThreadedRequestEngine
+
+
+def _download(job, end_timeout):
+	# Headers arrive at once, the body takes longer than the timeout
+	if end_timeout:
+		job.end_timeout()
+	for i in range(5):
+		time.sleep(0.1)
+	return 'body'
+
+
+class TestTimeout(unittest.TestCase):
+
+	def setUp(self):
+		self.engine = ThreadedRequestEngine(2)
+
+	def tearDown(self):
+		self.engine.shutdown()
+
+	def test_timeout(self):
+		job = self.engine.submit(_download, False, timeout=0.2)
+		self.assertRaises(TimeoutError, job.result, 5)
+		self.assertTrue(job.is_cancelled())
+
+	def test_end_timeout(self):
+		job = self.engine.submit(_download, True, timeout=0.2)
+		self.assertEqual(job.result(5), 'body')
+
+
+	def test_discard_after_cancel(self):
+		started = threading.Event()
+		discarded = []
+		done = threading.Event()
+		def func(job):
+			started.set()
+			time.sleep(0.2)
+			return 'response'
+		def on_discard(res):
+			discarded.append(res)
+			done.set()
+		job = self.engine.submit(func, on_discard=on_discard)
+		started.wait(5)
+		job.cancel()
+		self.assertTrue(done.wait(5))
+		self.assertEqual(discarded, ['response'])
+
+	def test_discard_after_timeout(self):
+		discarded = []
+		done = threading.Event()
+		def on_discard(res):
+			discarded.append(res)
+			done.set()
+		job = self.engine.submit(_download, False, timeout=0.2,
+				on_discard=on_discard)
+		self.assertRaises(TimeoutError, job.result, 5)
+		self.assertTrue(done.wait(5))
+		self.assertEqual(discarded, ['body'])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import DOC as doc
+from routes import RouteTrie
+
+
+class TestRouteTrie(unittest.TestCase):
+
+	def setUp(self):
+		self.trie = RouteTrie({
+			'GET' : {'/users':1, '/users/{userId}':1,
+				'/users/me':1, '/users/{userId}/orders':1,
+				'/files/{name}.json':1, '/a/{x}/c':1, '/a/b/d':1},
+			'POST' : {'/users':1}})
+
+	def test_match(self):
+		m = self.trie.match
+		self.assertEqual(m('GET', 'http://host/users'), ('/users', {}))
+		self.assertEqual(m('GET', '/users/42/orders?x=1'),
+				('/users/{userId}/orders', {'userId':'42'}))
+		self.assertEqual(m('GET', 'host/users/a%20b'),
+				('/users/{userId}', {'userId':'a b'}))
+		self.assertEqual(m('POST', '/users/'), ('/users', {}))
+		self.assertEqual(m('GET', '/files/x.y.json'),
+				('/files/{name}.json', {'name':'x.y'}))
+		self.assertIsNone(m('DELETE', '/users'))
+		self.assertIsNone(m('GET', '/users/42/items'))
+
+	def test_literal_before_item(self):
+		self.assertEqual(self.trie.match('GET', '/users/me'),
+				('/users/me', {}))
+		# Literal dead end falls back to the path item
+		self.assertEqual(self.trie.match('GET', '/a/b/c'),
+				('/a/{x}/c', {'x':'b'}))
+
+	def test_base(self):
+		self.assertEqual(self.trie.match('GET',
+				'https://host/api/v1/users/1', 'https://host/api/v1/'),
+				('/users/{userId}', {'userId':'1'}))
+
+	def test_remove(self):
+		self.assertTrue(self.trie.remove('GET', '/users/{userId}/orders'))
+		self.assertFalse(self.trie.remove('GET', '/users/{userId}/orders'))
+		self.assertIsNone(self.trie.match('GET', '/users/1/orders'))
+		self.assertEqual(self.trie.match('GET', '/users/1'),
+				('/users/{userId}', {'userId':'1'}))
+		self.assertEqual(len(self.trie), 7)
+
+
+class TestMatchEndpoint(unittest.TestCase):
+
+	def setUp(self):
+		doc.DOC_new()
+		doc.DOC['name'] = 'test'
+		doc.DOC['address'] = 'http://host/api'
+		doc.DOC_add_endpoint('GET', '/users/{id}', doc.new_endpoint())
+
+	def test_match(self):
+		self.assertEqual(doc.DOC_match_endpoint('GET',
+				'http://host/api/users/7'), ('/users/{id}', {'id':'7'}))
+		self.assertIsNone(doc.DOC_match_endpoint('GET',
+				'http://host/api/groups/7'))
+
+	def test_routes_follow_changes(self):
+		doc.DOC_match_endpoint('GET', '/api/users/7')
+		doc.DOC_add_endpoint('GET', '/groups/{id}', doc.new_endpoint())
+		self.assertEqual(doc.DOC_match_endpoint('GET',
+				'http://host/api/groups/7'), ('/groups/{id}', {'id':'7'}))
+		doc.DOC_delete_endpoint('GET', '/users/{id}')
+		self.assertIsNone(doc.DOC_match_endpoint('GET',
+				'http://host/api/users/7'))
+
+
+if __name__ == '__main__':
+	unittest.main()
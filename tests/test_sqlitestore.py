@@ -0,0 +1,84 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import DOC as doc
+from journal import journal_load
+from sqlitestore import sqlite_store_save
+from sqlitestore import sqlite_store_load
+from sqlitestore import sqlite_store_info
+from schema import schema_doc_from_dict
+
+
+def _doc():
+	return {'name':'test', 'version':'1', 'info':'', 'headers':{'X':'1'},
+		'models':{'M':{'info':'m', 'attributes':{
+			'b':{'type':'string'}, 'a':{'type':'M'}}}},
+		'endpoints':{
+			'GET':{'/a':{'summary':'a', 'info':'',
+				'params':{'z':{'source':'query'}, 'y':{'source':'path'}},
+				'response':{'200':{'model':'M'}, '404':{}}},
+			'/b':{'summary':'b', 'info':'', 'params':{}, 'response':{}}},
+			'POST':{'/a':{'summary':'', 'info':'', 'params':{},
+				'response':{}}}}}
+
+
+class TestSqliteStore(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		os.mkdir(os.path.join(self.basedir, "apidoc"))
+		self.db = os.path.join(self.basedir, "apidoc", "test.db")
+
+	def tearDown(self):
+		shutil.rmtree(self.basedir)
+
+	def test_save_load(self):
+		d = _doc()
+		sqlite_store_save(self.db, d)
+		res = sqlite_store_load(self.db)
+		self.assertEqual(res, d)
+		# Order of keys is kept
+		self.assertEqual(list(res['endpoints']['GET']['/a']['params']),
+				['z', 'y'])
+		self.assertEqual(list(res['endpoints']['GET']), ['/a', '/b'])
+		info = sqlite_store_info(self.db)
+		self.assertEqual((info['name'], info['n_endpoints'],
+				info['n_models']), ('test', 3, 1))
+
+	def test_save_sections(self):
+		sqlite_store_save(self.db, _doc())
+		self.assertTrue(doc.DOC_load(self.db))
+		doc.DOC_get_endpoint('GET', '/a')['params']['x'] = \
+				doc.new_endpoint_parameter()
+		doc.DOC_delete_endpoint('GET', '/b')
+		doc.DOC_add_model('N', doc.new_model())
+		doc.DOC['info'] = 'changed'
+		expected = doc.DOC_snapshot()
+		self.assertEqual(doc.DOC_save_json(self.basedir), self.db)
+
+		self.assertEqual(sqlite_store_load(self.db), expected)
+		self.assertTrue(doc.DOC_load(self.db))
+		self.assertEqual(doc.DOC_snapshot(), expected)
+
+	def test_convert(self):
+		doc.DOC_set(schema_doc_from_dict(_doc()), None)
+		p = doc.DOC_save_json(self.basedir)
+		self.assertTrue(p.endswith("test.json"))
+
+		db = doc.DOC_convert_storage(self.basedir, 'test', True)
+		self.assertEqual(db, self.db)
+		self.assertFalse(os.path.exists(p))
+		self.assertEqual(sqlite_store_load(db), _doc())
+
+		p = doc.DOC_convert_storage(self.basedir, 'test', False)
+		self.assertFalse(os.path.exists(db))
+		self.assertEqual(journal_load(p), _doc())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+from textindex import TextIndex
+from styledtext import StyledText
+
+
+def _rows(text, width):
+	# Wrap text the slow way: (offset, text) of all rows
+	res = []
+	off = 0
+	for line in text.split("\n"):
+		n = max(1, -(-len(line) // width))
+		for k in range(n):
+			res.append((off + k*width, line[k*width:(k+1)*width]))
+		off += len(line) + 1
+	return res
+
+
+class TestTextIndex(unittest.TestCase):
+
+	def test_rows(self):
+		random.seed(1)
+		text = "".join(random.choice("ab\n") if random.random() < 0.9
+				else "x" * random.randint(0, 30) for i in range(2000))
+		idx = TextIndex(7)
+		# Blocks split anywhere, also within lines
+		i = 0
+		while i < len(text):
+			n = random.randint(1, 50)
+			idx.append(text[i:i+n])
+			i += n
+		self.assertEqual(idx.get_text(), text)
+		self.assertEqual(idx.nlines(), text.count("\n") + 1)
+		for width in (7, 1, 13):
+			idx.set_width(width)
+			rows = _rows(text, width)
+			self.assertEqual(idx.nrows(), len(rows))
+			self.assertEqual(idx.get_rows(0, len(rows)), rows)
+			self.assertEqual(idx.get_rows(100, 120), rows[100:120])
+			self.assertEqual(idx.get_rows(len(rows) - 3, len(rows) + 5),
+					rows[-3:])
+
+	def test_row_to_line(self):
+		idx = TextIndex(4)
+		idx.append("abcdefghij\n\nxy")
+		self.assertEqual(idx.nrows(), 5)
+		self.assertEqual(idx.row_to_line(2), (0, 0))
+		self.assertEqual(idx.row_to_line(3), (1, 3))
+		self.assertEqual(idx.row_to_line(4), (2, 4))
+		self.assertEqual(idx.line_to_row(2), 4)
+		self.assertEqual(idx.line_length(0), 10)
+
+	def test_tags(self):
+		idx = TextIndex()
+		for s in ('{"a": ', '"bcd"}\n[1, 2]'):
+			st = StyledText()
+			for tok,tag in ((s[:3], 'json_key'), (s[3:], None)):
+				st.add(tok, tag)
+			idx.append_styled(st)
+		self.assertEqual(idx.get_tags(0, 100),
+				{'json_key' : [(0, 3), (6, 9)]})
+		self.assertEqual(idx.get_tags(4, 7), {'json_key' : [(6, 9)]})
+		self.assertEqual(idx.get_tags(3, 6), {})
+		self.assertEqual(idx.get_range(2, 8), 'a": "b')
+
+	def test_empty(self):
+		idx = TextIndex()
+		self.assertEqual(idx.nrows(), 1)
+		self.assertEqual(idx.get_rows(0, 10), [(0, "")])
+		idx.append("")
+		self.assertEqual(idx.get_text(), "")
+
+
+if __name__ == '__main__':
+	unittest.main()
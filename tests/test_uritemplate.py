@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import DOC as doc
+from uritemplate import uritemplate_get
+
+
+class TestUriTemplate(unittest.TestCase):
+
+	def test_expand(self):
+		t = uritemplate_get('/users/{userId}/orders/{orderId}')
+		self.assertEqual(t.items, ('userId', 'orderId'))
+		self.assertEqual(t.expand({'userId':42, 'orderId':'a/b c'}),
+				'/users/42/orders/a%2Fb%20c')
+		self.assertEqual(t.expand({'userId':'a/b'}, False),
+				'/users/a/b/orders/{orderId}')
+
+	def test_special_values(self):
+		# Values are inserted as they are (no regex replacement)
+		t = uritemplate_get('/files/{name}.json')
+		self.assertEqual(t.expand({'name':r'\1$&'}, False),
+				r'/files/\1$&.json')
+		self.assertEqual(t.expand({}), '/files/{name}.json')
+
+	def test_segments(self):
+		t = uritemplate_get('/files/{name}.json')
+		self.assertEqual(t.segments(), [['files'], ['', 'name', '.json']])
+
+	def test_cached(self):
+		self.assertIs(uritemplate_get('/a/{b}'), uritemplate_get('/a/{b}'))
+
+	def test_set_url_path_item(self):
+		url = 'http://host/users/{id}/x/{id}'
+		self.assertEqual(doc.set_url_path_item(url, 'id', '7'),
+				'http://host/users/7/x/7')
+		self.assertEqual(doc.set_url_path_item(url, 'other', '7'), url)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+import DOC as doc
+import validate
+
+
+class TestDeletedModel(unittest.TestCase):
+
+	def setUp(self):
+		doc.DOC_new()
+		doc.DOC['name'] = 'test'
+		doc.DOC['version'] = '1'
+		doc.DOC_add_model('Item', doc.new_model())
+		m = doc.new_model()
+		m['attributes']['item'] = doc.new_model_attribute()
+		m['attributes']['item']['type'] = 'Item'
+		doc.DOC_add_model('List', m)
+		ep = doc.new_endpoint()
+		ep['response']['200'] = doc.new_endpoint_response()
+		ep['response']['200']['model'] = 'Item'
+		doc.DOC_add_endpoint('GET', '/item', ep)
+		doc.DOC_add_endpoint('GET', '/other', doc.new_endpoint())
+		doc.DOC_set_unchanged()
+
+	def errors(self):
+		diags = validate.validate_doc(sections=set(doc.DOC_dirty))
+		return sorted(" ".join(d['path']) for d in diags
+				if d['level'] == 'error')
+
+	def test_referrers(self):
+		self.assertEqual(doc.DOC_model_referrers('Item'),
+			{('model', 'List'), ('endpoint', 'GET', '/item')})
+		doc.DOC_delete_model('Item')
+		self.assertEqual(self.errors(), [
+			"endpoints GET /item response 200",
+			"models List item"])
+
+	def test_index_follows_edits(self):
+		doc.DOC_model_referrers('Item')
+		doc.DOC_get_endpoint('GET', '/item')['response']['200']['model'] = ''
+		doc.DOC['models']['List']['attributes']['item']['type'] = 'string'
+		doc.DOC_get_endpoint('GET', '/other')['response']['201'] = {'model':'Item'}
+		self.assertEqual(doc.DOC_model_referrers('Item'),
+			{('endpoint', 'GET', '/other')})
+		doc.DOC_delete_model('Item')
+		self.assertEqual(self.errors(), ["endpoints GET /other response 201"])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'okapi'))
+
+from xmllex import XmlHighlighter
+
+
+def _pretty(doc, size):
+	hl = XmlHighlighter()
+	parts = [hl.feed(doc[i:i+size]) for i in range(0, len(doc), size)]
+	parts.append(hl.close())
+	return "".join(p.get_text() for p in parts)
+
+
+class TestXmlHighlighter(unittest.TestCase):
+
+	def test_pretty_print(self):
+		doc = b'<?xml version="1.0"?><s:e xmlns:s="urn:s"><s:b a="1">' \
+			b'x &amp; y</s:b><c/></s:e>'
+		self.assertEqual(_pretty(doc, 1000),
+			'<?xml version="1.0"?>\n'
+			'<s:e xmlns:s="urn:s">\n'
+			'  <s:b a="1">x &amp; y</s:b>\n'
+			'  <c/>\n'
+			'</s:e>')
+
+	def test_text_around_comments_in_order(self):
+		doc = b'<a><b/>tail<!--c-->more<?pi x?>after<d/>end</a>'
+		expected = "<a>\n  <b/>\n  tail\n  <!--c-->\n  more\n" \
+			"  <?pi x?>\n  after\n  <d/>\n  end\n</a>"
+		for size in range(1, len(doc)+1):
+			self.assertEqual(_pretty(doc, size), expected)
+
+	def test_malformed_in_the_middle(self):
+		doc = b'<?xml version="1.0"?>\n<a>\n  <b>x</b>\n' \
+			b'  <c>broken</a> rest of it\n<z>tail</z>'
+		for size in range(1, len(doc)+1):
+			text = _pretty(doc, size)
+			self.assertIn("<b>x</b>", text)
+			self.assertIn("mismatched tag", text)
+			self.assertTrue(text.endswith(
+				"-->\nbroken</a> rest of it\n<z>tail</z>"), text)
+
+
+if __name__ == '__main__':
+	unittest.main()